@@ -1,5 +1,6 @@
+from channels.db import database_sync_to_async
 from rest_framework_simplejwt.authentication import JWTAuthentication
-from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
 
 
 class CookieJWTAuthentication(JWTAuthentication):
@@ -17,3 +18,31 @@ class CookieJWTAuthentication(JWTAuthentication):
             # Do NOT raise here.
             # Just return None so request continues.
             return None
+
+
+class CookieJWTAuthMiddleware:
+    """
+    Channels middleware: sets scope["user"] from the same "access" cookie
+    CookieJWTAuthentication reads. Without a valid token the user already
+    in the scope (AuthMiddlewareStack) is left alone.
+    """
+
+    def __init__(self, inner):
+        self.inner = inner
+
+    async def __call__(self, scope, receive, send):
+        raw_token = scope.get("cookies", {}).get("access")
+        if raw_token:
+            user = await _user_for_token(raw_token)
+            if user is not None:
+                scope = dict(scope, user=user)
+        return await self.inner(scope, receive, send)
+
+
+@database_sync_to_async
+def _user_for_token(raw_token):
+    auth = CookieJWTAuthentication()
+    try:
+        return auth.get_user(auth.get_validated_token(raw_token))
+    except (InvalidToken, AuthenticationFailed):
+        return None
@@ -7,6 +7,8 @@ from django.core.exceptions import ValidationError
 from django.contrib.auth.models import AbstractUser
 from django.db import models
 
+from .roles import get_active_role_names
+
 
 # =====================================================
 # USER
@@ -32,17 +34,16 @@ class User(AbstractUser):
         return self.email
 
     # Safe role checker (ONLY use Role constants)
+    # Roles are resolved once per user instance, see accounts.roles
     def has_role(self, role_name):
-        return self.user_roles.filter(
-            role__name=role_name,
-            is_active=True
-        ).exists()
+        return role_name in self.active_role_names
+
+    @property
+    def active_role_names(self):
+        return get_active_role_names(self)
 
     def get_active_roles(self):
-        return list(
-            self.user_roles.filter(is_active=True)
-            .values_list("role__name", flat=True)
-        )
+        return sorted(self.active_role_names)
 
 
 # =====================================================
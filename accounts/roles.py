@@ -0,0 +1,106 @@
+"""
+Role resolution for users.
+
+All active role names of a user are loaded in one query into an immutable
+frozenset. The set is memoised on the user instance (so it lives for the
+duration of a request) and, when ``settings.SHARED_CACHE`` is on, in the
+shared Django cache (so the next request carrying the same user does not hit
+the database either). A per-process cache would let a revoked role outlive
+the revocation on other workers, so without Redis roles are only memoised
+per request.
+
+The shared entry is dropped whenever a ``UserRole`` row is saved or deleted,
+which covers ``approve()`` and deactivation; bulk ``.update()`` callers must
+call ``invalidate_user_roles`` themselves. It is dropped again once the
+transaction commits, so a concurrent request that re-cached the old roles
+in between does not keep them.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+
+ROLE_CACHE_TIMEOUT = 60 * 15  # seconds
+
+_INSTANCE_ATTR = "_active_role_names"
+
+_role_query_counter = ContextVar("role_query_counter", default=None)
+
+
+def _cache_key(user_id):
+    return f"accounts:roles:{user_id}"
+
+
+class RoleQueryCounter:
+    """Number of role lookups that reached the database."""
+
+    def __init__(self):
+        self.count = 0
+
+
+@contextmanager
+def track_role_queries():
+    """
+    Count role queries issued inside the block.
+
+        with track_role_queries() as counter:
+            client.get(url)
+        assert counter.count <= 1
+    """
+    counter = RoleQueryCounter()
+    token = _role_query_counter.set(counter)
+    try:
+        yield counter
+    finally:
+        _role_query_counter.reset(token)
+
+
+def _load_role_names(user):
+    # Honour prefetch_related("user_roles__role") when the caller did it
+    prefetched = getattr(user, "_prefetched_objects_cache", {}).get("user_roles")
+    if prefetched is not None:
+        return frozenset(ur.role.name for ur in prefetched if ur.is_active)
+
+    counter = _role_query_counter.get()
+    if counter is not None:
+        counter.count += 1
+
+    return frozenset(
+        user.user_roles.filter(is_active=True)
+        .values_list("role__name", flat=True)
+    )
+
+
+def get_active_role_names(user):
+    """Return the frozenset of active role names for ``user``."""
+    roles = user.__dict__.get(_INSTANCE_ATTR)
+    if roles is not None:
+        return roles
+
+    if user.pk is None:
+        return frozenset()
+
+    if settings.SHARED_CACHE:
+        key = _cache_key(user.pk)
+        roles = cache.get(key)
+        if roles is None:
+            roles = _load_role_names(user)
+            cache.set(key, roles, ROLE_CACHE_TIMEOUT)
+    else:
+        roles = _load_role_names(user)
+
+    user.__dict__[_INSTANCE_ATTR] = roles
+    return roles
+
+
+def invalidate_user_roles(user_id):
+    """Forget cached roles for a user (accepts a user or a user id)."""
+    if hasattr(user_id, "pk"):
+        user_id.__dict__.pop(_INSTANCE_ATTR, None)
+        user_id = user_id.pk
+    key = _cache_key(user_id)
+    cache.delete(key)
+    transaction.on_commit(lambda: cache.delete(key))
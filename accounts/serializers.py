@@ -125,11 +125,7 @@ class UserMeSerializer(serializers.ModelSerializer):
         return profile.is_complete if profile else False
 
     def get_roles(self, obj):
-        return list(
-            obj.user_roles
-            .filter(is_active=True)
-            .values_list("role__name", flat=True)
-        )
+        return obj.get_active_roles()
 
     def get_enrollments(self, obj):
         enrollments = (
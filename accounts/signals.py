@@ -1,6 +1,7 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
-from .models import User, Profile
+from .models import User, Profile, UserRole
+from .roles import invalidate_user_roles
 
 
 @receiver(post_save, sender=User)
@@ -14,3 +15,9 @@ def create_profile(sender, instance, created, **kwargs):
         user=instance,
         defaults=defaults,
     )
+
+
+@receiver(post_save, sender=UserRole)
+@receiver(post_delete, sender=UserRole)
+def invalidate_role_cache(sender, instance, **kwargs):
+    invalidate_user_roles(instance.user_id)
@@ -1,3 +1,121 @@
-from django.test import TestCase
+"""
+Tests for accounts — role resolution.
 
-# Create your tests here.
+Covers:
+  - Roles load once per user instance and once per user across instances
+    (shared cache only)
+  - Cache invalidation on UserRole save / approve / delete, again on commit
+  - Permission classes issue at most one role query per request
+"""
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework.test import APIRequestFactory
+
+from .models import User, Role, UserRole
+from .permissions import IsStudent, IsTeacher
+from .roles import track_role_queries, invalidate_user_roles
+
+
+@override_settings(SHARED_CACHE=True)
+class RoleCacheTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher_role = Role.objects.create(name=Role.TEACHER)
+        cls.student_role = Role.objects.create(name=Role.STUDENT)
+
+        cls.user = User.objects.create_user(
+            username="roleuser",
+            email="roleuser@test.com",
+            password="testpass123",
+        )
+        cls.user_role = UserRole.objects.create(
+            user=cls.user,
+            role=cls.student_role,
+            is_active=True,
+            is_primary=True,
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def fresh_user(self):
+        return User.objects.get(pk=self.user.pk)
+
+    def test_roles_loaded_once_per_instance(self):
+        user = self.fresh_user()
+        with track_role_queries() as counter:
+            with self.assertNumQueries(1):
+                self.assertTrue(user.has_role(Role.STUDENT))
+                self.assertFalse(user.has_role(Role.TEACHER))
+                self.assertEqual(user.get_active_roles(), [Role.STUDENT])
+        self.assertEqual(counter.count, 1)
+
+    def test_roles_shared_across_instances(self):
+        self.fresh_user().has_role(Role.STUDENT)
+        user = self.fresh_user()
+        with self.assertNumQueries(0):
+            self.assertTrue(user.has_role(Role.STUDENT))
+
+    @override_settings(SHARED_CACHE=False)
+    def test_roles_not_shared_without_shared_cache(self):
+        self.fresh_user().has_role(Role.STUDENT)
+        user = self.fresh_user()
+        with self.assertNumQueries(1):
+            self.assertTrue(user.has_role(Role.STUDENT))
+
+    def test_invalidation_repeats_on_commit(self):
+        self.assertTrue(self.fresh_user().has_role(Role.STUDENT))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user_role.is_active = False
+            self.user_role.save()
+            # A concurrent reader re-caches the pre-commit roles
+            cache.set(f"accounts:roles:{self.user.pk}", frozenset([Role.STUDENT]))
+        self.assertFalse(self.fresh_user().has_role(Role.STUDENT))
+
+    def test_active_role_names_is_frozenset(self):
+        self.assertIsInstance(self.fresh_user().active_role_names, frozenset)
+
+    def test_prefetched_roles_are_used(self):
+        user = User.objects.prefetch_related("user_roles__role").get(pk=self.user.pk)
+        with track_role_queries() as counter:
+            with self.assertNumQueries(0):
+                self.assertTrue(user.has_role(Role.STUDENT))
+        self.assertEqual(counter.count, 0)
+
+    def test_deactivate_invalidates(self):
+        self.assertTrue(self.fresh_user().has_role(Role.STUDENT))
+        self.user_role.is_active = False
+        self.user_role.save()
+        self.assertFalse(self.fresh_user().has_role(Role.STUDENT))
+
+    def test_approve_invalidates(self):
+        self.user_role.is_active = False
+        self.user_role.save()
+        pending = UserRole.objects.create(
+            user=self.user, role=self.teacher_role, is_active=False
+        )
+        self.assertFalse(self.fresh_user().has_role(Role.TEACHER))
+        pending.approve(admin_user=self.user)
+        self.assertTrue(self.fresh_user().has_role(Role.TEACHER))
+
+    def test_delete_invalidates(self):
+        self.assertTrue(self.fresh_user().has_role(Role.STUDENT))
+        self.user_role.delete()
+        self.assertFalse(self.fresh_user().has_role(Role.STUDENT))
+
+    def test_bulk_update_needs_explicit_invalidation(self):
+        self.assertTrue(self.fresh_user().has_role(Role.STUDENT))
+        UserRole.objects.filter(user=self.user).update(is_active=False)
+        invalidate_user_roles(self.user.pk)
+        self.assertFalse(self.fresh_user().has_role(Role.STUDENT))
+
+    def test_permissions_issue_single_role_query(self):
+        request = APIRequestFactory().get("/")
+        request.user = self.fresh_user()
+        with track_role_queries() as counter:
+            self.assertTrue(IsStudent().has_permission(request, None))
+            self.assertFalse(IsTeacher().has_permission(request, None))
+            self.assertTrue(IsStudent().has_permission(request, None))
+        self.assertEqual(counter.count, 1)
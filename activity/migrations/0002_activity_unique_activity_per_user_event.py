@@ -0,0 +1,41 @@
+from django.db import migrations, models
+
+
+def remove_duplicate_activities(apps, schema_editor):
+    Activity = apps.get_model("activity", "Activity")
+
+    duplicates = (
+        Activity.objects
+        .values("user_id", "content_type_id", "object_id", "type")
+        .annotate(n=models.Count("id"))
+        .filter(n__gt=1)
+    )
+
+    for dup in duplicates.iterator():
+        ids = list(
+            Activity.objects
+            .filter(
+                user_id=dup["user_id"],
+                content_type_id=dup["content_type_id"],
+                object_id=dup["object_id"],
+                type=dup["type"],
+            )
+            .order_by("created_at")
+            .values_list("id", flat=True)
+        )
+        Activity.objects.filter(id__in=ids[1:]).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('activity', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_activities, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='activity',
+            constraint=models.UniqueConstraint(fields=('user', 'content_type', 'object_id', 'type'), name='unique_activity_per_user_event'),
+        ),
+    ]
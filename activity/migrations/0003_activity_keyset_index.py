@@ -0,0 +1,15 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("activity", "0002_activity_unique_activity_per_user_event"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="activity",
+            index=models.Index(fields=["user", "-created_at", "-id"], name="activity_user_created_id"),
+        ),
+    ]
@@ -46,6 +46,18 @@ class Activity(models.Model):
             models.Index(fields=["user"]),
             models.Index(fields=["type"]),
             models.Index(fields=["due_date"]),
+            # Keyset pagination of the feed
+            models.Index(
+                fields=["user", "-created_at", "-id"],
+                name="activity_user_created_id",
+            ),
+        ]
+        constraints = [
+            # One notification per user per event (fan-out is idempotent)
+            models.UniqueConstraint(
+                fields=["user", "content_type", "object_id", "type"],
+                name="unique_activity_per_user_event",
+            ),
         ]
 
     def __str__(self):
@@ -1,16 +1,173 @@
+import logging
+import queue
+import threading
+
+from django.conf import settings
 from django.contrib.contenttypes.models import ContentType
+from django.db import close_old_connections, transaction
+from django.dispatch import Signal
+
+from enrollments.models import Enrollment
 from .models import Activity
 
 
+logger = logging.getLogger(__name__)
+
+FANOUT_BATCH_SIZE = 1000
+
+# Sent after Activity rows are bulk-inserted (bulk_create fires no
+# post_save). Args: user_ids
+activities_created = Signal()
+
+
 def create_activity(user, obj, type, title, due_date=None):
 
     content_type = ContentType.objects.get_for_model(obj)
 
-    Activity.objects.create(
-        user=user,
-        type=type,
-        title=title,
-        content_type=content_type,
-        object_id=obj.id,
-        due_date=due_date
+    Activity.objects.bulk_create(
+        [
+            Activity(
+                user=user,
+                type=type,
+                title=title,
+                content_type=content_type,
+                object_id=obj.id,
+                due_date=due_date
+            )
+        ],
+        ignore_conflicts=True,
     )
+    activities_created.send(sender=Activity, user_ids=[user.pk])
+
+
+# =========================
+# FAN-OUT ON WRITE
+# =========================
+
+def _write_activities(*, content_type_id, object_id, type, due_date,
+                      course_id=None, student_title=None, direct=()):
+    """
+    Build every Activity row for one event in memory and write them with
+    chunked bulk inserts. Rows that already exist for
+    (user, content_type, object_id, type) are skipped, so running the same
+    fan-out twice is a no-op.
+    """
+    user_ids = [user_id for user_id, _ in direct]
+    rows = [
+        Activity(
+            user_id=user_id,
+            type=type,
+            title=title,
+            content_type_id=content_type_id,
+            object_id=object_id,
+            due_date=due_date,
+        )
+        for user_id, title in direct
+    ]
+
+    if course_id is not None:
+        student_ids = (
+            Enrollment.objects
+            .filter(course_id=course_id, status=Enrollment.STATUS_ACTIVE)
+            .values_list("user_id", flat=True)
+            .iterator(chunk_size=FANOUT_BATCH_SIZE)
+        )
+        for user_id in student_ids:
+            user_ids.append(user_id)
+            rows.append(Activity(
+                user_id=user_id,
+                type=type,
+                title=student_title,
+                content_type_id=content_type_id,
+                object_id=object_id,
+                due_date=due_date,
+            ))
+
+            if len(rows) >= FANOUT_BATCH_SIZE:
+                Activity.objects.bulk_create(rows, ignore_conflicts=True)
+                rows = []
+
+    if rows:
+        Activity.objects.bulk_create(
+            rows,
+            batch_size=FANOUT_BATCH_SIZE,
+            ignore_conflicts=True,
+        )
+
+    activities_created.send(sender=Activity, user_ids=user_ids)
+
+
+class _FanoutWorker:
+    """
+    Single background thread that drains fan-out jobs so the request that
+    triggered them does not wait for the inserts.
+    """
+
+    def __init__(self, maxsize=1000):
+        self._queue = queue.Queue(maxsize=maxsize)
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def _ensure_started(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run,
+                    name="activity-fanout",
+                    daemon=True,
+                )
+                self._thread.start()
+
+    def submit(self, job):
+        """Queue a job; returns False when the queue is full."""
+        self._ensure_started()
+        try:
+            self._queue.put_nowait(job)
+        except queue.Full:
+            return False
+        return True
+
+    def _run(self):
+        while True:
+            job = self._queue.get()
+            close_old_connections()
+            try:
+                _write_activities(**job)
+            except Exception:
+                logger.exception("Activity fan-out failed")
+            finally:
+                close_old_connections()
+                self._queue.task_done()
+
+
+_worker = _FanoutWorker()
+
+
+def _dispatch(job):
+    backend = getattr(settings, "ACTIVITY_FANOUT_BACKEND", "thread")
+
+    if backend == "thread" and _worker.submit(job):
+        return
+
+    # In-process fallback (queue full or worker disabled)
+    _write_activities(**job)
+
+
+def fan_out_activity(*, obj, type, due_date=None, course_id=None,
+                     student_title=None, direct=()):
+    """
+    Notify every active student of ``course_id`` (with ``student_title``)
+    plus the explicit ``direct`` recipients, given as (user_id, title)
+    pairs. The work runs after the surrounding transaction commits, off
+    the request path.
+    """
+    job = {
+        "content_type_id": ContentType.objects.get_for_model(obj).id,
+        "object_id": obj.id,
+        "type": type,
+        "due_date": due_date,
+        "course_id": course_id,
+        "student_title": student_title,
+        "direct": tuple(direct),
+    }
+    transaction.on_commit(lambda: _dispatch(job))
@@ -1,12 +1,12 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import post_init, post_save
 from django.dispatch import receiver
 
 from assignments.models import Assignment
 from quizzes.models import Quiz
 from livestream.models import LiveSession
-from enrollments.models import Enrollment
+from courses.models import SubjectTeacher
 
-from .services import create_activity
+from .services import fan_out_activity
 from .models import Activity
 
 
@@ -19,72 +19,62 @@ def assignment_created(sender, instance, created, **kwargs):
     if not created:
         return
 
-    course = instance.chapter.subject.course
-
-    students = Enrollment.objects.filter(
-        course=course,
-        status=Enrollment.STATUS_ACTIVE
-    ).select_related("user")
-
-    # 🔥 notify students
-    for enrollment in students:
-        create_activity(
-            user=enrollment.user,
-            obj=instance,
-            type=Activity.TYPE_ASSIGNMENT,
-            title=f"New assignment: {instance.title}",
-            due_date=instance.due_date
-        )
+    subject = instance.chapter.subject
 
     # 🔥 notify teacher
-    teachers = instance.chapter.subject.subject_teachers.select_related("teacher").all()
-    for st in teachers:
-        create_activity(
-            user=st.teacher,
-            obj=instance,
-            type=Activity.TYPE_ASSIGNMENT,
-            title=f"You created: {instance.title}",
-            due_date=instance.due_date
-        )
+    teacher_ids = SubjectTeacher.objects.filter(
+        subject_id=subject.id
+    ).values_list("teacher_id", flat=True)
+
+    # 🔥 notify students (background fan-out)
+    fan_out_activity(
+        obj=instance,
+        type=Activity.TYPE_ASSIGNMENT,
+        due_date=instance.due_date,
+        course_id=subject.course_id,
+        student_title=f"New assignment: {instance.title}",
+        direct=[
+            (teacher_id, f"You created: {instance.title}")
+            for teacher_id in teacher_ids
+        ],
+    )
 
 
 # =========================
 # QUIZ PUBLISHED
 # =========================
+@receiver(post_init, sender=Quiz)
+def remember_published(sender, instance, **kwargs):
+    # Deferred is_published reads as unpublished rather than being loaded
+    instance._was_published = instance.__dict__.get("is_published", False)
+
+
 @receiver(post_save, sender=Quiz)
 def quiz_published(sender, instance, created, **kwargs):
 
-    if not instance.is_published:
+    # Only the unpublished → published transition fans out
+    was_published = instance._was_published and not created
+    instance._was_published = instance.is_published
+    if not instance.is_published or was_published:
         return
 
-    course = instance.subject.course
-
-    students = Enrollment.objects.filter(
-        course=course,
-        status=Enrollment.STATUS_ACTIVE
-    ).select_related("user")
-
-    # 🔥 notify students
-    for enrollment in students:
-        create_activity(
-            user=enrollment.user,
-            obj=instance,
-            type=Activity.TYPE_QUIZ,
-            title=f"Quiz available: {instance.title}",
-            due_date=instance.due_date
-        )
-
     # 🔥 notify teacher (FIXED)
-    user = getattr(instance, "created_by", None)
-    if user:
-        create_activity(
-            user=user,
-            obj=instance,
-            type=Activity.TYPE_QUIZ,
-            title=f"You published quiz: {instance.title}",
-            due_date=instance.due_date
+    direct = []
+    if instance.created_by_id:
+        direct.append(
+            (instance.created_by_id, f"You published quiz: {instance.title}")
         )
 
+    # 🔥 notify students (deduped, so a re-publish is a no-op)
+    fan_out_activity(
+        obj=instance,
+        type=Activity.TYPE_QUIZ,
+        due_date=instance.due_date,
+        course_id=instance.subject.course_id,
+        student_title=f"Quiz available: {instance.title}",
+        direct=direct,
+    )
+
 
 # =========================
 # LIVE SESSION CREATED
@@ -95,32 +85,19 @@ def session_created(sender, instance, created, **kwargs):
     if not created:
         return
 
-    course = instance.course
-
-    students = Enrollment.objects.filter(
-        course=course,
-        status=Enrollment.STATUS_ACTIVE
-    ).select_related("user")
-
-    # 🔥 notify students
-    for enrollment in students:
-        create_activity(
-            user=enrollment.user,
-            obj=instance,
-            type=Activity.TYPE_SESSION,
-            title=f"Live session scheduled: {instance.title}",
-            due_date=instance.start_time
-        )
-
     # 🔥 notify teacher (FIXED)
-    user = getattr(instance, "created_by", None)
-    if user:
-        create_activity(
-            user=user,
-            obj=instance,
-            type=Activity.TYPE_SESSION,
-            title=f"You scheduled session: {instance.title}",
-            due_date=instance.start_time
+    direct = []
+    if instance.created_by_id:
+        direct.append(
+            (instance.created_by_id, f"You scheduled session: {instance.title}")
         )
 
-        
\ No newline at end of file
+    # 🔥 notify students
+    fan_out_activity(
+        obj=instance,
+        type=Activity.TYPE_SESSION,
+        due_date=instance.start_time,
+        course_id=instance.course_id,
+        student_title=f"Live session scheduled: {instance.title}",
+        direct=direct,
+    )
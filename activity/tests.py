@@ -1,3 +1,171 @@
-from django.test import TestCase
+"""
+Tests for activity — fan-out on write.
 
-# Create your tests here.
+Covers:
+  - Students and teacher get one Activity each when a quiz is published
+  - Re-saving a published quiz does not duplicate activities or fan out
+    again; only the unpublished → published transition does
+  - The publishing request does not scale with course size
+  - The feed is keyset paginated through the Link header
+"""
+
+import re
+import uuid
+from datetime import timedelta
+from unittest.mock import patch
+
+from django.contrib.contenttypes.models import ContentType
+
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from accounts.models import User
+from courses.models import Course, Subject
+from enrollments.models import Enrollment
+from quizzes.models import Quiz
+from .models import Activity
+
+
+@override_settings(ACTIVITY_FANOUT_BACKEND="sync")
+class QuizFanOutTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = User.objects.create_user(
+            username="fanoutteacher",
+            email="fanoutteacher@test.com",
+            password="testpass123",
+        )
+        cls.course = Course.objects.create(title="Class 9")
+        cls.subject = Subject.objects.create(course=cls.course, name="Science")
+
+    def enroll_students(self, count, start=0):
+        users = User.objects.bulk_create([
+            User(username=f"fan{i}", email=f"fan{i}@test.com")
+            for i in range(start, start + count)
+        ])
+        Enrollment.objects.bulk_create([
+            Enrollment(user=user, course=self.course) for user in users
+        ])
+
+    def create_quiz(self, is_published=False):
+        return Quiz.objects.create(
+            subject=self.subject,
+            created_by=self.teacher,
+            title="Weekly test",
+            due_date=timezone.now() + timedelta(days=3),
+            is_published=is_published,
+        )
+
+    def publish(self, quiz):
+        quiz.is_published = True
+        quiz.save()
+
+    def test_fan_out_creates_one_row_per_recipient(self):
+        self.enroll_students(30)
+        quiz = self.create_quiz()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.publish(quiz)
+
+        self.assertEqual(Activity.objects.filter(type=Activity.TYPE_QUIZ).count(), 31)
+        self.assertTrue(
+            Activity.objects.filter(
+                user=self.teacher, title="You published quiz: Weekly test"
+            ).exists()
+        )
+
+    def test_resave_is_idempotent(self):
+        self.enroll_students(10)
+        quiz = self.create_quiz()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.publish(quiz)
+        with self.captureOnCommitCallbacks(execute=True):
+            quiz.save()
+
+        self.assertEqual(Activity.objects.count(), 11)
+
+    def test_resave_of_published_quiz_does_not_fan_out(self):
+        self.enroll_students(10)
+        quiz = self.create_quiz()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.publish(quiz)
+        with patch("activity.signals.fan_out_activity") as fan_out:
+            with CaptureQueriesContext(connection) as ctx:
+                quiz.title = "Weekly test (edited)"
+                quiz.save()
+            loaded = Quiz.objects.get(pk=quiz.pk)
+            loaded.title = "Weekly test (loaded)"
+            loaded.save()
+
+        fan_out.assert_not_called()
+        self.assertFalse(any(
+            query["sql"].startswith("SELECT") and "quizzes_quiz" in query["sql"]
+            for query in ctx.captured_queries
+        ))
+
+    def test_publish_cost_independent_of_course_size(self):
+        counts = []
+        created = 0
+        for size in (10, 200):
+            self.enroll_students(size - created, start=created)
+            created = size
+            quiz = self.create_quiz()
+
+            with self.captureOnCommitCallbacks(execute=False):
+                with CaptureQueriesContext(connection) as ctx:
+                    self.publish(quiz)
+            counts.append(len(ctx.captured_queries))
+
+        self.assertEqual(counts[0], counts[1])
+
+
+class ActivityFeedTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username="feeduser",
+            email="feeduser@test.com",
+            password="testpass123",
+        )
+        content_type = ContentType.objects.get_for_model(Quiz)
+        cls.activities = Activity.objects.bulk_create([
+            Activity(
+                user=cls.user,
+                type=Activity.TYPE_QUIZ,
+                title=f"Quiz {i}",
+                content_type=content_type,
+                object_id=uuid.uuid4(),
+            )
+            for i in range(45)
+        ])
+
+    def next_url(self, res):
+        match = re.search(r'<([^>]+)>; rel="next"', res.get("Link", ""))
+        return match.group(1) if match else None
+
+    def test_feed_walks_all_activities_via_link_header(self):
+        client = APIClient()
+        client.force_authenticate(user=self.user)
+
+        res = client.get("/api/activity/feed/")
+        self.assertEqual(len(res.data), 20)
+
+        seen = [a["id"] for a in res.data]
+        url = self.next_url(res)
+        while url:
+            res = client.get(url)
+            seen.extend(a["id"] for a in res.data)
+            url = self.next_url(res)
+
+        self.assertEqual(len(seen), 45)
+        self.assertEqual(
+            {str(i) for i in seen},
+            {str(a.id) for a in self.activities},
+        )
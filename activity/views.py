@@ -1,7 +1,9 @@
 from rest_framework.views import APIView
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
 
+from config.pagination import KeysetPaginator
 from .models import Activity
 from .serializers import ActivitySerializer
 
@@ -12,10 +14,22 @@ class ActivityFeedView(APIView):
 
     def get(self, request):
 
-        activities = Activity.objects.filter(
-            user=request.user
-        )[:20]
-
-        serializer = ActivitySerializer(activities, many=True)
-
-        return Response(serializer.data)
+        paginator = KeysetPaginator(ordering=["-created_at", "-id"], page_size=20)
+        page = paginator.paginate(
+            Activity.objects.filter(user=request.user),
+            request,
+        )
+
+        serializer = ActivitySerializer(page.items, many=True)
+
+        # Body stays a plain list; cursors travel in the Link header
+        links = []
+        url = request.build_absolute_uri()
+        for rel, cursor in (("next", page.next_cursor), ("prev", page.previous_cursor)):
+            if cursor:
+                links.append(
+                    f'<{replace_query_param(url, paginator.cursor_param, cursor)}>; rel="{rel}"'
+                )
+
+        headers = {"Link": ", ".join(links)} if links else None
+        return Response(serializer.data, headers=headers)
@@ -1,23 +1,34 @@
 import os
 
 from channels.routing import ProtocolTypeRouter, URLRouter
+from django.conf import settings
 from django.core.asgi import get_asgi_application
 from channels.auth import AuthMiddlewareStack
-
-import livestream.routing
-import sessions_app.routing
+from channels.security.websocket import OriginValidator
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
 
 django_asgi_app = get_asgi_application()
 
+# Imported once the app registry is ready (consumers import models)
+from accounts.authentication import CookieJWTAuthMiddleware  # noqa: E402
+import livestream.routing  # noqa: E402
+import sessions_app.routing  # noqa: E402
+
 application = ProtocolTypeRouter({
     "http": django_asgi_app,
 
-    "websocket": AuthMiddlewareStack(
-        URLRouter(
-            livestream.routing.websocket_urlpatterns
-            + sessions_app.routing.websocket_urlpatterns
-        )
+    # Sockets authenticate from the cross-site access cookie, so only the
+    # frontends allowed by CORS may open them
+    "websocket": OriginValidator(
+        AuthMiddlewareStack(
+            CookieJWTAuthMiddleware(
+                URLRouter(
+                    livestream.routing.websocket_urlpatterns
+                    + sessions_app.routing.websocket_urlpatterns
+                )
+            )
+        ),
+        settings.CORS_ALLOWED_ORIGINS,
     ),
 })
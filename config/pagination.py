@@ -0,0 +1,167 @@
+"""
+Keyset (cursor) pagination.
+
+Pages are addressed by the sort key of a boundary row instead of an OFFSET,
+so every page is one index range scan no matter how deep the client goes.
+Cursors are opaque to clients (base64 of the boundary key plus direction).
+
+    paginator = KeysetPaginator(ordering=["-created_at", "-id"])
+    page = paginator.paginate(queryset, request)
+    page.items, page.next_cursor, page.previous_cursor, page.count
+"""
+import base64
+import datetime
+import hashlib
+import json
+import uuid
+
+from django.core.cache import cache
+from django.core.exceptions import EmptyResultSet, FieldDoesNotExist
+from django.db.models import Q
+from rest_framework.exceptions import ValidationError
+
+
+class KeysetPage:
+    def __init__(self, items, next_cursor, previous_cursor, count=None):
+        self.items = items
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+        self.count = count
+
+
+def _encode_value(value):
+    if isinstance(value, (datetime.datetime, datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    return value
+
+
+class KeysetPaginator:
+    cursor_param = "cursor"
+    page_size_param = "page_size"
+
+    # Seconds a cached total stays valid (cached_count=True)
+    count_cache_timeout = 60
+
+    def __init__(self, ordering, page_size=10, max_page_size=100, cached_count=False):
+        # ordering: ["-upvote_count", "-created_at", "-id"]; must be unique
+        self.ordering = [
+            (name.lstrip("-"), name.startswith("-")) for name in ordering
+        ]
+        self.page_size = page_size
+        self.max_page_size = max_page_size
+        self.cached_count = cached_count
+
+    # ---------------------------------------------
+    # Cursor encoding
+    # ---------------------------------------------
+    def _row_key(self, row):
+        if isinstance(row, dict):
+            return [_encode_value(row[name]) for name, _ in self.ordering]
+        return [_encode_value(getattr(row, name)) for name, _ in self.ordering]
+
+    def encode_cursor(self, row, reverse=False):
+        payload = json.dumps({"k": self._row_key(row), "r": int(reverse)})
+        return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+    def decode_cursor(self, cursor, model):
+        try:
+            padded = cursor + "=" * (-len(cursor) % 4)
+            payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+            raw_values = payload["k"]
+            reverse = bool(payload.get("r"))
+            if len(raw_values) != len(self.ordering):
+                raise ValueError
+        except (ValueError, KeyError, TypeError):
+            raise ValidationError({self.cursor_param: "Invalid cursor."})
+
+        values = []
+        for (name, _), raw in zip(self.ordering, raw_values):
+            try:
+                field = model._meta.get_field(name)
+            except FieldDoesNotExist:
+                # Annotation (e.g. a count); JSON already has the right type
+                values.append(raw)
+                continue
+            try:
+                values.append(field.to_python(raw))
+            except Exception:
+                raise ValidationError({self.cursor_param: "Invalid cursor."})
+
+        return values, reverse
+
+    # ---------------------------------------------
+    # Query building
+    # ---------------------------------------------
+    def _order_by(self, reverse):
+        return [
+            f"{'-' if desc != reverse else ''}{name}"
+            for name, desc in self.ordering
+        ]
+
+    def _after(self, values, reverse):
+        """Rows strictly after ``values`` in the (possibly reversed) order."""
+        condition = Q()
+        for i, (name, desc) in enumerate(self.ordering):
+            op = "lt" if desc != reverse else "gt"
+            term = Q(**{f"{name}__{op}": values[i]})
+            for j in range(i):
+                term &= Q(**{self.ordering[j][0]: values[j]})
+            condition |= term
+        return condition
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params.get(self.page_size_param, self.page_size))
+        except (TypeError, ValueError):
+            size = self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def get_count(self, queryset):
+        if not self.cached_count:
+            return None
+        try:
+            sql, params = queryset.order_by().query.sql_with_params()
+        except EmptyResultSet:
+            return 0
+        digest = hashlib.md5(f"{sql}|{params}".encode()).hexdigest()
+        return cache.get_or_set(
+            f"keyset_count:{digest}",
+            lambda: queryset.order_by().count(),
+            self.count_cache_timeout,
+        )
+
+    def paginate(self, queryset, request):
+        page_size = self.get_page_size(request)
+        cursor = request.query_params.get(self.cursor_param)
+
+        values, reverse = None, False
+        if cursor:
+            values, reverse = self.decode_cursor(cursor, queryset.model)
+
+        qs = queryset.order_by(*self._order_by(reverse))
+        if values is not None:
+            qs = qs.filter(self._after(values, reverse))
+
+        rows = list(qs[:page_size + 1])
+        has_more = len(rows) > page_size
+        rows = rows[:page_size]
+        if reverse:
+            rows.reverse()
+
+        next_cursor = previous_cursor = None
+        if rows:
+            # Walking forward: more rows ahead if we over-fetched, and rows
+            # behind if we started from a cursor. Backward is the mirror.
+            if (has_more and not reverse) or (reverse and cursor):
+                next_cursor = self.encode_cursor(rows[-1])
+            if (has_more and reverse) or (not reverse and cursor):
+                previous_cursor = self.encode_cursor(rows[0], reverse=True)
+
+        return KeysetPage(
+            items=rows,
+            next_cursor=next_cursor,
+            previous_cursor=previous_cursor,
+            count=self.get_count(queryset),
+        )
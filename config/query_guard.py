@@ -0,0 +1,39 @@
+"""
+Fail loudly when code that should only read preloaded data hits the database.
+
+    with forbid_queries("SubjectSerializer"):
+        serializer.to_representation(obj)
+
+Active only when settings.DEBUG is on (or QUERY_GUARD=True), so production
+requests never pay for it.
+"""
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.db import connections
+
+
+class LazyQueryError(RuntimeError):
+    pass
+
+
+def query_guard_enabled():
+    return getattr(settings, "QUERY_GUARD", settings.DEBUG)
+
+
+@contextmanager
+def forbid_queries(label):
+    if not query_guard_enabled():
+        yield
+        return
+
+    def blocker(execute, sql, params, many, context):
+        raise LazyQueryError(
+            f"{label} ran a query on preloaded data; add it to the "
+            f"queryset's select_related/prefetch_related instead.\n{sql}"
+        )
+
+    with ExitStack() as stack:
+        for conn in connections.all():
+            stack.enter_context(conn.execute_wrapper(blocker))
+        yield
@@ -110,6 +110,15 @@ DATABASES = {
         'PASSWORD': os.getenv('DB_PASSWORD'),
         'HOST': os.getenv('DB_HOST'),
         'PORT': os.getenv('DB_PORT'),
+        # psycopg connection pool, shared by request threads and the
+        # dashboard section workers; closing a connection returns it here
+        'OPTIONS': {
+            'pool': {
+                'min_size': int(os.getenv('DB_POOL_MIN_SIZE', '2')),
+                'max_size': int(os.getenv('DB_POOL_MAX_SIZE', '20')),
+                'timeout': int(os.getenv('DB_POOL_TIMEOUT', '10')),
+            },
+        },
     }
 }
 
@@ -283,4 +292,53 @@ CHANNEL_LAYERS = {
     },
 }
 
+# Live-session state machine (livestream.services.session_state). Redis
+# holds running sessions; `manage.py flush_live_state` writes them back.
+LIVE_STATE_REDIS_URL = os.getenv("LIVE_STATE_REDIS_URL", "redis://127.0.0.1:6379/0")
+LIVE_STATE_FLUSH_BATCH = int(os.getenv("LIVE_STATE_FLUSH_BATCH", "500"))
+
+# Shared cache (role resolution, quiz snapshots, etc.). Use Redis in
+# production so that invalidation is seen by every worker; fall back to
+# per-process memory.
+REDIS_CACHE_URL = os.getenv("REDIS_CACHE_URL")
+
+# Whether CACHES is visible to every worker. Data whose staleness is a
+# correctness problem (role sets) is only cached across requests when it is.
+SHARED_CACHE = bool(REDIS_CACHE_URL)
+
+if REDIS_CACHE_URL:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": REDIS_CACHE_URL,
+        },
+        "quiz_snapshots": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": REDIS_CACHE_URL,
+            "KEY_PREFIX": "quiz_snapshots",
+        },
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        },
+        "quiz_snapshots": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": "quiz_snapshots",
+        },
+    }
+
+# Cache alias that holds compiled quiz snapshots (quizzes.snapshot)
+QUIZ_SNAPSHOT_CACHE = "quiz_snapshots"
+
+# Activity fan-out: "thread" runs it on a background worker after commit,
+# "sync" runs it inline (after commit) in the current process.
+ACTIVITY_FANOUT_BACKEND = os.getenv("ACTIVITY_FANOUT_BACKEND", "thread")
+
+# Dashboard sections run concurrently on a pool of this many threads (each
+# borrows one pooled DB connection per section). 1 runs them serially in the
+# request.
+DASHBOARD_SECTION_WORKERS = int(os.getenv("DASHBOARD_SECTION_WORKERS", "4"))
+
 GNEWS_API_KEY = os.getenv("GNEWS_API_KEY")
@@ -0,0 +1,202 @@
+"""
+Course catalog: Course → Subject → Chapter (with Board, Stream and the
+subject teachers), built once into plain dicts and shared by every
+catalog endpoint.
+
+The tree is stored under a catalog version. courses.signals bumps the
+version (on commit) whenever any of those rows are saved or deleted; the
+next read rebuilds once and, with a shared cache (settings.SHARED_CACHE),
+every worker picks the new tree up from it. Each process also keeps the
+current tree in memory, so a steady state read is one cache round trip
+for the version and no database work.
+
+Without a shared cache a bump is only seen by the process that made it,
+so there the version lapses after CATALOG_LOCAL_VERSION_TIMEOUT and other
+workers rebuild at most that long after a write.
+
+The version doubles as the ETag of catalog responses.
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import Chapter, Course, Subject
+from .services import subject_teachers_queryset, subject_teachers_rows
+
+
+CATALOG_CACHE_TIMEOUT = 60 * 60 * 24  # seconds
+CATALOG_LOCAL_VERSION_TIMEOUT = 60 * 5  # seconds, per-process caches only
+CATALOG_VERSION_KEY = "courses:catalog:version"
+
+# (version, tree) for this process; replaced wholesale, never mutated
+_memory = {}
+
+
+def _tree_key(version):
+    return f"courses:catalog:tree:{version}"
+
+
+# =========================
+# VERSION
+# =========================
+def _version_timeout():
+    return None if settings.SHARED_CACHE else CATALOG_LOCAL_VERSION_TIMEOUT
+
+
+def get_catalog_version():
+    version = cache.get(CATALOG_VERSION_KEY)
+    if version is None:
+        cache.add(CATALOG_VERSION_KEY, time.time_ns(), _version_timeout())
+        version = cache.get(CATALOG_VERSION_KEY)
+    return version
+
+
+def bump_catalog_version():
+    transaction.on_commit(
+        lambda: cache.set(CATALOG_VERSION_KEY, time.time_ns(), _version_timeout())
+    )
+
+
+# =========================
+# TREE
+# =========================
+def build_catalog():
+    courses = {}
+    for course in Course.objects.select_related("board", "stream").order_by("title", "id"):
+        courses[str(course.id)] = {
+            "id": str(course.id),
+            "title": course.title,
+            "description": course.description,
+            "stream_name": course.stream.name if course.stream else None,
+            "board": {
+                "id": str(course.board.id),
+                "name": course.board.name,
+                "board_type": course.board.board_type,
+            } if course.board else None,
+            "subject_ids": [],
+        }
+
+    subjects = {}
+    for subject in Subject.objects.order_by("course_id", "order", "id"):
+        subject_id = str(subject.id)
+        subjects[subject_id] = {
+            "id": subject_id,
+            "name": subject.name,
+            "order": subject.order,
+            "image": subject.image.url if subject.image else None,
+            "course_id": str(subject.course_id),
+            "teachers": [],
+            "chapters": [],
+        }
+        courses[str(subject.course_id)]["subject_ids"].append(subject_id)
+
+    for chapter in Chapter.objects.order_by("subject_id", "order", "id"):
+        subjects[str(chapter.subject_id)]["chapters"].append({
+            "id": str(chapter.id),
+            "title": chapter.title,
+            "order": chapter.order,
+        })
+
+    subject_teachers = list(subject_teachers_queryset())
+    for st, row in zip(subject_teachers, subject_teachers_rows(subject_teachers)):
+        row["id"] = str(row["id"])
+        subjects[str(st.subject_id)]["teachers"].append(row)
+
+    return {"courses": courses, "subjects": subjects}
+
+
+def get_catalog():
+    """Returns (version, tree)."""
+    version = get_catalog_version()
+
+    current = _memory.get("catalog")
+    if current and current[0] == version:
+        return current
+
+    tree = cache.get(_tree_key(version))
+    if tree is None:
+        tree = build_catalog()
+        cache.set(_tree_key(version), tree, CATALOG_CACHE_TIMEOUT)
+
+    _memory["catalog"] = (version, tree)
+    return version, tree
+
+
+def catalog_etag(version, *parts):
+    digest = hashlib.md5(
+        "|".join(str(part) for part in (version, *parts)).encode()
+    ).hexdigest()
+    return f'"{digest}"'
+
+
+# =========================
+# READS
+# =========================
+def course_subjects(tree, course_id, request=None):
+    """Same shape as SubjectSerializer(many=True)."""
+    course = tree["courses"].get(str(course_id))
+    if course is None:
+        return []
+
+    data = []
+    for subject_id in course["subject_ids"]:
+        subject = tree["subjects"][subject_id]
+        image = subject["image"]
+        if image and request:
+            image = request.build_absolute_uri(image)
+
+        data.append({
+            "id": subject["id"],
+            "name": subject["name"],
+            "order": subject["order"],
+            "image": image,
+            "teachers": subject["teachers"],
+            "chapters": subject["chapters"],
+            "stream_name": course["stream_name"],
+            "board": course["board"],
+        })
+    return data
+
+
+def subject_chapters(tree, subject_id):
+    subject = tree["subjects"].get(str(subject_id))
+    return subject["chapters"] if subject else []
+
+
+def subject_names_by_course_title(tree):
+    return {
+        course["title"]: [
+            tree["subjects"][subject_id]["name"]
+            for subject_id in course["subject_ids"]
+        ]
+        for course in tree["courses"].values()
+    }
+
+
+def subject_names_matching_course_title(tree, course_title):
+    needle = course_title.casefold()
+    names = []
+    for course in tree["courses"].values():
+        if needle not in course["title"].casefold():
+            continue
+        for subject_id in course["subject_ids"]:
+            name = tree["subjects"][subject_id]["name"]
+            if name not in names:
+                names.append(name)
+    return names
+
+
+def subjects_for_courses(tree, course_ids):
+    course_ids = {str(course_id) for course_id in course_ids}
+    courses = sorted(
+        (c for c in tree["courses"].values() if c["id"] in course_ids),
+        key=lambda c: c["title"],
+    )
+    return [
+        {"id": subject_id, "name": tree["subjects"][subject_id]["name"]}
+        for course in courses
+        for subject_id in course["subject_ids"]
+    ]
@@ -1,10 +1,18 @@
 from .models_recordings import SessionRecording
 from .models import Chapter
+from django.db.models import Prefetch
 from rest_framework import serializers
+from config.query_guard import forbid_queries
 from .models import Subject, Course, Board
+from .services import subject_teachers_queryset, subject_teachers_rows
 
 
 class SubjectSerializer(serializers.ModelSerializer):
+    """
+    Reads teachers and chapters from prefetched data only; build the
+    queryset with SubjectSerializer.setup_queryset(). In DEBUG a lazy
+    query raises LazyQueryError.
+    """
     teachers = serializers.SerializerMethodField()
     chapters = serializers.SerializerMethodField() 
     image = serializers.SerializerMethodField()   # ✅ added
@@ -24,7 +32,22 @@ class SubjectSerializer(serializers.ModelSerializer):
             "stream_name",
             "board",
         )
-        
+
+    @staticmethod
+    def setup_queryset(queryset):
+        return (
+            queryset
+            .select_related("course__stream", "course__board")
+            .prefetch_related(
+                Prefetch("subject_teachers", queryset=subject_teachers_queryset()),
+                Prefetch("chapters", queryset=Chapter.objects.order_by("order")),
+            )
+        )
+
+    def to_representation(self, instance):
+        with forbid_queries("SubjectSerializer"):
+            return super().to_representation(instance)
+
     def get_image(self, obj):
         request = self.context.get('request')
 
@@ -36,29 +59,7 @@ class SubjectSerializer(serializers.ModelSerializer):
         return None
 
     def get_teachers(self, obj):
-        subject_teachers = (
-            obj.subject_teachers
-            .select_related("teacher__teacher_profile")
-            .order_by("order")
-        )
-
-        data = []
-
-        for st in subject_teachers:
-            teacher = st.teacher
-            profile = getattr(teacher, "teacher_profile", None)
-
-            data.append({
-                "id": teacher.id,
-                "name": getattr(teacher, 'profile', None) and teacher.profile.full_name or teacher.username,
-                "display_role": st.display_role,
-                "qualification": profile.qualification if profile else "",
-                "bio": profile.bio if profile else "",
-                "rating": profile.rating if profile else None,
-                "photo": profile.photo.url if profile and profile.photo else None,
-            })
-
-        return data
+        return subject_teachers_rows(obj.subject_teachers.all())
 
     # ✅ NEW METHOD
     def get_chapters(self, obj):
@@ -68,7 +69,7 @@ class SubjectSerializer(serializers.ModelSerializer):
                 "title": ch.title,
                 "order": ch.order,
             }
-            for ch in obj.chapters.all().order_by("order")
+            for ch in obj.chapters.all()
         ]
 
     def get_board(self, obj):
@@ -0,0 +1,251 @@
+"""
+Subject dashboard statistics.
+
+Counters that are the same for every viewer (totals, students, recordings,
+materials, teachers) are computed in one aggregate query and cached per
+subject; courses.signals drops the entry when any of the underlying rows
+change. Access checks and the viewer's own completions are resolved
+together with the subject row itself in a second query.
+
+Student rosters are one row per user, deduplicated in SQL and projected
+with values(), so they can be keyset-paginated or streamed.
+"""
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Exists, F, IntegerField, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from accounts.models import Profile, User
+from assignments.models import Assignment
+from enrollments.models import Enrollment
+from materials.models import StudyMaterial
+from quizzes.models import Quiz, QuizAttempt
+
+from .models import Subject, SubjectTeacher
+from .models_recordings import SessionRecording
+
+
+SUBJECT_STATS_CACHE_TIMEOUT = 60 * 10  # seconds
+
+_AVATAR_STORAGE = Profile._meta.get_field("avatar_image").storage
+
+
+def _count(queryset, field="pk", filter=None, distinct=False):
+    """Correlated ``COUNT`` subquery (no join fan-out on the outer row)."""
+    return Coalesce(
+        Subquery(
+            queryset
+            .order_by()
+            .annotate(_group=Value(1))
+            .values("_group")
+            .annotate(n=Count(field, filter=filter, distinct=distinct))
+            .values("n"),
+            output_field=IntegerField(),
+        ),
+        Value(0),
+    )
+
+
+# =========================
+# VIEWER-INDEPENDENT (cached)
+# =========================
+def _stats_key(subject_id):
+    return f"courses:subject_stats:{subject_id}"
+
+
+def subject_teachers_queryset():
+    return (
+        SubjectTeacher.objects
+        .select_related("teacher__profile", "teacher__teacher_profile")
+        .order_by("order")
+    )
+
+
+def subject_teachers_rows(subject_teachers):
+    """Serialize SubjectTeacher rows loaded via subject_teachers_queryset()."""
+    data = []
+
+    for st in subject_teachers:
+        teacher = st.teacher
+        profile = getattr(teacher, "teacher_profile", None)
+
+        data.append({
+            "id": teacher.id,
+            "name": getattr(teacher, 'profile', None) and teacher.profile.full_name or teacher.username,
+            "display_role": st.display_role,
+            "qualification": profile.qualification if profile else "",
+            "bio": profile.bio if profile else "",
+            "rating": profile.rating if profile else None,
+            "photo": profile.photo.url if profile and profile.photo else None,
+        })
+
+    return data
+
+
+def subject_teachers_data(subject_id):
+    return subject_teachers_rows(
+        subject_teachers_queryset().filter(subject_id=subject_id)
+    )
+
+
+def compute_subject_counters(subject_id):
+    counters = (
+        Subject.objects
+        .filter(pk=subject_id)
+        .values(
+            total_assignments=_count(
+                Assignment.objects.filter(chapter__subject=OuterRef("pk"))
+            ),
+            total_quizzes=_count(
+                Quiz.objects.filter(subject=OuterRef("pk")),
+                filter=Q(is_published=True),
+            ),
+            recordings_count=_count(
+                SessionRecording.objects.filter(subject=OuterRef("pk"))
+            ),
+            study_materials_count=_count(
+                StudyMaterial.objects.filter(chapter__subject=OuterRef("pk"))
+            ),
+            students_count=Coalesce("course__stats__active_students", 0),
+        )
+        .first()
+    )
+    if counters is None:
+        return None
+
+    counters["teachers"] = subject_teachers_data(subject_id)
+    return counters
+
+
+def get_subject_counters(subject_id):
+    key = _stats_key(subject_id)
+    counters = cache.get(key)
+    if counters is None:
+        counters = compute_subject_counters(subject_id)
+        if counters is not None:
+            cache.set(key, counters, SUBJECT_STATS_CACHE_TIMEOUT)
+    return counters
+
+
+def invalidate_subject_stats(subject_ids):
+    keys = [_stats_key(subject_id) for subject_id in subject_ids if subject_id]
+    if keys:
+        transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+# =========================
+# PER VIEWER
+# =========================
+def get_subject_for_viewer(subject_id, user):
+    """
+    The subject row plus ``is_assigned``/``is_enrolled`` access flags and the
+    viewer's completed assignment/quiz counts, in one query.
+    """
+    return (
+        Subject.objects
+        .filter(pk=subject_id)
+        .annotate(
+            is_assigned=Exists(
+                SubjectTeacher.objects.filter(subject=OuterRef("pk"), teacher=user)
+            ),
+            is_enrolled=Exists(
+                Enrollment.objects.filter(
+                    course=OuterRef("course_id"),
+                    user=user,
+                    status=Enrollment.STATUS_ACTIVE,
+                )
+            ),
+            completed_assignments=_count(
+                Assignment.objects.filter(chapter__subject=OuterRef("pk")),
+                filter=Q(submissions__student=user),
+                distinct=True,
+            ),
+            completed_quizzes=_count(
+                Quiz.objects.filter(subject=OuterRef("pk"), is_published=True),
+                filter=Q(
+                    attempts__student=user,
+                    attempts__status=QuizAttempt.STATUS_SUBMITTED,
+                ),
+                distinct=True,
+            ),
+        )
+        .first()
+    )
+
+
+# =========================
+# STUDENT ROSTERS
+# =========================
+ROSTER_ORDERINGS = {
+    "name": ["full_name", "id"],
+    "-name": ["-full_name", "-id"],
+    "email": ["email", "id"],
+    "-email": ["-email", "-id"],
+    "newest": ["-enrolled_at", "-id"],
+    "oldest": ["enrolled_at", "id"],
+}
+
+ROSTER_FIELDS = [
+    "id", "email", "username", "full_name", "phone", "student_id",
+    "avatar_image", "avatar_emoji", "course_title", "enrolled_at", "batch_code",
+]
+
+
+def roster_queryset(course_ids, search=None):
+    """
+    One row per student actively enrolled in any of ``course_ids``, as
+    ``values()`` dicts with ROSTER_FIELDS. Students in several of the
+    courses appear once, with their earliest enrollment.
+    """
+    enrollments = Enrollment.objects.filter(
+        user=OuterRef("pk"),
+        course_id__in=course_ids,
+        status=Enrollment.STATUS_ACTIVE,
+    ).order_by("enrolled_at", "id")
+
+    def first(field):
+        return Subquery(enrollments.values(field)[:1])
+
+    queryset = (
+        User.objects
+        .filter(Exists(enrollments))
+        .annotate(
+            full_name=Coalesce("profile__full_name", Value("")),
+            phone=Coalesce("profile__phone", Value("")),
+            student_id=Coalesce("profile__student_id", Value("")),
+            avatar_image=F("profile__avatar_image"),
+            avatar_emoji=F("profile__avatar_emoji"),
+            course_title=first("course__title"),
+            enrolled_at=first("enrolled_at"),
+            batch_code=Coalesce(first("batch_code"), Value("")),
+        )
+    )
+
+    if search:
+        queryset = queryset.filter(
+            Q(full_name__icontains=search)
+            | Q(email__icontains=search)
+            | Q(username__icontains=search)
+            | Q(student_id__icontains=search)
+        )
+
+    return queryset.values(*ROSTER_FIELDS)
+
+
+def roster_row(row):
+    """Shape a roster_queryset() row like the old per-enrollment payload."""
+    avatar_image = row.pop("avatar_image")
+    avatar_emoji = row.pop("avatar_emoji")
+
+    if avatar_image:
+        row["avatar_type"] = "image"
+        row["avatar"] = _AVATAR_STORAGE.url(avatar_image)
+    elif avatar_emoji:
+        row["avatar_type"] = "emoji"
+        row["avatar"] = avatar_emoji
+    else:
+        row["avatar_type"] = row["avatar"] = None
+
+    row["id"] = str(row["id"])
+    return row
+
@@ -0,0 +1,100 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from accounts.models import Profile, TeacherProfile
+from assignments.models import Assignment
+from enrollments.models import Enrollment
+from materials.models import StudyMaterial
+from quizzes.models import Quiz
+
+from .catalog import bump_catalog_version
+from .models import Board, Chapter, Course, Stream, Subject, SubjectTeacher
+from .models_recordings import SessionRecording
+from .services import invalidate_subject_stats
+
+
+def _subject_of_chapter(chapter_id):
+    return (
+        Chapter.objects
+        .filter(pk=chapter_id)
+        .values_list("subject_id", flat=True)
+        .first()
+    )
+
+
+# =========================
+# SUBJECT STATS INVALIDATION
+# =========================
+@receiver(post_save, sender=Assignment)
+@receiver(post_delete, sender=Assignment)
+def assignment_changed(sender, instance, **kwargs):
+    invalidate_subject_stats([_subject_of_chapter(instance.chapter_id)])
+
+
+@receiver(post_save, sender=StudyMaterial)
+@receiver(post_delete, sender=StudyMaterial)
+def material_changed(sender, instance, **kwargs):
+    invalidate_subject_stats([_subject_of_chapter(instance.chapter_id)])
+
+
+@receiver(post_delete, sender=Chapter)
+def chapter_deleted(sender, instance, **kwargs):
+    invalidate_subject_stats([instance.subject_id])
+
+
+@receiver(post_save, sender=Quiz)
+@receiver(post_delete, sender=Quiz)
+def quiz_changed(sender, instance, **kwargs):
+    invalidate_subject_stats([instance.subject_id])
+
+
+@receiver(post_save, sender=SessionRecording)
+@receiver(post_delete, sender=SessionRecording)
+def recording_changed(sender, instance, **kwargs):
+    invalidate_subject_stats([instance.subject_id])
+
+
+@receiver(post_save, sender=SubjectTeacher)
+@receiver(post_delete, sender=SubjectTeacher)
+def subject_teacher_changed(sender, instance, **kwargs):
+    invalidate_subject_stats([instance.subject_id])
+
+
+@receiver(post_save, sender=Enrollment)
+@receiver(post_delete, sender=Enrollment)
+def enrollment_changed(sender, instance, **kwargs):
+    invalidate_subject_stats(
+        Subject.objects.filter(course_id=instance.course_id).values_list("id", flat=True)
+    )
+
+
+@receiver(post_save, sender=Profile)
+@receiver(post_save, sender=TeacherProfile)
+def teacher_profile_changed(sender, instance, **kwargs):
+    # Teacher cards (name, photo, bio) are part of the cached stats
+    # and of the catalog tree
+    subject_ids = list(
+        SubjectTeacher.objects.filter(teacher_id=instance.user_id).values_list("subject_id", flat=True)
+    )
+    invalidate_subject_stats(subject_ids)
+    if subject_ids:
+        bump_catalog_version()
+
+
+# =========================
+# CATALOG VERSION
+# =========================
+@receiver(post_save, sender=Course)
+@receiver(post_delete, sender=Course)
+@receiver(post_save, sender=Subject)
+@receiver(post_delete, sender=Subject)
+@receiver(post_save, sender=Chapter)
+@receiver(post_delete, sender=Chapter)
+@receiver(post_save, sender=Board)
+@receiver(post_delete, sender=Board)
+@receiver(post_save, sender=Stream)
+@receiver(post_delete, sender=Stream)
+@receiver(post_save, sender=SubjectTeacher)
+@receiver(post_delete, sender=SubjectTeacher)
+def catalog_changed(sender, **kwargs):
+    bump_catalog_version()
@@ -1,3 +1,353 @@
-from django.test import TestCase
+"""
+Tests for courses — subject dashboard statistics and student rosters.
 
-# Create your tests here.
+Covers:
+  - Counters and the viewer's completions match the underlying rows
+  - Access checks for unassigned teachers and unenrolled students
+  - Constant query count, with cached counters on repeat loads
+  - Cached counters are dropped when assignments / enrollments change
+  - Rosters: one row per student across courses, keyset pages, sorting,
+    search, and streamed CSV / NDJSON exports
+  - SubjectSerializer refuses lazy queries in DEBUG
+  - Catalog endpoints are served from the cached tree without queries,
+    answer If-None-Match with 304 and change ETag after catalog writes;
+    without a shared cache the version lapses so other workers catch up
+"""
+
+import json
+import time
+from datetime import timedelta
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from accounts.models import User, Role, UserRole
+from config.query_guard import LazyQueryError
+from assignments.models import Assignment, AssignmentSubmission
+from enrollments.models import Enrollment
+from materials.models import StudyMaterial
+from quizzes.models import Quiz, QuizAttempt
+from . import catalog
+from .models import Course, Subject, Chapter, SubjectTeacher
+from .serializers import SubjectSerializer
+
+
+@override_settings(ACTIVITY_FANOUT_BACKEND="sync")
+class SubjectDashboardTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        teacher_role = Role.objects.create(name=Role.TEACHER)
+        student_role = Role.objects.create(name=Role.STUDENT)
+
+        cls.teacher = User.objects.create_user(
+            username="subjteacher", email="subjteacher@test.com", password="testpass123"
+        )
+        cls.student = User.objects.create_user(
+            username="subjstudent", email="subjstudent@test.com", password="testpass123"
+        )
+        cls.stranger = User.objects.create_user(
+            username="subjstranger", email="subjstranger@test.com", password="testpass123"
+        )
+        UserRole.objects.create(user=cls.teacher, role=teacher_role, is_active=True)
+        for user in (cls.student, cls.stranger):
+            UserRole.objects.create(user=user, role=student_role, is_active=True)
+
+        cls.course = Course.objects.create(title="Class 9")
+        cls.subject = Subject.objects.create(course=cls.course, name="Biology")
+        SubjectTeacher.objects.create(subject=cls.subject, teacher=cls.teacher)
+        Enrollment.objects.create(user=cls.student, course=cls.course)
+
+        cls.chapter = Chapter.objects.create(subject=cls.subject, title="Cells")
+        due = timezone.now() + timedelta(days=3)
+        cls.assignments = [
+            Assignment.objects.create(chapter=cls.chapter, title=f"A{i}", due_date=due)
+            for i in range(3)
+        ]
+        cls.quizzes = [
+            Quiz.objects.create(
+                subject=cls.subject,
+                created_by=cls.teacher,
+                title=f"Q{i}",
+                due_date=due,
+                is_published=i < 2,
+            )
+            for i in range(3)
+        ]
+        StudyMaterial.objects.create(
+            chapter=cls.chapter, title="Notes", uploaded_by=cls.teacher
+        )
+
+        AssignmentSubmission.objects.create(
+            assignment=cls.assignments[0], student=cls.student, submitted_file="a.pdf"
+        )
+        QuizAttempt.objects.create(
+            quiz=cls.quizzes[0], student=cls.student, status=QuizAttempt.STATUS_SUBMITTED
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def get(self, user):
+        client = APIClient()
+        client.force_authenticate(user=user)
+        return client.get(f"/api/courses/subjects/{self.subject.id}/dashboard/")
+
+    def test_student_counters(self):
+        res = self.get(self.student)
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.data["assignments"], {"pending": 2, "completed": 1, "total": 3})
+        self.assertEqual(res.data["quizzes"], {"pending": 1, "completed": 1, "total": 2})
+        self.assertEqual(res.data["study_materials_count"], 1)
+        self.assertEqual(res.data["recordings_count"], 0)
+        self.assertEqual(res.data["studentsCount"], 1)
+        self.assertEqual([t["id"] for t in res.data["teachers"]], [self.teacher.id])
+
+    def test_teacher_sees_totals_as_pending(self):
+        res = self.get(self.teacher)
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.data["assignments"], {"pending": 3, "completed": 0, "total": 3})
+
+    def test_access_checks(self):
+        self.assertEqual(self.get(self.stranger).status_code, 403)
+
+        other_teacher = User.objects.create_user(
+            username="other", email="other@test.com", password="testpass123"
+        )
+        UserRole.objects.create(
+            user=other_teacher, role=Role.objects.get(name=Role.TEACHER), is_active=True
+        )
+        self.assertEqual(self.get(other_teacher).status_code, 403)
+
+    def test_query_count(self):
+        self.get(self.student)  # warm role cache
+
+        cache.delete(f"courses:subject_stats:{self.subject.id}")
+        # viewer row, counters, teachers, upcoming sessions
+        with self.assertNumQueries(4):
+            self.get(self.student)
+
+        # counters and teachers come from the cache
+        with self.assertNumQueries(2):
+            self.get(self.student)
+
+    def test_counters_invalidated_on_writes(self):
+        self.get(self.student)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Assignment.objects.create(
+                chapter=self.chapter, title="A3", due_date=timezone.now()
+            )
+        self.assertEqual(self.get(self.student).data["assignments"]["total"], 4)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Enrollment.objects.create(user=self.stranger, course=self.course)
+        self.assertEqual(self.get(self.student).data["studentsCount"], 2)
+
+
+@override_settings(ACTIVITY_FANOUT_BACKEND="sync")
+class StudentRosterTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = User.objects.create_user(
+            username="rosterteacher", email="rosterteacher@test.com", password="testpass123"
+        )
+        UserRole.objects.create(
+            user=cls.teacher, role=Role.objects.create(name=Role.TEACHER), is_active=True
+        )
+
+        cls.course = Course.objects.create(title="Class 11")
+        cls.other_course = Course.objects.create(title="Class 12")
+        cls.subject = Subject.objects.create(course=cls.course, name="Physics")
+        other_subject = Subject.objects.create(course=cls.other_course, name="Physics 2")
+        for subject in (cls.subject, other_subject):
+            SubjectTeacher.objects.create(subject=subject, teacher=cls.teacher)
+
+        cls.students = []
+        for name in ["carol", "alice", "erin", "bob", "dave"]:
+            student = User.objects.create_user(
+                username=name, email=f"{name}@test.com", password="testpass123"
+            )
+            Enrollment.objects.create(user=student, course=cls.course, batch_code="B1")
+            cls.students.append(student)
+
+        # alice is in both courses; erin only in the other one
+        Enrollment.objects.create(user=cls.students[1], course=cls.other_course)
+        Enrollment.objects.filter(user=cls.students[2]).delete()
+        Enrollment.objects.create(user=cls.students[2], course=cls.other_course)
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.teacher)
+
+    def test_subject_roster_is_sorted_and_paginated(self):
+        url = f"/api/courses/subjects/{self.subject.id}/students/"
+
+        res = self.client.get(url, {"page_size": 2})
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.data["total_students"], 4)
+        self.assertEqual([s["username"] for s in res.data["students"]], ["alice", "bob"])
+        self.assertEqual(res.data["students"][0]["batch_code"], "B1")
+
+        res = self.client.get(url, {"page_size": 2, "cursor": res.data["next"]})
+        self.assertEqual([s["username"] for s in res.data["students"]], ["carol", "dave"])
+        self.assertIsNone(res.data["next"])
+
+        res = self.client.get(url, {"ordering": "-email", "page_size": 1})
+        self.assertEqual(res.data["students"][0]["username"], "dave")
+
+        self.assertEqual(self.client.get(url, {"ordering": "age"}).status_code, 400)
+
+    def test_cursor_over_enrollment_date(self):
+        url = f"/api/courses/subjects/{self.subject.id}/students/"
+        seen, params = [], {"ordering": "newest", "page_size": 3}
+        while True:
+            res = self.client.get(url, params)
+            seen += [s["username"] for s in res.data["students"]]
+            if not res.data["next"]:
+                break
+            params["cursor"] = res.data["next"]
+
+        self.assertEqual(seen, ["dave", "bob", "alice", "carol"])
+
+    def test_all_students_dedupes_across_courses(self):
+        res = self.client.get("/api/courses/teacher/all-students/")
+        names = [s["username"] for s in res.data["students"]]
+
+        self.assertEqual(names, ["alice", "bob", "carol", "dave", "erin"])
+        self.assertEqual(res.data["total_students"], 5)
+        alice = res.data["students"][0]
+        self.assertEqual(alice["course_title"], "Class 11")  # earliest enrollment
+
+    def test_search(self):
+        res = self.client.get("/api/courses/teacher/all-students/", {"search": "ER"})
+        self.assertEqual([s["username"] for s in res.data["students"]], ["erin"])
+        self.assertEqual(res.data["total_students"], 1)
+
+    def test_page_query_count_is_constant(self):
+        self.client.get("/api/courses/teacher/all-students/")  # warm caches
+
+        with self.assertNumQueries(1):
+            self.client.get("/api/courses/teacher/all-students/")
+
+    def test_streaming_exports(self):
+        res = self.client.get("/api/courses/teacher/all-students/", {"export": "csv"})
+        self.assertTrue(res.streaming)
+        self.assertEqual(res["Content-Type"], "text/csv")
+        lines = b"".join(res.streaming_content).decode().splitlines()
+        self.assertTrue(lines[0].startswith("id,email,username"))
+        self.assertEqual(len(lines), 6)
+
+        res = self.client.get(
+            "/api/courses/teacher/all-students/",
+            {"export": "ndjson", "ordering": "newest"},
+        )
+        rows = [json.loads(line) for line in b"".join(res.streaming_content).splitlines()]
+        self.assertEqual(len(rows), 5)
+        self.assertEqual({row["username"] for row in rows}, {"alice", "bob", "carol", "dave", "erin"})
+
+
+class CatalogTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.student = User.objects.create_user(
+            username="subjlist", email="subjlist@test.com", password="testpass123"
+        )
+        teachers = [
+            User.objects.create_user(
+                username=f"subjlistteacher{i}",
+                email=f"subjlistteacher{i}@test.com",
+                password="testpass123",
+            )
+            for i in range(2)
+        ]
+        cls.course = Course.objects.create(title="Class 7")
+        Enrollment.objects.create(user=cls.student, course=cls.course)
+
+        for i in range(15):
+            subject = Subject.objects.create(course=cls.course, name=f"S{i}", order=i)
+            for order, teacher in enumerate(teachers):
+                SubjectTeacher.objects.create(subject=subject, teacher=teacher, order=order)
+            for ch in (2, 1):
+                Chapter.objects.create(subject=subject, title=f"Ch{ch}", order=ch)
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.student)
+
+    def test_course_subjects_from_catalog(self):
+        url = f"/api/courses/{self.course.id}/subjects/"
+        self.client.get(url)  # builds the tree
+
+        # only the enrollment check
+        with self.assertNumQueries(1):
+            res = self.client.get(url)
+
+        self.assertEqual(len(res.data), 15)
+        first = res.data[0]
+        self.assertEqual([c["title"] for c in first["chapters"]], ["Ch1", "Ch2"])
+        self.assertEqual(
+            [t["name"] for t in first["teachers"]], ["subjlistteacher0", "subjlistteacher1"]
+        )
+
+    @override_settings(DEBUG=True)
+    def test_lazy_query_raises_in_debug(self):
+        subject = Subject.objects.filter(course=self.course).first()
+        with self.assertRaises(LazyQueryError):
+            SubjectSerializer(subject).data
+
+        subject = SubjectSerializer.setup_queryset(Subject.objects.all()).get(pk=subject.pk)
+        self.assertEqual(len(SubjectSerializer(subject).data["teachers"]), 2)
+
+    def test_catalog_reads_without_queries(self):
+        subject = Subject.objects.get(course=self.course, name="S0")
+        self.client.get("/api/courses/subjects-by-course/")
+
+        with self.assertNumQueries(0):
+            chapters = self.client.get(f"/api/courses/subjects/{subject.id}/chapters/")
+            by_title = self.client.get(
+                "/api/courses/subjects-by-course/", {"course_title": "class 7"}
+            )
+
+        self.assertEqual([c["title"] for c in chapters.data], ["Ch1", "Ch2"])
+        self.assertEqual(by_title.data["subjects"][:2], ["S0", "S1"])
+
+        res = self.client.get("/api/courses/subjects/mine/")
+        self.assertEqual(len(res.data), 15)
+
+    def test_etag_and_invalidation(self):
+        subject = Subject.objects.get(course=self.course, name="S0")
+        url = f"/api/courses/subjects/{subject.id}/chapters/"
+
+        etag = self.client.get(url)["ETag"]
+        res = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Chapter.objects.create(subject=subject, title="Ch3", order=3)
+
+        res = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, 200)
+        self.assertNotEqual(res["ETag"], etag)
+        self.assertEqual([c["title"] for c in res.data], ["Ch1", "Ch2", "Ch3"])
+
+    @override_settings(SHARED_CACHE=False)
+    def test_version_lapses_without_shared_cache(self):
+        subject = Subject.objects.get(course=self.course, name="S0")
+        url = f"/api/courses/subjects/{subject.id}/chapters/"
+        self.client.get(url)
+
+        # Written by another worker: its bump never reaches this process
+        Chapter.objects.filter(subject=subject, order=1).update(title="Intro")
+        self.assertEqual(self.client.get(url).data[0]["title"], "Ch1")
+
+        later = time.time() + catalog.CATALOG_LOCAL_VERSION_TIMEOUT + 1
+        with patch("django.core.cache.backends.locmem.time.time", return_value=later):
+            self.assertEqual(self.client.get(url).data[0]["title"], "Intro")
@@ -1,5 +1,3 @@
-from .serializers import ChapterSerializer
-from .models import Chapter
 from django.db.models import Count
 from .models import SubjectTeacher
 from accounts.models import Role
@@ -9,16 +7,39 @@ from rest_framework.permissions import IsAuthenticated
 from rest_framework import status
 from enrollments.models import Enrollment
 from accounts.permissions import IsTeacher
-from quizzes.models import Quiz
-from assignments.models import Assignment
 from .models import Course
 from .serializers import CourseSerializer
 from .models import Course, Subject
 from .serializers import CourseSerializer, SubjectSerializer
+from . import catalog
+from .services import (
+    ROSTER_ORDERINGS,
+    get_subject_counters,
+    get_subject_for_viewer,
+    roster_queryset,
+    roster_row,
+)
+from enrollments.services import get_active_students
+from config.pagination import KeysetPaginator
 from django.db.models import Count, Q
+from django.db.models.functions import Coalesce
 from django.utils import timezone
+from django.utils.http import parse_etags
+from django.utils.text import slugify
 from django.shortcuts import get_object_or_404
+from django.http import Http404, StreamingHttpResponse
+from django.core.serializers.json import DjangoJSONEncoder
 from datetime import timedelta
+import csv
+import json
+
+
+def _catalog_response(request, etag, build):
+    """Answer If-None-Match with 304, otherwise build the body."""
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if etag in parse_etags(request.headers.get("If-None-Match", "")):
+        return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(build(), headers=headers)
 
 
 # =========================
@@ -138,15 +159,13 @@ class CourseSubjectsView(APIView):
         if not is_enrolled:
             return Response({"detail": "Not enrolled in this course."}, status=403)
 
-        subjects = (
-            Subject.objects
-            .filter(course__id=course_id)
-            .select_related("course__stream", "course__board")
-            .order_by("order")
+        # 🔥 served from the in-memory catalog tree
+        version, tree = catalog.get_catalog()
+        return _catalog_response(
+            request,
+            catalog.catalog_etag(version, "course-subjects", course_id, request.get_host()),
+            lambda: catalog.course_subjects(tree, course_id, request),
         )
-
-        serializer = SubjectSerializer(subjects, many=True, context={'request': request})  # ← fixed
-        return Response(serializer.data)
 # =========================
 # SUBJECT DETAIL
 # =========================
@@ -156,9 +175,7 @@ class SubjectDetailView(APIView):
 
     def get(self, request, subject_id):
         subject = get_object_or_404(
-            Subject.objects.prefetch_related(
-                "subject_teachers__teacher__teacher_profile"
-            ).select_related("course__stream", "course__board"),
+            SubjectSerializer.setup_queryset(Subject.objects.all()),
             id=subject_id
         )
 
@@ -179,89 +196,46 @@ class SubjectDashboardView(APIView):
     def get(self, request, subject_id):
         user = request.user
 
-        subject = get_object_or_404(
-            Subject.objects.prefetch_related(
-                "subject_teachers__teacher"
-            ).select_related("course__stream", "course__board"),
-            id=subject_id
-        )
+        # Subject + access flags + the viewer's completions (one query)
+        subject = get_subject_for_viewer(subject_id, user)
+        if subject is None:
+            raise Http404
 
         if user.has_role("TEACHER"):
-            is_assigned = subject.subject_teachers.filter(
-                teacher=user
-            ).exists()
-
-            if not is_assigned:
+            if not subject.is_assigned:
                 return Response(
                     {"detail": "Not assigned to this subject."},
                     status=status.HTTP_403_FORBIDDEN
                 )
         else:
-            if not Enrollment.objects.filter(
-                user=user,
-                course=subject.course,
-                status=Enrollment.STATUS_ACTIVE
-            ).exists():
+            if not subject.is_enrolled:
                 return Response(
                     {"detail": "Not enrolled."},
                     status=status.HTTP_403_FORBIDDEN
                 )
 
-        assignments = Assignment.objects.filter(
-            chapter__subject=subject
-        ).distinct()
+        # Totals, teachers, recordings, materials, students (cached)
+        counters = get_subject_counters(subject.id)
 
-        total_assignments = assignments.count()
+        total_assignments = counters["total_assignments"]
+        total_quizzes = counters["total_quizzes"]
 
         if user.has_role("STUDENT"):
-            completed_assignments = assignments.filter(
-                submissions__student=user
-            ).distinct().count()
-            pending_assignments = total_assignments - completed_assignments
+            completed_assignments = subject.completed_assignments
+            completed_quizzes = subject.completed_quizzes
         else:
             completed_assignments = 0
-            pending_assignments = total_assignments
-
-        quizzes = Quiz.objects.filter(
-            subject=subject,
-            is_published=True
-        ).distinct()
-
-        total_quizzes = quizzes.count()
-
-        if user.has_role("STUDENT"):
-            completed_quizzes = quizzes.filter(
-                attempts__student=user,
-                attempts__status="SUBMITTED"
-            ).distinct().count()
-            pending_quizzes = total_quizzes - completed_quizzes
-        else:
             completed_quizzes = 0
-            pending_quizzes = total_quizzes
 
-        serializer = SubjectSerializer(
-        subject,
-        context={'request': request}
-)
-
-        # ── Recordings count ──
-        from courses.models_recordings import SessionRecording
-        recordings_count = SessionRecording.objects.filter(
-            subject=subject
-        ).count()
-
-        # ── Study Materials count ──
-        from materials.models import StudyMaterial
-        study_materials_count = StudyMaterial.objects.filter(
-            chapter__subject=subject
-        ).count()
+        pending_assignments = total_assignments - completed_assignments
+        pending_quizzes = total_quizzes - completed_quizzes
 
         # ── Upcoming Live Sessions ──
         from livestream.models import LiveSession
         now = timezone.now()
         upcoming_sessions = list(
             LiveSession.objects.filter(
-                subject=subject,
+                subject_id=subject.id,
                 start_time__gte=now,
                 status__in=[
                     LiveSession.STATUS_SCHEDULED,
@@ -272,10 +246,13 @@ class SubjectDashboardView(APIView):
             .values("id", "title", "start_time", "status")
         )
 
+        recordings_count = counters["recordings_count"]
+        study_materials_count = counters["study_materials_count"]
+
         return Response({
             "id": subject.id,
             "name": subject.name,
-            "teachers": serializer.data["teachers"],
+            "teachers": counters["teachers"],
 
             "assignments": {
                 "pending": pending_assignments,
@@ -295,10 +272,7 @@ class SubjectDashboardView(APIView):
             "study_materials_count": study_materials_count,
             "upcomingSessions": upcoming_sessions,
 
-            "studentsCount": Enrollment.objects.filter(
-                course=subject.course,
-                status=Enrollment.STATUS_ACTIVE,
-            ).count(),
+            "studentsCount": counters["students_count"],
         })
 
 
@@ -322,17 +296,14 @@ class TeacherMyClassesView(APIView):
             Subject.objects
             .filter(subject_teachers__teacher=user)
             .select_related("course__stream", "course__board")
+            # 🔥 read from the CourseStats rollup instead of counting per subject
+            .annotate(students_count=Coalesce("course__stats__active_students", 0))
             .distinct()
         )
 
         response_data = []
 
         for subject in subjects:
-            students_count = Enrollment.objects.filter(
-                course=subject.course,
-                status=Enrollment.STATUS_ACTIVE
-            ).count()
-
             response_data.append({
                 "subject_id": str(subject.id),
                 "subject_name": subject.name,
@@ -340,7 +311,7 @@ class TeacherMyClassesView(APIView):
                 "course_title": subject.course.title,
                 "stream_name": subject.course.stream.name if subject.course.stream else None,
                 "board_name": subject.course.board.name if subject.course.board else None,
-                "students_count": students_count,
+                "students_count": subject.students_count,
             })
 
         return Response(response_data)
@@ -356,13 +327,12 @@ class SubjectChaptersView(APIView):
 
     def get(self, request, subject_id):
 
-        chapters = Chapter.objects.filter(
-            subject_id=subject_id
-        ).order_by("order")
-
-        serializer = ChapterSerializer(chapters, many=True)
-
-        return Response(serializer.data)
+        version, tree = catalog.get_catalog()
+        return _catalog_response(
+            request,
+            catalog.catalog_etag(version, "subject-chapters", subject_id),
+            lambda: catalog.subject_chapters(tree, subject_id),
+        )
 
 
 # =========================
@@ -370,6 +340,12 @@ class SubjectChaptersView(APIView):
 # =========================
 
 class SubjectStudentsView(APIView):
+    """
+    Active students of the subject's course, keyset-paginated.
+
+    ?ordering=name|-name|email|-email|newest|oldest  ?search=  ?cursor=
+    ?page_size=  ?export=csv|ndjson streams the whole (filtered) roster.
+    """
     permission_classes = [IsAuthenticated]
 
     def get(self, request, subject_id):
@@ -381,7 +357,9 @@ class SubjectStudentsView(APIView):
                 status=status.HTTP_403_FORBIDDEN,
             )
 
-        subject = get_object_or_404(Subject, id=subject_id)
+        subject = get_object_or_404(
+            Subject.objects.select_related("course"), id=subject_id
+        )
 
         if not SubjectTeacher.objects.filter(
             subject=subject, teacher=user
@@ -391,39 +369,19 @@ class SubjectStudentsView(APIView):
                 status=status.HTTP_403_FORBIDDEN,
             )
 
-        enrollments = (
-            Enrollment.objects.filter(
-                course=subject.course,
-                status=Enrollment.STATUS_ACTIVE,
-            )
-            .select_related("user", "user__profile")
-            .order_by("user__profile__full_name")
-        )
-
-        students = []
-        for enrollment in enrollments:
-            u = enrollment.user
-            profile = getattr(u, "profile", None)
-
-            students.append({
-                "id": str(u.id),
-                "email": u.email,
-                "username": u.username,
-                "full_name": profile.full_name if profile else "",
-                "phone": profile.phone if profile else "",
-                "student_id": profile.student_id if profile else "",
-                "avatar_type": profile.avatar_type() if profile else None,
-                "avatar": profile.avatar_value() if profile else None,
-                "enrolled_at": enrollment.enrolled_at,
-                "batch_code": enrollment.batch_code or "",
-            })
+        search = request.query_params.get("search", "").strip()
 
-        return Response({
-            "subject_name": subject.name,
-            "course_title": subject.course.title,
-            "total_students": len(students),
-            "students": students,
-        })
+        return _roster_response(
+            request,
+            roster_queryset([subject.course_id], search=search),
+            filename=f"{slugify(subject.name)}-students",
+            extra={
+                "subject_name": subject.name,
+                "course_title": subject.course.title,
+            },
+            # 🔥 unfiltered total comes from the CourseStats rollup
+            total=None if search else get_active_students(subject.course_id),
+        )
 
 
 # =========================
@@ -439,28 +397,27 @@ class SubjectsByCourseTitleView(APIView):
 
     def get(self, request):
         course_title = request.query_params.get("course_title", "").strip()
+        version, tree = catalog.get_catalog()
+        etag = catalog.catalog_etag(version, "subjects-by-course", course_title)
+
         if not course_title:
             # Return all subjects grouped by course
-            courses = Course.objects.prefetch_related("subjects").all()
-            data = {}
-            for course in courses:
-                subjects = list(course.subjects.values_list(
-                    "name", flat=True).order_by("order"))
-                data[course.title] = subjects
-            return Response(data)
+            return _catalog_response(
+                request, etag, lambda: catalog.subject_names_by_course_title(tree)
+            )
 
         # Filter subjects by course title (case-insensitive partial match)
-        courses = Course.objects.filter(
-            title__icontains=course_title).prefetch_related("subjects")
-        subjects = []
-        for course in courses:
-            for subj in course.subjects.all().order_by("order"):
-                if subj.name not in subjects:
-                    subjects.append(subj.name)
-        return Response({"course_title": course_title, "subjects": subjects})
+        return _catalog_response(request, etag, lambda: {
+            "course_title": course_title,
+            "subjects": catalog.subject_names_matching_course_title(tree, course_title),
+        })
 
 
 class TeacherAllStudentsView(APIView):
+    """
+    Every active student across the teacher's courses, once each.
+    Same query params as SubjectStudentsView.
+    """
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
@@ -472,54 +429,101 @@ class TeacherAllStudentsView(APIView):
                 status=status.HTTP_403_FORBIDDEN,
             )
 
-        subjects = (
+        course_ids = (
             Subject.objects
             .filter(subject_teachers__teacher=user)
-            .select_related("course__stream")
-            .distinct()
+            .values("course_id")
         )
 
-        course_ids = [s.course_id for s in subjects]
+        return _roster_response(
+            request,
+            roster_queryset(
+                course_ids, search=request.query_params.get("search", "").strip()
+            ),
+            filename="students",
+        )
 
-        enrollments = (
-            Enrollment.objects.filter(
-                course_id__in=course_ids,
-                status=Enrollment.STATUS_ACTIVE,
+
+# =========================
+# ROSTER PAGINATION / EXPORT
+# =========================
+
+ROSTER_EXPORT_CHUNK = 2000
+
+ROSTER_EXPORT_COLUMNS = [
+    "id", "email", "username", "full_name", "phone", "student_id",
+    "course_title", "enrolled_at", "batch_code",
+]
+
+
+class _Echo:
+    """File-like object whose write() hands the line back to csv.writer."""
+
+    def write(self, value):
+        return value
+
+
+def _roster_response(request, queryset, filename, extra=None, total=None):
+    ordering = request.query_params.get("ordering", "name")
+    if ordering not in ROSTER_ORDERINGS:
+        return Response(
+            {"ordering": f"Choose from: {', '.join(ROSTER_ORDERINGS)}."},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    export = request.query_params.get("export")
+    if export:
+        if export not in ("csv", "ndjson"):
+            return Response(
+                {"export": "Choose from: csv, ndjson."},
+                status=status.HTTP_400_BAD_REQUEST,
             )
-            .select_related("user", "user__profile", "course")
-            .order_by("user__profile__full_name")
+        return _stream_roster(
+            queryset.order_by(*ROSTER_ORDERINGS[ordering]), export, filename
         )
 
-        seen = set()
-        students = []
-
-        for enrollment in enrollments:
-            u = enrollment.user
-
-            if u.id in seen:
-                continue
-            seen.add(u.id)
-
-            profile = getattr(u, "profile", None)
-
-            students.append({
-                "id": str(u.id),
-                "email": u.email,
-                "username": u.username,
-                "full_name": profile.full_name if profile else "",
-                "phone": profile.phone if profile else "",
-                "student_id": profile.student_id if profile else "",
-                "avatar_type": profile.avatar_type() if profile else None,
-                "avatar": profile.avatar_value() if profile else None,
-                "course_title": enrollment.course.title,
-                "enrolled_at": enrollment.enrolled_at,
-                "batch_code": enrollment.batch_code or "",
-            })
+    paginator = KeysetPaginator(
+        ordering=ROSTER_ORDERINGS[ordering],
+        page_size=50,
+        max_page_size=200,
+        cached_count=total is None,
+    )
+    page = paginator.paginate(queryset, request)
+
+    return Response({
+        **(extra or {}),
+        "total_students": page.count if total is None else total,
+        "students": [roster_row(row) for row in page.items],
+        "next": page.next_cursor,
+        "previous": page.previous_cursor,
+    })
+
+
+def _stream_roster(queryset, export, filename):
+    # iterator() reads through a server-side cursor on PostgreSQL, so memory
+    # stays flat however large the roster is
+    rows = (
+        roster_row(row)
+        for row in queryset.iterator(chunk_size=ROSTER_EXPORT_CHUNK)
+    )
+
+    if export == "csv":
+        writer = csv.writer(_Echo())
+
+        def lines():
+            yield writer.writerow(ROSTER_EXPORT_COLUMNS)
+            for row in rows:
+                yield writer.writerow([row[col] for col in ROSTER_EXPORT_COLUMNS])
+
+        content, content_type = lines(), "text/csv"
+    else:
+        content = (json.dumps(row, cls=DjangoJSONEncoder) + "\n" for row in rows)
+        content_type = "application/x-ndjson"
+
+    response = StreamingHttpResponse(content, content_type=content_type)
+    response["Content-Disposition"] = f'attachment; filename="{filename}.{export}"'
+    return response
 
-        return Response({
-            "total_students": len(students),
-            "students": students,
-        })
 
 # =========================
 # STUDENT'S OWN SUBJECTS
@@ -536,23 +540,20 @@ class MySubjectsView(APIView):
 
     def get(self, request):
         # Get all active enrollments for this student
-        course_ids = Enrollment.objects.filter(
-            user=request.user,
-            status=Enrollment.STATUS_ACTIVE,
-        ).values_list("course_id", flat=True)
-
+        course_ids = sorted(
+            str(course_id)
+            for course_id in Enrollment.objects.filter(
+                user=request.user,
+                status=Enrollment.STATUS_ACTIVE,
+            ).values_list("course_id", flat=True)
+        )
         if not course_ids:
             return Response([])
 
-        subjects = (
-            Subject.objects
-            .filter(course_id__in=course_ids)
-            .select_related("course")
-            .order_by("course__title", "order")
+        version, tree = catalog.get_catalog()
+        return _catalog_response(
+            request,
+            catalog.catalog_etag(version, "my-subjects", *course_ids),
+            lambda: catalog.subjects_for_courses(tree, course_ids),
         )
 
-        return Response([
-            {"id": str(s.id), "name": s.name}
-            for s in subjects
-        ])
-
@@ -0,0 +1,270 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from asgiref.sync import async_to_sync, sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+from django.db.models import Q
+from django.utils import timezone
+
+from enrollments.models import Enrollment
+from courses.models import Subject, Chapter
+
+from livestream.models import LiveSession
+from assignments.models import Assignment
+from quizzes.models import Quiz
+from activity.models import Activity
+from sessions_app.models import PrivateSession
+
+from .serializers import (
+    DashboardSessionSerializer,
+    DashboardAssignmentSerializer,
+    DashboardQuizSerializer,
+    DashboardActivitySerializer,
+    DashboardPrivateSessionSerializer
+)
+
+
+def _local_day_start():
+    # Midnight in settings.TIME_ZONE (the day snapshots are keyed by)
+    return timezone.localtime().replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+class DashboardScope:
+    """
+    What every section filters on. Only ``is_student`` costs a query; the
+    id lists stay lazy and are inlined into each section's query as
+    subqueries.
+    """
+
+    def __init__(self, user):
+        self.user = user
+
+        active = Enrollment.objects.filter(
+            user=user,
+            status=Enrollment.STATUS_ACTIVE
+        )
+
+        # 🔥 detect student
+        self.is_student = active.exists()
+
+        course_ids = active.values_list("course_id", flat=True)
+        self.subject_ids = Subject.objects.filter(
+            course_id__in=course_ids
+        ).values_list("id", flat=True)
+        self.chapter_ids = Chapter.objects.filter(
+            subject_id__in=self.subject_ids
+        ).values_list("id", flat=True)
+
+        self.today_start = _local_day_start()
+        self.today_end = self.today_start + timedelta(days=1)
+
+
+# =========================
+# SECTIONS
+# =========================
+def _sessions(scope):
+    # ✅ Live sessions (today only — for "Upcoming Live Sessions")
+    if scope.is_student:
+        owner = Q(subject_id__in=scope.subject_ids)
+    else:
+        owner = Q(created_by=scope.user)
+
+    sessions = (
+        LiveSession.objects
+        .filter(
+            owner,
+            start_time__gte=scope.today_start,
+            start_time__lt=scope.today_end
+        )
+        .select_related("subject", "created_by")
+        .order_by("start_time")
+    )
+    return DashboardSessionSerializer(sessions, many=True).data
+
+
+def _all_sessions(scope):
+    # Students only see today's sessions on the calendar
+    if scope.is_student:
+        return _sessions(scope)
+
+    # ✅ All upcoming sessions (for calendar & schedule)
+    all_sessions = (
+        LiveSession.objects
+        .filter(
+            created_by=scope.user,
+            start_time__gte=scope.today_start
+        )
+        .select_related("subject", "created_by")
+        .order_by("start_time")
+    )
+    return DashboardSessionSerializer(all_sessions, many=True).data
+
+
+def _assignments(scope):
+    if scope.is_student:
+        assignments = (
+            Assignment.objects
+            .filter(chapter_id__in=scope.chapter_ids)
+            .select_related("chapter__subject")
+            .order_by("due_date")[:5]
+        )
+    else:
+        # ✅ Assignments (FIXED RELATION)
+        assignments = (
+            Assignment.objects
+            .filter(
+                chapter__subject__subject_teachers__teacher=scope.user
+            )
+            .select_related("chapter__subject")
+            .distinct()
+            .order_by("due_date")
+        )
+    return DashboardAssignmentSerializer(assignments, many=True).data
+
+
+def _quizzes(scope):
+    if scope.is_student:
+        quizzes = (
+            Quiz.objects
+            .filter(
+                subject_id__in=scope.subject_ids,
+                is_published=True
+            )
+            .select_related("created_by")
+            .order_by("due_date")[:5]
+        )
+    else:
+        # ✅ Quizzes (usually has created_by)
+        quizzes = (
+            Quiz.objects
+            .filter(
+                created_by=scope.user,
+                is_published=True
+            )
+            .select_related("created_by", "subject")
+            .order_by("due_date")
+        )
+    return DashboardQuizSerializer(quizzes, many=True).data
+
+
+def _private_sessions(scope):
+    # ✅ Private sessions (upcoming, approved/pending)
+    private_sessions = (
+        PrivateSession.objects
+        .filter(
+            Q(teacher=scope.user) | Q(requested_by=scope.user),
+            scheduled_date__gte=timezone.localdate(),
+            status__in=["pending", "approved", "needs_reconfirmation"]
+        )
+        .select_related("teacher", "requested_by")
+        .order_by("scheduled_date", "scheduled_time")
+    )
+    return DashboardPrivateSessionSerializer(private_sessions, many=True).data
+
+
+def _notifications(scope):
+    notifications = (
+        Activity.objects
+        .filter(user=scope.user)
+        .order_by("-created_at")[:10]
+    )
+    return DashboardActivitySerializer(notifications, many=True).data
+
+
+def _schedule(scope):
+    schedule = (
+        Activity.objects
+        .filter(user=scope.user)
+        .order_by("due_date")[:10]
+    )
+    return DashboardActivitySerializer(schedule, many=True).data
+
+
+SECTIONS = {
+    "sessions": _sessions,
+    "all_sessions": _all_sessions,
+    "assignments": _assignments,
+    "quizzes": _quizzes,
+    "private_sessions": _private_sessions,
+    "notifications": _notifications,
+    "schedule": _schedule,
+}
+
+
+# =========================
+# LOADING
+# =========================
+_executor = None  # (workers, ThreadPoolExecutor)
+_executor_lock = threading.Lock()
+
+
+def _get_executor(workers):
+    # One bounded thread pool per process, rebuilt if the worker count
+    # changes. Sections borrow connections from the database pool, so the
+    # threads add no connections of their own. A replaced pool is not shut
+    # down: requests already using it finish, and its idle threads exit
+    # once it is garbage collected.
+    global _executor
+    with _executor_lock:
+        if _executor is None or _executor[0] != workers:
+            _executor = (workers, ThreadPoolExecutor(
+                max_workers=workers,
+                thread_name_prefix="dashboard-section",
+            ))
+        return _executor[1]
+
+
+def _run_section(name, scope):
+    # Take a pooled connection for the section and hand it back after
+    close_old_connections()
+    try:
+        return SECTIONS[name](scope)
+    finally:
+        close_old_connections()
+
+
+async def _gather_sections(scope, names, workers):
+    executor = _get_executor(workers) if workers > 1 else None
+
+    async def timed(name):
+        start = time.perf_counter()
+        if executor is not None:
+            data = await sync_to_async(
+                _run_section,
+                thread_sensitive=False,
+                executor=executor,
+            )(name, scope)
+        else:
+            data = await sync_to_async(SECTIONS[name])(scope)
+        return name, data, (time.perf_counter() - start) * 1000
+
+    return await asyncio.gather(*(timed(name) for name in names))
+
+
+def build_sections(user, names=None):
+    """
+    Compute the requested dashboard sections (all by default) concurrently.
+    Returns ({section: data}, {section: milliseconds}).
+
+    settings.DASHBOARD_SECTION_WORKERS bounds the concurrency; 1 runs the
+    sections one by one on the calling thread.
+    """
+    names = list(names or SECTIONS)
+    workers = getattr(settings, "DASHBOARD_SECTION_WORKERS", 4)
+
+    scope = DashboardScope(user)
+    results = async_to_sync(_gather_sections)(scope, names, workers)
+
+    data = {name: payload for name, payload, _ in results}
+    timings = {name: elapsed for name, _, elapsed in results}
+    return data, timings
+
+
+def build_dashboard(user):
+    """Compute the full dashboard payload for ``user`` from the database."""
+    data, _ = build_sections(user)
+    return data
@@ -0,0 +1,72 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from assignments.models import Assignment
+from quizzes.models import Quiz
+from livestream.models import LiveSession
+from sessions_app.models import PrivateSession
+from activity.models import Activity
+from activity.services import activities_created
+from enrollments.models import Enrollment
+from courses.models import Subject, Chapter
+
+from .snapshot import invalidate_courses, invalidate_dashboards
+
+
+# =========================
+# SNAPSHOT INVALIDATION
+# =========================
+@receiver(post_save, sender=Assignment)
+@receiver(post_delete, sender=Assignment)
+def assignment_changed(sender, instance, **kwargs):
+    course_id = (
+        Chapter.objects
+        .filter(pk=instance.chapter_id)
+        .values_list("subject__course_id", flat=True)
+        .first()
+    )
+    invalidate_courses([course_id])
+
+
+@receiver(post_save, sender=Quiz)
+@receiver(post_delete, sender=Quiz)
+def quiz_changed(sender, instance, **kwargs):
+    course_id = (
+        Subject.objects
+        .filter(pk=instance.subject_id)
+        .values_list("course_id", flat=True)
+        .first()
+    )
+    invalidate_courses([course_id])
+    invalidate_dashboards([instance.created_by_id])
+
+
+@receiver(post_save, sender=LiveSession)
+@receiver(post_delete, sender=LiveSession)
+def live_session_changed(sender, instance, **kwargs):
+    invalidate_courses([instance.course_id])
+    invalidate_dashboards([instance.created_by_id])
+
+
+@receiver(post_save, sender=PrivateSession)
+@receiver(post_delete, sender=PrivateSession)
+def private_session_changed(sender, instance, **kwargs):
+    invalidate_dashboards([instance.teacher_id, instance.requested_by_id])
+
+
+@receiver(post_save, sender=Activity)
+@receiver(post_delete, sender=Activity)
+def activity_changed(sender, instance, **kwargs):
+    invalidate_dashboards([instance.user_id])
+
+
+@receiver(activities_created)
+def activities_fanned_out(sender, user_ids, **kwargs):
+    invalidate_dashboards(user_ids)
+
+
+@receiver(post_save, sender=Enrollment)
+@receiver(post_delete, sender=Enrollment)
+def enrollment_changed(sender, instance, **kwargs):
+    # Student/teacher layout depends on having an active enrollment
+    invalidate_dashboards([instance.user_id])
@@ -0,0 +1,175 @@
+"""
+Per-user dashboard snapshots.
+
+The dashboard payload is materialized once per user and local day and kept
+in the default cache, so a hot load is two ``get_many`` round trips (the
+snapshot with the user's version, then its courses' versions).
+Sections are filled in lazily: a ``?sections=`` request only computes what
+the snapshot does not already hold.
+
+Every user and every course has a version token. A snapshot records the
+user's token and the tokens of the courses the user studies or teaches in
+when it is built. Signals (dashboard.signals) bump a course's token for
+Assignment/Quiz/LiveSession writes, one cache write however many students
+the course has, and the users' own tokens for PrivateSession/Activity/
+Enrollment writes. A snapshot whose recorded tokens no longer match is
+ignored on the next read, even if it was written to the cache after the
+bump.
+
+Without a shared cache (settings.SHARED_CACHE) a bump is only seen by the
+process that made it, so there the tokens lapse after
+LOCAL_VERSION_TIMEOUT and other workers rebuild at most that long after a
+write.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+from courses.models import SubjectTeacher
+from enrollments.models import Enrollment
+
+from .services import SECTIONS, build_sections
+
+
+SNAPSHOT_CACHE_TIMEOUT = 60 * 10  # seconds
+VERSION_CACHE_TIMEOUT = 60 * 60 * 24 * 2
+LOCAL_VERSION_TIMEOUT = 60  # seconds, per-process caches only
+
+
+def _snapshot_key(user_id, day):
+    return f"dashboard:snapshot:{user_id}:{day.isoformat()}"
+
+
+def _version_key(user_id):
+    return f"dashboard:version:{user_id}"
+
+
+def _course_version_key(course_id):
+    return f"dashboard:course-version:{course_id}"
+
+
+def _version_timeout():
+    return VERSION_CACHE_TIMEOUT if settings.SHARED_CACHE else LOCAL_VERSION_TIMEOUT
+
+
+def get_dashboard_snapshot(user, sections=None, fresh=False):
+    """
+    Returns (snapshot, timings). ``snapshot`` is a dict with ``data``
+    (the requested sections), ``generated_at``, ``version`` and ``hit``;
+    ``timings`` maps each section that had to be computed to milliseconds.
+    ``fresh=True`` skips the cached copy and rebuilds.
+
+    The cached snapshot may hold only some sections; missing ones are
+    computed and merged in as long as the version has not moved.
+    """
+    names = list(sections or SECTIONS)
+    snapshot_key = _snapshot_key(user.pk, timezone.localdate())
+    version_key = _version_key(user.pk)
+
+    cached = cache.get_many([snapshot_key, version_key])
+    version = cached.get(version_key)
+    snapshot = cached.get(snapshot_key)
+
+    if fresh or snapshot is None or snapshot["version"] != version:
+        snapshot = None
+    else:
+        recorded = snapshot.get("course_versions")
+        if recorded is None or recorded != _course_versions(recorded):
+            snapshot = None
+    missing = [name for name in names if snapshot is None or name not in snapshot["data"]]
+
+    if not missing:
+        return _view(snapshot, names, hit=True), {}
+
+    if version is None:
+        cache.add(version_key, time.time_ns(), _version_timeout())
+        version = cache.get(version_key)
+
+    if snapshot is None:
+        # Read before building, so a bump during the build is not lost
+        course_versions = _course_versions(user_course_ids(user), create=True)
+
+    data, timings = build_sections(user, missing)
+    if snapshot is None:
+        snapshot = {
+            "version": version,
+            "course_versions": course_versions,
+            "generated_at": timezone.now(),
+            "data": {},
+        }
+    snapshot["data"].update(data)
+    cache.set(snapshot_key, snapshot, SNAPSHOT_CACHE_TIMEOUT)
+    return _view(snapshot, names, hit=False), timings
+
+
+def _view(snapshot, names, hit):
+    return {
+        "version": snapshot["version"],
+        "generated_at": snapshot["generated_at"],
+        "hit": hit,
+        "data": {name: snapshot["data"][name] for name in names},
+    }
+
+
+# =========================
+# INVALIDATION
+# =========================
+def invalidate_dashboards(user_ids):
+    """Bump the version of every user in ``user_ids`` once the write commits."""
+    user_ids = {user_id for user_id in user_ids if user_id is not None}
+    if not user_ids:
+        return
+
+    def bump():
+        version = time.time_ns()
+        cache.set_many(
+            {_version_key(user_id): version for user_id in user_ids},
+            _version_timeout(),
+        )
+
+    transaction.on_commit(bump)
+
+
+def invalidate_courses(course_ids):
+    """Bump the version of every course in ``course_ids`` once the write commits."""
+    course_ids = {str(course_id) for course_id in course_ids if course_id is not None}
+    if not course_ids:
+        return
+
+    def bump():
+        version = time.time_ns()
+        cache.set_many(
+            {_course_version_key(course_id): version for course_id in course_ids},
+            _version_timeout(),
+        )
+
+    transaction.on_commit(bump)
+
+
+def _course_versions(course_ids, create=False):
+    """{course_id: version}; with ``create``, courses without one get one."""
+    keys = {_course_version_key(course_id): course_id for course_id in course_ids}
+    if not keys:
+        return {}
+
+    versions = cache.get_many(list(keys))
+    if create and len(versions) < len(keys):
+        for key in keys.keys() - versions.keys():
+            cache.add(key, time.time_ns(), _version_timeout())
+        versions = cache.get_many(list(keys))
+    return {keys[key]: version for key, version in versions.items()}
+
+
+def user_course_ids(user):
+    """Courses ``user`` is actively enrolled in or teaches a subject of."""
+    enrolled = Enrollment.objects.filter(
+        user=user,
+        status=Enrollment.STATUS_ACTIVE,
+    ).values_list("course_id", flat=True)
+    teaching = SubjectTeacher.objects.filter(
+        teacher=user,
+    ).values_list("subject__course_id", flat=True)
+    return sorted({str(course_id) for course_id in [*enrolled, *teaching]})
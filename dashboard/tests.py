@@ -1,3 +1,223 @@
-from django.test import TestCase
+"""
+Tests for dashboard — per-user snapshots.
 
-# Create your tests here.
+Covers:
+  - Hot loads are served from the snapshot without touching the database
+  - ?fresh=1 bypasses the snapshot
+  - Writes to quizzes, private sessions and activities invalidate only
+    the affected users' snapshots; course writes cost the same however
+    many students the course has
+  - Without a shared cache, snapshots lapse after LOCAL_VERSION_TIMEOUT
+  - ?sections= returns only the requested sections, with Server-Timing
+  - Sections computed on the worker pool match the serial result, and
+    the pool is resized when DASHBOARD_SECTION_WORKERS changes
+"""
+
+import time as time_module
+from datetime import time, timedelta
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from accounts.models import User
+from courses.models import Course, Subject
+from enrollments.models import Enrollment
+from quizzes.models import Quiz
+from sessions_app.models import PrivateSession
+from . import snapshot
+from .services import SECTIONS, _get_executor, build_sections
+
+
+@override_settings(ACTIVITY_FANOUT_BACKEND="sync", DASHBOARD_SECTION_WORKERS=1)
+class DashboardSnapshotTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = User.objects.create_user(
+            username="dashteacher",
+            email="dashteacher@test.com",
+            password="testpass123",
+        )
+        cls.student = User.objects.create_user(
+            username="dashstudent",
+            email="dashstudent@test.com",
+            password="testpass123",
+        )
+        cls.outsider = User.objects.create_user(
+            username="dashoutsider",
+            email="dashoutsider@test.com",
+            password="testpass123",
+        )
+        cls.course = Course.objects.create(title="Class 10")
+        cls.other_course = Course.objects.create(title="Class 11")
+        cls.subject = Subject.objects.create(course=cls.course, name="Maths")
+        cls.other_subject = Subject.objects.create(course=cls.other_course, name="Physics")
+        Enrollment.objects.create(user=cls.student, course=cls.course)
+        Enrollment.objects.create(user=cls.outsider, course=cls.other_course)
+
+    def setUp(self):
+        cache.clear()
+
+    def get_client(self, user):
+        client = APIClient()
+        client.force_authenticate(user=user)
+        return client
+
+    def load(self, user, **params):
+        res = self.get_client(user).get("/api/dashboard/", params)
+        self.assertEqual(res.status_code, 200)
+        return res
+
+    def publish_quiz(self, subject, title="Weekly test"):
+        with self.captureOnCommitCallbacks(execute=True):
+            Quiz.objects.create(
+                subject=subject,
+                created_by=self.teacher,
+                title=title,
+                due_date=timezone.now() + timedelta(days=2),
+                is_published=True,
+            )
+
+    def test_second_load_is_a_cache_hit_without_queries(self):
+        first = self.load(self.student)
+        self.assertEqual(first["X-Dashboard-Cache"], "MISS")
+
+        with CaptureQueriesContext(connection) as ctx:
+            second = self.load(self.student)
+        self.assertEqual(second["X-Dashboard-Cache"], "HIT")
+        self.assertEqual(len(ctx.captured_queries), 0)
+        self.assertEqual(second.data, first.data)
+        self.assertEqual(
+            second["X-Dashboard-Generated-At"], first["X-Dashboard-Generated-At"]
+        )
+
+    def test_fresh_bypasses_snapshot(self):
+        self.load(self.student)
+        self.assertEqual(self.load(self.student, fresh=1)["X-Dashboard-Cache"], "MISS")
+
+    def test_quiz_publish_invalidates_course_audience_only(self):
+        self.load(self.student)
+        self.load(self.outsider)
+
+        self.publish_quiz(self.subject)
+
+        res = self.load(self.student)
+        self.assertEqual(res["X-Dashboard-Cache"], "MISS")
+        self.assertEqual([q["title"] for q in res.data["quizzes"]], ["Weekly test"])
+        # Activity fan-out reached the student's notifications too
+        self.assertEqual(len(res.data["notifications"]), 1)
+
+        self.assertEqual(self.load(self.outsider)["X-Dashboard-Cache"], "HIT")
+
+    @override_settings(SHARED_CACHE=False)
+    def test_snapshot_lapses_without_shared_cache(self):
+        self.load(self.student)
+        self.assertEqual(self.load(self.student)["X-Dashboard-Cache"], "HIT")
+
+        # Another worker's bumps never reach this process's cache
+        later = time_module.time() + snapshot.LOCAL_VERSION_TIMEOUT + 1
+        with patch("django.core.cache.backends.locmem.time.time", return_value=later):
+            self.assertEqual(self.load(self.student)["X-Dashboard-Cache"], "MISS")
+
+    def test_course_write_cost_does_not_grow_with_the_course(self):
+        for i in range(30):
+            student = User.objects.create_user(username=f"dashcrowd{i}", email=f"dashcrowd{i}@test.com")
+            Enrollment.objects.create(user=student, course=self.course)
+
+        with patch.object(cache, "set_many", wraps=cache.set_many) as set_many:
+            with CaptureQueriesContext(connection) as ctx:
+                with self.captureOnCommitCallbacks(execute=True):
+                    Quiz.objects.create(
+                        subject=self.subject,
+                        created_by=self.teacher,
+                        title="Draft",
+                        due_date=timezone.now() + timedelta(days=2),
+                    )
+
+        # The insert and the course lookup; one version key per course / author
+        self.assertEqual(len(ctx.captured_queries), 2)
+        self.assertEqual(sum(len(call.args[0]) for call in set_many.call_args_list), 2)
+
+    def test_private_session_invalidates_both_parties(self):
+        self.load(self.student)
+        self.load(self.teacher)
+        self.load(self.outsider)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            PrivateSession.objects.create(
+                teacher=self.teacher,
+                requested_by=self.student,
+                subject="Maths",
+                scheduled_date=timezone.localdate() + timedelta(days=1),
+                scheduled_time=time(10, 0),
+            )
+
+        self.assertEqual(len(self.load(self.student).data["private_sessions"]), 1)
+        self.assertEqual(len(self.load(self.teacher).data["private_sessions"]), 1)
+        self.assertEqual(self.load(self.outsider)["X-Dashboard-Cache"], "HIT")
+
+    def test_sections_param_limits_payload_and_reports_timings(self):
+        res = self.load(self.student, sections="quizzes,notifications")
+        self.assertEqual(set(res.data), {"quizzes", "notifications"})
+        self.assertIn("quizzes;dur=", res["Server-Timing"])
+        self.assertIn("notifications;dur=", res["Server-Timing"])
+
+        # Cached sections are reused, the rest are filled in
+        res = self.load(self.student, sections="quizzes,schedule")
+        self.assertEqual(res["X-Dashboard-Cache"], "MISS")
+        self.assertNotIn("quizzes;dur=", res["Server-Timing"])
+        self.assertIn("schedule;dur=", res["Server-Timing"])
+
+        res = self.load(self.student, sections="schedule,quizzes,notifications")
+        self.assertEqual(res["X-Dashboard-Cache"], "HIT")
+
+    def test_unknown_section_is_rejected(self):
+        res = self.get_client(self.student).get("/api/dashboard/", {"sections": "gossip"})
+        self.assertEqual(res.status_code, 400)
+
+
+@override_settings(ACTIVITY_FANOUT_BACKEND="sync")
+class ParallelSectionsTest(TransactionTestCase):
+
+    def test_worker_pool_matches_serial(self):
+        teacher = User.objects.create_user(
+            username="pteacher", email="pteacher@test.com", password="testpass123"
+        )
+        student = User.objects.create_user(
+            username="pstudent", email="pstudent@test.com", password="testpass123"
+        )
+        course = Course.objects.create(title="Class 12")
+        subject = Subject.objects.create(course=course, name="Chemistry")
+        Enrollment.objects.create(user=student, course=course)
+        Quiz.objects.create(
+            subject=subject,
+            created_by=teacher,
+            title="Parallel quiz",
+            due_date=timezone.now() + timedelta(days=1),
+            is_published=True,
+        )
+
+        with override_settings(DASHBOARD_SECTION_WORKERS=1):
+            serial, _ = build_sections(student)
+        with override_settings(DASHBOARD_SECTION_WORKERS=4):
+            parallel, timings = build_sections(student)
+
+        self.assertEqual(parallel, serial)
+        self.assertEqual(set(timings), set(SECTIONS))
+        self.assertEqual(parallel["quizzes"][0]["title"], "Parallel quiz")
+
+    def test_pool_follows_the_worker_setting(self):
+        small = _get_executor(2)
+        self.assertIs(_get_executor(2), small)
+
+        large = _get_executor(3)
+        self.assertIsNot(large, small)
+        self.assertEqual(large._max_workers, 3)
+
+        # Requests still holding the old pool can keep submitting to it
+        self.assertEqual(small.submit(lambda: 1).result(), 1)
@@ -3,3 +3,6 @@ from django.apps import AppConfig
 
 class EnrollmentsConfig(AppConfig):
     name = 'enrollments'
+
+    def ready(self):
+        from . import signals
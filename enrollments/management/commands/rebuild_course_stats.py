@@ -0,0 +1,24 @@
+"""
+Rebuild the CourseStats / CourseBatchStats rollup from Enrollment.
+
+The rollup is kept in step by enrollments.signals; bulk ``update()`` calls
+and raw SQL bypass the signals, so run this after data fixes.
+
+Usage:
+    python manage.py rebuild_course_stats
+"""
+
+from django.core.management.base import BaseCommand
+
+from enrollments.services import rebuild_course_stats
+
+
+class Command(BaseCommand):
+    help = "Recompute active student counts per course and batch."
+
+    def handle(self, *args, **options):
+        courses = rebuild_course_stats()
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Rebuilt student counts for {courses} course(s).")
+        )
@@ -0,0 +1,58 @@
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def backfill(apps, schema_editor):
+    Enrollment = apps.get_model('enrollments', 'Enrollment')
+    CourseStats = apps.get_model('enrollments', 'CourseStats')
+    CourseBatchStats = apps.get_model('enrollments', 'CourseBatchStats')
+
+    active = Enrollment.objects.filter(status='ACTIVE').order_by()
+    CourseStats.objects.bulk_create([
+        CourseStats(course_id=row['course_id'], active_students=row['n'])
+        for row in active.values('course_id').annotate(n=Count('id'))
+    ])
+    CourseBatchStats.objects.bulk_create([
+        CourseBatchStats(
+            course_id=row['course_id'],
+            batch_code=row['batch_code'],
+            active_students=row['n'],
+        )
+        for row in (
+            active.exclude(batch_code__isnull=True).exclude(batch_code='')
+            .values('course_id', 'batch_code').annotate(n=Count('id'))
+        )
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0005_remove_subject_teachers_subjectteacher'),
+        ('enrollments', '0002_enrollment_batch_code'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CourseStats',
+            fields=[
+                ('course', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='courses.course')),
+                ('active_students', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='CourseBatchStats',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('batch_code', models.CharField(max_length=30)),
+                ('active_students', models.PositiveIntegerField(default=0)),
+                ('course', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='batch_stats', to='courses.course')),
+            ],
+            options={
+                'unique_together': {('course', 'batch_code')},
+            },
+        ),
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
@@ -45,3 +45,43 @@ class Enrollment(models.Model):
 
     def __str__(self):
         return f"{self.user.email} → {self.course.title}"
+
+
+class CourseStats(models.Model):
+    """
+    Rollup of active enrollments per course, maintained by
+    enrollments.signals in the same transaction as the Enrollment write.
+    Rebuild with `manage.py rebuild_course_stats`.
+    """
+    course = models.OneToOneField(
+        "courses.Course",
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="stats",
+    )
+
+    active_students = models.PositiveIntegerField(default=0)
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.course_id}: {self.active_students} active"
+
+
+class CourseBatchStats(models.Model):
+    """Per-batch_code breakdown of CourseStats.active_students."""
+    course = models.ForeignKey(
+        "courses.Course",
+        on_delete=models.CASCADE,
+        related_name="batch_stats",
+    )
+
+    batch_code = models.CharField(max_length=30)
+
+    active_students = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ("course", "batch_code")
+
+    def __str__(self):
+        return f"{self.course_id}/{self.batch_code}: {self.active_students}"
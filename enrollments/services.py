@@ -1,4 +1,9 @@
-from .models import Enrollment
+from django.db import transaction
+from django.db.models import Count, F
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from .models import Enrollment, CourseStats, CourseBatchStats
 
 
 def is_user_enrolled(*, user, course) -> bool:
@@ -7,3 +12,90 @@ def is_user_enrolled(*, user, course) -> bool:
         course=course,
         status=Enrollment.STATUS_ACTIVE
     ).exists()
+
+
+def activate_enrollment(*, user, course, batch_code=None):
+    """Create the enrollment, or reactivate a revoked one."""
+    enrollment, created = Enrollment.objects.get_or_create(
+        user=user,
+        course=course,
+        defaults={"status": Enrollment.STATUS_ACTIVE, "batch_code": batch_code},
+    )
+    if not created and enrollment.status != Enrollment.STATUS_ACTIVE:
+        enrollment.status = Enrollment.STATUS_ACTIVE
+        enrollment.save(update_fields=["status"])
+    return enrollment
+
+
+# =========================
+# COURSE STATS ROLLUP
+# =========================
+
+def _bump(model, lookup, delta, **extra):
+    model.objects.get_or_create(**lookup)
+    model.objects.filter(**lookup).update(
+        active_students=Greatest(F("active_students") + delta, 0),
+        **extra,
+    )
+
+
+def adjust_course_stats(course_id, batch_code, delta):
+    with transaction.atomic():
+        _bump(CourseStats, {"course_id": course_id}, delta, updated_at=timezone.now())
+        if batch_code:
+            _bump(
+                CourseBatchStats,
+                {"course_id": course_id, "batch_code": batch_code},
+                delta,
+            )
+
+
+def get_active_students(course_id):
+    return (
+        CourseStats.objects
+        .filter(course_id=course_id)
+        .values_list("active_students", flat=True)
+        .first()
+    ) or 0
+
+
+def get_batch_counts(course_id):
+    return dict(
+        CourseBatchStats.objects
+        .filter(course_id=course_id, active_students__gt=0)
+        .order_by("batch_code")
+        .values_list("batch_code", "active_students")
+    )
+
+
+def rebuild_course_stats():
+    """Recompute every rollup row from Enrollment. Returns courses counted."""
+    active = Enrollment.objects.filter(status=Enrollment.STATUS_ACTIVE).order_by()
+
+    totals = active.values("course_id").annotate(n=Count("id"))
+    batches = (
+        active
+        .exclude(batch_code__isnull=True)
+        .exclude(batch_code="")
+        .values("course_id", "batch_code")
+        .annotate(n=Count("id"))
+    )
+
+    with transaction.atomic():
+        CourseStats.objects.all().delete()
+        CourseBatchStats.objects.all().delete()
+
+        CourseStats.objects.bulk_create([
+            CourseStats(course_id=row["course_id"], active_students=row["n"])
+            for row in totals
+        ])
+        CourseBatchStats.objects.bulk_create([
+            CourseBatchStats(
+                course_id=row["course_id"],
+                batch_code=row["batch_code"],
+                active_students=row["n"],
+            )
+            for row in batches
+        ])
+
+    return CourseStats.objects.count()
@@ -0,0 +1,39 @@
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+
+from .models import Enrollment
+from .services import adjust_course_stats
+
+
+# =========================
+# COURSE STATS ROLLUP
+# =========================
+@receiver(pre_save, sender=Enrollment)
+def remember_previous_state(sender, instance, **kwargs):
+    instance._previous_state = None
+    if not instance._state.adding:
+        instance._previous_state = (
+            Enrollment.objects
+            .filter(pk=instance.pk)
+            .values_list("course_id", "status", "batch_code")
+            .first()
+        )
+
+
+@receiver(post_save, sender=Enrollment)
+def enrollment_saved(sender, instance, **kwargs):
+    previous = getattr(instance, "_previous_state", None)
+    current = (instance.course_id, instance.status, instance.batch_code)
+    if previous == current:
+        return
+
+    if previous and previous[1] == Enrollment.STATUS_ACTIVE:
+        adjust_course_stats(previous[0], previous[2], -1)
+    if instance.status == Enrollment.STATUS_ACTIVE:
+        adjust_course_stats(instance.course_id, instance.batch_code, 1)
+
+
+@receiver(post_delete, sender=Enrollment)
+def enrollment_deleted(sender, instance, **kwargs):
+    if instance.status == Enrollment.STATUS_ACTIVE:
+        adjust_course_stats(instance.course_id, instance.batch_code, -1)
@@ -1,3 +1,154 @@
-from django.test import TestCase
+"""
+Tests for enrollments — the CourseStats rollup.
 
-# Create your tests here.
+Covers:
+  - Create / revoke / reactivate / batch change / delete keep the
+    course and per-batch counts in step
+  - The Razorpay webhook reactivates a revoked enrollment and counts it
+  - rebuild_course_stats repairs drift from bulk updates
+  - Teacher class listing reads counts without per-subject queries
+"""
+
+import hashlib
+import hmac
+import json
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import RequestFactory, TestCase, override_settings
+from rest_framework.test import APIClient
+
+from accounts.models import User, Role, UserRole
+from courses.models import Course, Subject, SubjectTeacher
+from payments.models import Order
+from payments.webhooks import razorpay_webhook
+from .models import Enrollment, CourseStats
+from .services import get_active_students, get_batch_counts
+
+
+@override_settings(ACTIVITY_FANOUT_BACKEND="sync")
+class CourseStatsTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.course = Course.objects.create(title="Class 8")
+        cls.users = [
+            User.objects.create_user(
+                username=f"stat{i}", email=f"stat{i}@test.com", password="testpass123"
+            )
+            for i in range(3)
+        ]
+
+    def enroll(self, user, batch_code=None):
+        return Enrollment.objects.create(
+            user=user, course=self.course, batch_code=batch_code
+        )
+
+    def test_create_and_batch_breakdown(self):
+        self.enroll(self.users[0], "A")
+        self.enroll(self.users[1], "A")
+        self.enroll(self.users[2])
+
+        self.assertEqual(get_active_students(self.course.id), 3)
+        self.assertEqual(get_batch_counts(self.course.id), {"A": 2})
+
+    def test_revoke_reactivate_and_delete(self):
+        enrollment = self.enroll(self.users[0], "A")
+
+        enrollment.status = Enrollment.STATUS_REVOKED
+        enrollment.save()
+        self.assertEqual(get_active_students(self.course.id), 0)
+        self.assertEqual(get_batch_counts(self.course.id), {})
+
+        # Saving again without a change does not double count
+        enrollment.save()
+        enrollment.status = Enrollment.STATUS_ACTIVE
+        enrollment.save()
+        enrollment.save()
+        self.assertEqual(get_active_students(self.course.id), 1)
+
+        enrollment.delete()
+        self.assertEqual(get_active_students(self.course.id), 0)
+
+    def test_batch_change_moves_the_student(self):
+        enrollment = self.enroll(self.users[0], "A")
+
+        enrollment.batch_code = "B"
+        enrollment.save()
+
+        self.assertEqual(get_active_students(self.course.id), 1)
+        self.assertEqual(get_batch_counts(self.course.id), {"B": 1})
+
+    @override_settings(RAZORPAY_WEBHOOK_SECRET="whsec")
+    def test_webhook_reactivates_revoked_enrollment(self):
+        Role.objects.create(name=Role.STUDENT)
+        user = self.users[0]
+        self.enroll(user).delete()
+        Enrollment.objects.create(
+            user=user, course=self.course, status=Enrollment.STATUS_REVOKED
+        )
+        Order.objects.create(
+            user=user,
+            course=self.course,
+            razorpay_order_id="order_1",
+            amount=50000,
+            status=Order.STATUS_CREATED,
+        )
+
+        body = json.dumps({
+            "event": "payment.captured",
+            "payload": {"payment": {"entity": {"id": "pay_1", "order_id": "order_1"}}},
+        }).encode()
+        signature = hmac.new(b"whsec", body, hashlib.sha256).hexdigest()
+
+        request = RequestFactory().post(
+            "/webhook/",
+            body,
+            content_type="application/json",
+            HTTP_X_RAZORPAY_SIGNATURE=signature,
+        )
+        res = razorpay_webhook(request)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(
+            Enrollment.objects.get(user=user).status, Enrollment.STATUS_ACTIVE
+        )
+        self.assertEqual(get_active_students(self.course.id), 1)
+
+    def test_rebuild_command_repairs_drift(self):
+        self.enroll(self.users[0], "A")
+        self.enroll(self.users[1], "B")
+
+        # update() bypasses the signals
+        Enrollment.objects.filter(user=self.users[1]).update(
+            status=Enrollment.STATUS_REVOKED
+        )
+        CourseStats.objects.filter(course=self.course).update(active_students=7)
+
+        call_command("rebuild_course_stats", stdout=StringIO())
+
+        self.assertEqual(get_active_students(self.course.id), 1)
+        self.assertEqual(get_batch_counts(self.course.id), {"A": 1})
+
+    def test_teacher_classes_query_count(self):
+        teacher = User.objects.create_user(
+            username="statteacher", email="statteacher@test.com", password="testpass123"
+        )
+        UserRole.objects.create(
+            user=teacher, role=Role.objects.create(name=Role.TEACHER), is_active=True
+        )
+        for i in range(3):
+            subject = Subject.objects.create(course=self.course, name=f"S{i}")
+            SubjectTeacher.objects.create(subject=subject, teacher=teacher)
+        self.enroll(self.users[0])
+        self.enroll(self.users[1])
+
+        client = APIClient()
+        client.force_authenticate(user=teacher)
+        client.get("/api/courses/teacher/my-classes/")  # warm role cache
+
+        with self.assertNumQueries(1):
+            res = client.get("/api/courses/teacher/my-classes/")
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual([row["students_count"] for row in res.data], [2, 2, 2])
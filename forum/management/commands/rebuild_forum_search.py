@@ -0,0 +1,21 @@
+"""
+Rebuild the forum search index from scratch (tsvector columns on
+PostgreSQL, the SearchTerm inverted index elsewhere).
+
+Usage:
+    python manage.py rebuild_forum_search
+"""
+
+from django.core.management.base import BaseCommand
+
+from forum.search import rebuild_index
+
+
+class Command(BaseCommand):
+    help = "Re-index every forum thread and comment for search."
+
+    def handle(self, *args, **options):
+        posts, replies = rebuild_index()
+        self.stdout.write(
+            self.style.SUCCESS(f"Indexed {posts} thread(s) and {replies} comment(s).")
+        )
@@ -0,0 +1,33 @@
+"""
+Recompute the denormalized reply/upvote counters on ForumPost and Reply
+from the underlying rows and fix any that drifted.
+
+Counters are maintained with F() updates by the forum views; cascades
+(e.g. deleting a user removes their votes and replies) bypass that path.
+
+Usage:
+    python manage.py reconcile_forum_counters
+
+Run via cron nightly, e.g.:
+    0 3 * * * cd /path/to/project && python manage.py reconcile_forum_counters
+"""
+
+from django.core.management.base import BaseCommand
+
+from forum.services import reconcile_counters
+
+
+class Command(BaseCommand):
+    help = "Fix drifted reply/upvote counters on forum threads and comments."
+
+    def handle(self, *args, **options):
+        posts_fixed, replies_fixed = reconcile_counters()
+
+        if posts_fixed or replies_fixed:
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"Fixed {posts_fixed} thread(s) and {replies_fixed} comment(s)."
+                )
+            )
+        else:
+            self.stdout.write("All forum counters are in sync.")
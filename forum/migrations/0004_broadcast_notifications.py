@@ -0,0 +1,43 @@
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("forum", "0003_notification"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="notification",
+            name="recipient",
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name="forum_notifications", to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name="notification",
+            index=models.Index(fields=["recipient", "-created_at"], name="forum_notif_recipient_created"),
+        ),
+        migrations.CreateModel(
+            name="NotificationCursor",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("read_until", models.DateTimeField()),
+                ("user", models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name="forum_notification_cursor", to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name="NotificationRead",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("notification", models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name="reads", to="forum.notification")),
+                ("user", models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name="forum_notification_reads", to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                "unique_together": {("user", "notification")},
+            },
+        ),
+    ]
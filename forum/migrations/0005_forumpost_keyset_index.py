@@ -0,0 +1,15 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("forum", "0004_broadcast_notifications"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="forumpost",
+            index=models.Index(fields=["-created_at", "-id"], name="forum_post_created_id"),
+        ),
+    ]
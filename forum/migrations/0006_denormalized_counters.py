@@ -0,0 +1,63 @@
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def _count_of(model, fk):
+    return Coalesce(
+        Subquery(
+            model.objects.filter(**{fk: OuterRef("pk")})
+            .order_by()
+            .values(fk)
+            .annotate(n=Count("pk"))
+            .values("n"),
+            output_field=IntegerField(),
+        ),
+        Value(0),
+    )
+
+
+def backfill_counters(apps, schema_editor):
+    ForumPost = apps.get_model("forum", "ForumPost")
+    Reply = apps.get_model("forum", "Reply")
+    PostUpvote = apps.get_model("forum", "PostUpvote")
+    ReplyUpvote = apps.get_model("forum", "ReplyUpvote")
+
+    ForumPost.objects.update(
+        reply_count=_count_of(Reply, "post"),
+        upvote_count=_count_of(PostUpvote, "post"),
+    )
+    Reply.objects.update(upvote_count=_count_of(ReplyUpvote, "reply"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("forum", "0005_forumpost_keyset_index"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="forumpost",
+            name="reply_count",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="forumpost",
+            name="upvote_count",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="reply",
+            name="upvote_count",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="forumpost",
+            index=models.Index(
+                fields=["-upvote_count", "-created_at", "-id"],
+                name="forum_post_popular",
+            ),
+        ),
+    ]
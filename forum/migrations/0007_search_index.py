@@ -0,0 +1,68 @@
+import django.contrib.postgres.search
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def create_search_indexes(apps, schema_editor):
+    # GIN + tsvector only exist on PostgreSQL; other databases use the
+    # SearchTerm inverted index instead (see forum.search).
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute(
+        "CREATE INDEX IF NOT EXISTS forum_post_search "
+        "ON forum_forumpost USING GIN (search_vector)"
+    )
+    schema_editor.execute(
+        "CREATE INDEX IF NOT EXISTS forum_reply_search "
+        "ON forum_reply USING GIN (search_vector)"
+    )
+    schema_editor.execute(
+        "UPDATE forum_forumpost SET search_vector = "
+        "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+        "setweight(to_tsvector('english', coalesce(content, '')), 'B')"
+    )
+    schema_editor.execute(
+        "UPDATE forum_reply SET search_vector = "
+        "setweight(to_tsvector('english', coalesce(content, '')), 'C')"
+    )
+
+
+def drop_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute("DROP INDEX IF EXISTS forum_post_search")
+    schema_editor.execute("DROP INDEX IF EXISTS forum_reply_search")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("forum", "0006_denormalized_counters"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="forumpost",
+            name="search_vector",
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name="reply",
+            name="search_vector",
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.CreateModel(
+            name="SearchTerm",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("term", models.CharField(max_length=64)),
+                ("weight", models.PositiveIntegerField(default=1)),
+                ("post", models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name="search_terms", to="forum.forumpost")),
+                ("reply", models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name="search_terms", to="forum.reply")),
+            ],
+            options={
+                "indexes": [models.Index(fields=["term", "post"], name="forum_search_term_post")],
+            },
+        ),
+        migrations.RunPython(create_search_indexes, drop_search_indexes),
+    ]
@@ -1,5 +1,6 @@
 from django.db import models
 from django.conf import settings
+from django.contrib.postgres.search import SearchVectorField
 
 
 class Tag(models.Model):
@@ -21,8 +22,26 @@ class ForumPost(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    # Denormalized counters, kept in step with F() updates
+    # (see forum.services; reconcile with `manage.py reconcile_forum_counters`)
+    reply_count = models.PositiveIntegerField(default=0)
+    upvote_count = models.PositiveIntegerField(default=0)
+
+    # Weighted title/content tsvector (PostgreSQL only, see forum.search);
+    # its GIN index is created in migration 0007
+    search_vector = SearchVectorField(null=True, editable=False)
+
     class Meta:
         ordering = ["-created_at"]
+        indexes = [
+            # Keyset pagination of thread listings
+            models.Index(fields=["-created_at", "-id"], name="forum_post_created_id"),
+            # "popular" sort
+            models.Index(
+                fields=["-upvote_count", "-created_at", "-id"],
+                name="forum_post_popular",
+            ),
+        ]
 
     def __str__(self):
         return self.title
@@ -70,6 +89,11 @@ class Reply(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    # Denormalized counter, kept in step with F() updates
+    upvote_count = models.PositiveIntegerField(default=0)
+
+    search_vector = SearchVectorField(null=True, editable=False)
+
     class Meta:
         ordering = ["created_at"]
         verbose_name_plural = "replies"
@@ -98,7 +122,44 @@ class ReplyUpvote(models.Model):
         return f"{self.user} upvoted reply on {self.reply.post}"
 
 
+
+class SearchTerm(models.Model):
+    """
+    Inverted index used by the portable search backend (forum.search)
+    when the database has no full-text support. One row per distinct
+    term of a post's title/content, or of one of its replies.
+    """
+    term = models.CharField(max_length=64)
+    post = models.ForeignKey(
+        ForumPost,
+        on_delete=models.CASCADE,
+        related_name="search_terms"
+    )
+    reply = models.ForeignKey(
+        Reply,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name="search_terms"
+    )
+    weight = models.PositiveIntegerField(default=1)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["term", "post"], name="forum_search_term_post"),
+        ]
+
+    def __str__(self):
+        return f"{self.term} -> {self.post_id}"
+
 class Notification(models.Model):
+    """
+    Targeted notifications (replies, upvotes) have a recipient.
+    Broadcast notifications (new threads) are stored once with
+    recipient=None and are visible to every user who joined before the
+    event, except the sender; their read state comes from the user's
+    NotificationCursor plus any NotificationRead rows.
+    """
     TYPES = (
         ("new_thread", "New Thread"),
         ("new_reply", "New Reply"),
@@ -108,6 +169,8 @@ class Notification(models.Model):
     recipient = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
+        null=True,
+        blank=True,
         related_name="forum_notifications"
     )
     sender = models.ForeignKey(
@@ -129,6 +192,50 @@ class Notification(models.Model):
 
     class Meta:
         ordering = ["-created_at"]
+        indexes = [
+            models.Index(
+                fields=["recipient", "-created_at"],
+                name="forum_notif_recipient_created",
+            ),
+        ]
+
+    @property
+    def is_broadcast(self):
+        return self.recipient_id is None
+
+    def __str__(self):
+        return f"Notification for {self.recipient or 'everyone'}: {self.message}"
+
+
+class NotificationCursor(models.Model):
+    """Per-user high-water mark: broadcasts up to read_until are read."""
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="forum_notification_cursor"
+    )
+    read_until = models.DateTimeField()
+
+    def __str__(self):
+        return f"{self.user} read until {self.read_until}"
+
+
+class NotificationRead(models.Model):
+    """A single broadcast marked read above the user's cursor."""
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="forum_notification_reads"
+    )
+    notification = models.ForeignKey(
+        Notification,
+        on_delete=models.CASCADE,
+        related_name="reads"
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ("user", "notification")
 
     def __str__(self):
-        return f"Notification for {self.recipient}: {self.message}"
+        return f"{self.user} read {self.notification_id}"
@@ -0,0 +1,168 @@
+"""
+Forum full-text search.
+
+Two interchangeable backends, picked from the database vendor:
+
+  - PostgreSQL: weighted ``tsvector`` columns on ForumPost/Reply behind GIN
+    indexes, matched with ``websearch_to_tsquery`` and ranked by ts_rank.
+  - Anything else (SQLite in dev/tests): a term -> post inverted index
+    (``SearchTerm``) built by the tokenizer below, ranked by summed weight.
+
+Both return a filtered/annotated queryset, so tag and date filters and
+keyset pagination compose into the same SQL statement. A thread matches
+when every search term occurs in its title, body or one of its replies.
+"""
+import re
+from collections import Counter
+
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+from django.db import connection
+from django.db.models import (
+    Count, Exists, F, FloatField, IntegerField, OuterRef, Q, Subquery, Sum, Value,
+)
+from django.db.models.functions import Cast
+
+from .models import ForumPost, Reply, SearchTerm
+
+
+SEARCH_CONFIG = "english"
+
+# Weights (portable backend); mirrors tsvector A/B/C
+WEIGHT_TITLE = 4
+WEIGHT_CONTENT = 2
+WEIGHT_REPLY = 1
+
+MAX_TERM_LENGTH = 64
+MAX_QUERY_TERMS = 8
+
+_TOKEN_RE = re.compile(r"[^\W_]+", re.UNICODE)
+
+STOP_WORDS = frozenset("""
+    a an and are as at be but by for from has have i in is it its of on or
+    that the this to was were will with you your
+""".split())
+
+
+def use_postgres():
+    return connection.vendor == "postgresql"
+
+
+def tokenize(text):
+    """Lower-cased word tokens without stop words or 1-char noise."""
+    return [
+        token[:MAX_TERM_LENGTH]
+        for token in _TOKEN_RE.findall((text or "").lower())
+        if len(token) > 1 and token not in STOP_WORDS
+    ]
+
+
+# =====================================================
+# Indexing (called from forum.signals on save)
+# =====================================================
+def _weighted_terms(*parts):
+    weights = Counter()
+    for text, weight in parts:
+        for term in set(tokenize(text)):
+            weights[term] += weight
+    return weights
+
+
+def index_post(post):
+    if use_postgres():
+        ForumPost.objects.filter(pk=post.pk).update(
+            search_vector=(
+                SearchVector("title", weight="A", config=SEARCH_CONFIG)
+                + SearchVector("content", weight="B", config=SEARCH_CONFIG)
+            )
+        )
+        return
+
+    SearchTerm.objects.filter(post_id=post.pk, reply__isnull=True).delete()
+    terms = _weighted_terms(
+        (post.title, WEIGHT_TITLE),
+        (post.content, WEIGHT_CONTENT),
+    )
+    SearchTerm.objects.bulk_create([
+        SearchTerm(term=term, post_id=post.pk, weight=weight)
+        for term, weight in terms.items()
+    ])
+
+
+def index_reply(reply):
+    if use_postgres():
+        Reply.objects.filter(pk=reply.pk).update(
+            search_vector=SearchVector("content", weight="C", config=SEARCH_CONFIG)
+        )
+        return
+
+    SearchTerm.objects.filter(reply_id=reply.pk).delete()
+    terms = _weighted_terms((reply.content, WEIGHT_REPLY))
+    SearchTerm.objects.bulk_create([
+        SearchTerm(term=term, post_id=reply.post_id, reply_id=reply.pk, weight=weight)
+        for term, weight in terms.items()
+    ])
+
+
+def rebuild_index():
+    """Re-index every post and reply. Returns (posts, replies) indexed."""
+    if use_postgres():
+        posts = ForumPost.objects.update(
+            search_vector=(
+                SearchVector("title", weight="A", config=SEARCH_CONFIG)
+                + SearchVector("content", weight="B", config=SEARCH_CONFIG)
+            )
+        )
+        replies = Reply.objects.update(
+            search_vector=SearchVector("content", weight="C", config=SEARCH_CONFIG)
+        )
+        return posts, replies
+
+    SearchTerm.objects.all().delete()
+    posts = replies = 0
+    for post in ForumPost.objects.only("id", "title", "content").iterator():
+        index_post(post)
+        posts += 1
+    for reply in Reply.objects.only("id", "post_id", "content").iterator():
+        index_reply(reply)
+        replies += 1
+    return posts, replies
+
+
+# =====================================================
+# Querying
+# =====================================================
+def search_threads(queryset, text):
+    """
+    Restrict a ForumPost queryset to threads matching ``text`` and annotate
+    ``search_rank`` (higher is better).
+    """
+    if use_postgres():
+        query = SearchQuery(text, search_type="websearch", config=SEARCH_CONFIG)
+        reply_match = Reply.objects.filter(post=OuterRef("pk"), search_vector=query)
+        return queryset.filter(
+            Q(search_vector=query) | Exists(reply_match)
+        ).annotate(
+            # ts_rank is float4; as float8 the value a keyset cursor carries
+            # back compares equal to the row it came from
+            search_rank=Cast(SearchRank(F("search_vector"), query), FloatField()),
+        )
+
+    terms = list(dict.fromkeys(tokenize(text)))[:MAX_QUERY_TERMS]
+    if not terms:
+        return queryset.annotate(search_rank=Value(0)).none()
+
+    matches = (
+        SearchTerm.objects
+        .filter(term__in=terms)
+        .values("post_id")
+        .annotate(hits=Count("term", distinct=True), score=Sum("weight"))
+        .filter(hits=len(terms))
+    )
+    return queryset.filter(
+        pk__in=matches.values("post_id"),
+    ).annotate(
+        search_rank=Subquery(
+            matches.filter(post_id=OuterRef("pk")).values("score"),
+            output_field=IntegerField(),
+        ),
+    )
@@ -39,11 +39,15 @@ class ForumPostSerializer(serializers.ModelSerializer):
         return obj.author.username
 
     def get_tags(self, obj):
-        return list(obj.tags.values_list("name", flat=True))
+        # Served from prefetch_related("tags") when the view did it
+        return [tag.name for tag in obj.tags.all()]
 
     user_has_upvoted = serializers.SerializerMethodField()
 
     def get_user_has_upvoted(self, obj):
+        # Batched by the view (forum.services.upvote_context)
+        if "upvoted_ids" in self.context:
+            return obj.id in self.context["upvoted_ids"]
         request = self.context.get("request")
         if request and request.user.is_authenticated:
             return obj.upvotes.filter(user=request.user).exists()
@@ -90,6 +94,9 @@ class CommentSerializer(serializers.ModelSerializer):
     user_has_upvoted = serializers.SerializerMethodField()
 
     def get_user_has_upvoted(self, obj):
+        # Batched by the view (forum.services.upvote_context)
+        if "upvoted_ids" in self.context:
+            return obj.id in self.context["upvoted_ids"]
         request = self.context.get("request")
         if request and request.user.is_authenticated:
             return obj.upvotes.filter(user=request.user).exists()
@@ -107,6 +114,7 @@ class CreateCommentSerializer(serializers.Serializer):
 class NotificationSerializer(serializers.ModelSerializer):
     sender_username = serializers.SerializerMethodField()
     thread_id = serializers.IntegerField(source="thread.id", read_only=True, default=None)
+    is_read = serializers.SerializerMethodField()
 
     class Meta:
         model = Notification
@@ -122,3 +130,11 @@ class NotificationSerializer(serializers.ModelSerializer):
 
     def get_sender_username(self, obj):
         return obj.sender.username
+
+    def get_is_read(self, obj):
+        if not obj.is_broadcast:
+            return obj.is_read
+        read_until = self.context.get("read_until")
+        if read_until is not None and obj.created_at <= read_until:
+            return True
+        return obj.id in self.context.get("read_broadcast_ids", ())
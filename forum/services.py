@@ -0,0 +1,234 @@
+from django.db import transaction
+from django.db.models import Count, F, IntegerField, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce, Greatest
+from django.utils import timezone
+
+from .models import (
+    ForumPost,
+    Reply,
+    PostUpvote,
+    ReplyUpvote,
+    Notification,
+    NotificationCursor,
+    NotificationRead,
+)
+
+
+# =====================================================
+# Notifications (targeted + broadcast)
+# =====================================================
+def broadcast_notification(*, sender, notification_type, message, thread=None):
+    """One row per event, whatever the number of users on the platform."""
+    return Notification.objects.create(
+        recipient=None,
+        sender=sender,
+        notification_type=notification_type,
+        message=message,
+        thread=thread,
+    )
+
+
+def _broadcast_filter(user):
+    return (
+        Q(recipient__isnull=True, created_at__gte=user.date_joined)
+        & ~Q(sender=user)
+    )
+
+
+def visible_notifications(user):
+    """Targeted notifications for ``user`` merged with broadcasts."""
+    return Notification.objects.filter(
+        Q(recipient=user) | _broadcast_filter(user)
+    )
+
+
+def get_read_until(user):
+    return (
+        NotificationCursor.objects
+        .filter(user=user)
+        .values_list("read_until", flat=True)
+        .first()
+    )
+
+
+def read_state_context(user, notifications):
+    """
+    Serializer context needed to resolve ``is_read`` of broadcasts on a
+    page of notifications.
+    """
+    read_until = get_read_until(user)
+    broadcast_ids = [
+        n.id for n in notifications
+        if n.is_broadcast and (read_until is None or n.created_at > read_until)
+    ]
+    read_ids = set()
+    if broadcast_ids:
+        read_ids = set(
+            NotificationRead.objects
+            .filter(user=user, notification_id__in=broadcast_ids)
+            .values_list("notification_id", flat=True)
+        )
+    return {"read_until": read_until, "read_broadcast_ids": read_ids}
+
+
+def unread_notification_count(user):
+    targeted = Notification.objects.filter(recipient=user, is_read=False).count()
+
+    broadcasts = Notification.objects.filter(_broadcast_filter(user))
+    read_until = get_read_until(user)
+    if read_until is not None:
+        broadcasts = broadcasts.filter(created_at__gt=read_until)
+
+    unread_broadcasts = broadcasts.exclude(reads__user=user).count()
+    return targeted + unread_broadcasts
+
+
+def mark_all_notifications_read(user):
+    now = timezone.now()
+    Notification.objects.filter(recipient=user, is_read=False).update(is_read=True)
+    NotificationCursor.objects.update_or_create(
+        user=user, defaults={"read_until": now}
+    )
+    # Individual reads below the cursor are now redundant
+    NotificationRead.objects.filter(
+        user=user, notification__created_at__lte=now
+    ).delete()
+
+
+def mark_notification_read(user, notification):
+    if not notification.is_broadcast:
+        notification.is_read = True
+        notification.save(update_fields=["is_read"])
+        return
+
+    read_until = get_read_until(user)
+    if read_until is None or notification.created_at > read_until:
+        NotificationRead.objects.get_or_create(
+            user=user, notification=notification
+        )
+
+
+# =====================================================
+# Denormalized counters (ForumPost / Reply)
+# =====================================================
+_UPVOTES = {
+    ForumPost: (PostUpvote, "post"),
+    Reply: (ReplyUpvote, "reply"),
+}
+
+
+def _adjust(model, pk, field, delta):
+    """Atomic ``field += delta`` in the database, never below zero."""
+    model.objects.filter(pk=pk).update(**{field: Greatest(F(field) + delta, 0)})
+
+
+def toggle_upvote(user, target):
+    """
+    Flip ``user``'s upvote on a ForumPost or Reply.
+    Returns (upvoted, upvote_count).
+    """
+    vote_model, field = _UPVOTES[type(target)]
+    model = type(target)
+
+    with transaction.atomic():
+        deleted, _ = vote_model.objects.filter(user=user, **{field: target}).delete()
+        if deleted:
+            _adjust(model, target.pk, "upvote_count", -1)
+            upvoted = False
+        else:
+            _, created = vote_model.objects.get_or_create(user=user, **{field: target})
+            if created:
+                _adjust(model, target.pk, "upvote_count", 1)
+            upvoted = True
+
+    upvote_count = (
+        model.objects.filter(pk=target.pk)
+        .values_list("upvote_count", flat=True)
+        .first()
+    )
+    return upvoted, upvote_count
+
+
+def upvote_context(user, items):
+    """
+    Serializer context resolving ``user_has_upvoted`` for a whole page of
+    ForumPosts or Replies with one query.
+    """
+    items = list(items)
+    if not items or not user.is_authenticated:
+        return {"upvoted_ids": set()}
+
+    vote_model, field = _UPVOTES[type(items[0])]
+    return {
+        "upvoted_ids": set(
+            vote_model.objects
+            .filter(user=user, **{f"{field}_id__in": [item.pk for item in items]})
+            .values_list(f"{field}_id", flat=True)
+        )
+    }
+
+
+def create_reply(*, post, author, content, reply_to=None):
+    with transaction.atomic():
+        reply = Reply.objects.create(
+            post=post,
+            author=author,
+            content=content,
+            reply_to=reply_to,
+        )
+        _adjust(ForumPost, post.pk, "reply_count", 1)
+    return reply
+
+
+def delete_reply(reply):
+    with transaction.atomic():
+        reply.delete()
+        _adjust(ForumPost, reply.post_id, "reply_count", -1)
+
+
+def _count_of(model, fk):
+    return Coalesce(
+        Subquery(
+            model.objects.filter(**{fk: OuterRef("pk")})
+            .order_by()
+            .values(fk)
+            .annotate(n=Count("pk"))
+            .values("n"),
+            output_field=IntegerField(),
+        ),
+        Value(0),
+    )
+
+
+def reconcile_counters():
+    """
+    Recompute every counter from the source rows and fix the ones that
+    drifted (e.g. after users were deleted, which cascades votes/replies
+    without going through the services above).
+    Returns (posts_fixed, replies_fixed).
+    """
+    posts = ForumPost.objects.annotate(
+        actual_replies=_count_of(Reply, "post"),
+        actual_upvotes=_count_of(PostUpvote, "post"),
+    ).exclude(
+        reply_count=F("actual_replies"),
+        upvote_count=F("actual_upvotes"),
+    )
+    posts_fixed = 0
+    for post_id, replies, upvotes in list(
+        posts.values_list("pk", "actual_replies", "actual_upvotes")
+    ):
+        ForumPost.objects.filter(pk=post_id).update(
+            reply_count=replies, upvote_count=upvotes
+        )
+        posts_fixed += 1
+
+    replies = Reply.objects.annotate(
+        actual_upvotes=_count_of(ReplyUpvote, "reply"),
+    ).exclude(upvote_count=F("actual_upvotes"))
+    replies_fixed = 0
+    for reply_id, upvotes in list(replies.values_list("pk", "actual_upvotes")):
+        Reply.objects.filter(pk=reply_id).update(upvote_count=upvotes)
+        replies_fixed += 1
+
+    return posts_fixed, replies_fixed
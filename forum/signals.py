@@ -0,0 +1,18 @@
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from .models import ForumPost, Reply
+from .search import index_post, index_reply
+
+
+# =========================
+# SEARCH INDEX
+# =========================
+@receiver(post_save, sender=ForumPost)
+def post_saved(sender, instance, **kwargs):
+    index_post(instance)
+
+
+@receiver(post_save, sender=Reply)
+def reply_saved(sender, instance, **kwargs):
+    index_reply(instance)
@@ -0,0 +1,472 @@
+"""
+Tests for forum.
+
+Covers:
+  - New-thread notifications are a single broadcast row
+  - Broadcast read state via cursor and per-item reads
+  - Keyset pagination of threads and notifications
+  - Denormalized reply/upvote counters and their reconciliation
+  - Listings resolve user_has_upvoted and tags in a fixed number of queries
+  - Indexed full-text search combined with tag/date filters
+"""
+
+from datetime import timedelta
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from accounts.models import User
+from .models import ForumPost, Reply, Notification, PostUpvote, ReplyUpvote
+from .search import tokenize
+
+
+# ===================================================================
+# HELPERS
+# ===================================================================
+
+class BaseForumTestCase(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            username="author",
+            email="author@test.com",
+            password="testpass123",
+        )
+        cls.reader = User.objects.create_user(
+            username="reader",
+            email="reader@test.com",
+            password="testpass123",
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def get_client(self, user):
+        client = APIClient()
+        client.force_authenticate(user=user)
+        return client
+
+    def create_thread(self, title="Hello", client=None):
+        client = client or self.get_client(self.author)
+        res = client.post(
+            "/api/forum/threads/create/",
+            {"title": title, "body": "Body", "tags": ["general"]},
+            format="json",
+        )
+        self.assertEqual(res.status_code, 201, res.data)
+        return res.data
+
+
+# ===================================================================
+# NOTIFICATIONS
+# ===================================================================
+
+class BroadcastNotificationTest(BaseForumTestCase):
+
+    def test_new_thread_is_one_row(self):
+        User.objects.bulk_create([
+            User(username=f"extra{i}", email=f"extra{i}@test.com")
+            for i in range(50)
+        ])
+        self.create_thread()
+        self.assertEqual(Notification.objects.count(), 1)
+        self.assertIsNone(Notification.objects.get().recipient)
+
+    def test_thread_creation_cost_independent_of_user_count(self):
+        client = self.get_client(self.author)
+        self.create_thread(title="Warm-up", client=client)  # creates the tag
+        counts = []
+        for batch in range(2):
+            User.objects.bulk_create([
+                User(username=f"u{batch}-{i}", email=f"u{batch}-{i}@test.com")
+                for i in range(100)
+            ])
+            with CaptureQueriesContext(connection) as ctx:
+                self.create_thread(title=f"T{batch}", client=client)
+            counts.append(len(ctx.captured_queries))
+        self.assertEqual(counts[0], counts[1])
+
+    def test_reader_sees_broadcast_author_does_not(self):
+        self.create_thread()
+
+        res = self.get_client(self.reader).get("/api/forum/notifications/")
+        self.assertEqual(res.data["count"], 1)
+        self.assertEqual(res.data["unread_count"], 1)
+        self.assertFalse(res.data["results"][0]["is_read"])
+
+        res = self.get_client(self.author).get("/api/forum/notifications/")
+        self.assertEqual(res.data["count"], 0)
+
+    def test_users_joining_later_do_not_see_old_broadcasts(self):
+        self.create_thread()
+        late = User.objects.create_user(
+            username="late", email="late@test.com", password="testpass123"
+        )
+        res = self.get_client(late).get("/api/forum/notifications/")
+        self.assertEqual(res.data["count"], 0)
+
+    def test_mark_single_broadcast_read(self):
+        self.create_thread(title="One")
+        self.create_thread(title="Two")
+        client = self.get_client(self.reader)
+
+        first = client.get("/api/forum/notifications/").data["results"][0]
+        res = client.post(f"/api/forum/notifications/{first['id']}/read/")
+        self.assertEqual(res.status_code, 200)
+
+        data = client.get("/api/forum/notifications/").data
+        self.assertEqual(data["unread_count"], 1)
+        read = {n["id"]: n["is_read"] for n in data["results"]}
+        self.assertTrue(read[first["id"]])
+
+    def test_mark_all_read_moves_cursor(self):
+        self.create_thread(title="One")
+        self.create_thread(title="Two")
+        client = self.get_client(self.reader)
+
+        client.post("/api/forum/notifications/read/")
+        data = client.get("/api/forum/notifications/").data
+        self.assertEqual(data["unread_count"], 0)
+        self.assertTrue(all(n["is_read"] for n in data["results"]))
+
+        self.create_thread(title="Three")
+        self.assertEqual(
+            client.get("/api/forum/notifications/").data["unread_count"], 1
+        )
+
+    def test_reply_notification_is_targeted(self):
+        thread = self.create_thread()
+        self.get_client(self.reader).post(
+            f"/api/forum/threads/{thread['id']}/comments/create/",
+            {"content": "Nice"},
+            format="json",
+        )
+        data = self.get_client(self.author).get("/api/forum/notifications/").data
+        self.assertEqual(data["count"], 1)
+        self.assertEqual(data["results"][0]["notification_type"], "new_reply")
+
+
+# ===================================================================
+# PAGINATION
+# ===================================================================
+
+class ThreadPaginationTest(BaseForumTestCase):
+
+    def create_posts(self, count):
+        return ForumPost.objects.bulk_create([
+            ForumPost(author=self.author, title=f"Post {i}")
+            for i in range(count)
+        ])
+
+    def walk(self, client, params):
+        ids, cursor = [], None
+        while True:
+            query = dict(params, **({"cursor": cursor} if cursor else {}))
+            data = client.get("/api/forum/threads/", query).data
+            ids.extend(t["id"] for t in data["results"])
+            cursor = data["next"]
+            if not cursor:
+                return ids, data
+
+    def test_walks_every_thread_once_in_order(self):
+        # bulk_create gives identical created_at, so the id tie-break matters
+        posts = self.create_posts(23)
+        client = self.get_client(self.reader)
+
+        ids, _ = self.walk(client, {"page_size": 5})
+        self.assertEqual(ids, sorted((p.id for p in posts), reverse=True))
+
+        ids, _ = self.walk(client, {"page_size": 5, "sort": "oldest"})
+        self.assertEqual(ids, sorted(p.id for p in posts))
+
+    def test_popular_sort_pages_by_upvotes(self):
+        posts = self.create_posts(6)
+        for user, post in [
+            (self.reader, posts[2]),
+            (self.author, posts[2]),
+            (self.reader, posts[4]),
+        ]:
+            self.get_client(user).post(f"/api/forum/threads/{post.id}/upvote/")
+
+        ids, _ = self.walk(
+            self.get_client(self.reader), {"page_size": 2, "sort": "popular"}
+        )
+        self.assertEqual(ids[:2], [posts[2].id, posts[4].id])
+        self.assertEqual(len(ids), 6)
+        self.assertEqual(len(set(ids)), 6)
+
+    def test_previous_cursor_returns_prior_page(self):
+        self.create_posts(9)
+        client = self.get_client(self.reader)
+
+        first = client.get("/api/forum/threads/", {"page_size": 3}).data
+        self.assertIsNone(first["previous"])
+        self.assertEqual(first["count"], 9)
+
+        second = client.get(
+            "/api/forum/threads/", {"page_size": 3, "cursor": first["next"]}
+        ).data
+        back = client.get(
+            "/api/forum/threads/", {"page_size": 3, "cursor": second["previous"]}
+        ).data
+        self.assertEqual(
+            [t["id"] for t in back["results"]],
+            [t["id"] for t in first["results"]],
+        )
+
+    def test_deep_page_costs_same_as_first(self):
+        self.create_posts(60)
+        client = self.get_client(self.reader)
+        client.get("/api/forum/threads/", {"page_size": 5})  # warm count cache
+
+        with CaptureQueriesContext(connection) as first_ctx:
+            data = client.get("/api/forum/threads/", {"page_size": 5}).data
+        for _ in range(8):
+            data = client.get(
+                "/api/forum/threads/", {"page_size": 5, "cursor": data["next"]}
+            ).data
+        with CaptureQueriesContext(connection) as deep_ctx:
+            client.get(
+                "/api/forum/threads/", {"page_size": 5, "cursor": data["next"]}
+            )
+
+        self.assertEqual(len(first_ctx), len(deep_ctx))
+        for query in deep_ctx.captured_queries:
+            self.assertNotIn("OFFSET", query["sql"])
+
+    def test_invalid_cursor_is_rejected(self):
+        res = self.get_client(self.reader).get(
+            "/api/forum/threads/", {"cursor": "not-a-cursor"}
+        )
+        self.assertEqual(res.status_code, 400)
+
+    def test_notifications_are_cursor_paginated(self):
+        for i in range(5):
+            self.create_thread(title=f"T{i}")
+        client = self.get_client(self.reader)
+
+        first = client.get("/api/forum/notifications/", {"page_size": 3}).data
+        self.assertEqual(len(first["results"]), 3)
+        second = client.get(
+            "/api/forum/notifications/",
+            {"page_size": 3, "cursor": first["next"]},
+        ).data
+        self.assertEqual(len(second["results"]), 2)
+        self.assertIsNone(second["next"])
+        self.assertFalse(
+            {n["id"] for n in first["results"]} & {n["id"] for n in second["results"]}
+        )
+
+
+# ===================================================================
+# COUNTERS
+# ===================================================================
+
+class ForumCounterTest(BaseForumTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.thread = self.create_thread()
+        self.post = ForumPost.objects.get(pk=self.thread["id"])
+
+    def comment(self, client, content="Hi"):
+        res = client.post(
+            f"/api/forum/threads/{self.post.id}/comments/create/",
+            {"content": content},
+            format="json",
+        )
+        self.assertEqual(res.status_code, 201, res.data)
+        return res.data
+
+    def test_post_upvote_toggle_maintains_counter(self):
+        url = f"/api/forum/threads/{self.post.id}/upvote/"
+        reader = self.get_client(self.reader)
+
+        res = reader.post(url)
+        self.assertEqual(res.data, {"upvoted": True, "upvote_count": 1})
+        res = self.get_client(self.author).post(url)
+        self.assertEqual(res.data["upvote_count"], 2)
+        res = reader.post(url)
+        self.assertEqual(res.data, {"upvoted": False, "upvote_count": 1})
+
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.upvote_count, 1)
+
+    def test_comment_create_delete_and_upvote_maintain_counters(self):
+        reader = self.get_client(self.reader)
+        first = self.comment(reader)
+        self.comment(reader, "Again")
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.reply_count, 2)
+
+        res = reader.post(f"/api/forum/comments/{first['id']}/upvote/")
+        self.assertEqual(res.data["upvote_count"], 1)
+        self.assertEqual(Reply.objects.get(pk=first["id"]).upvote_count, 1)
+
+        reader.delete(f"/api/forum/comments/{first['id']}/delete/")
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.reply_count, 1)
+
+        detail = reader.get(f"/api/forum/threads/{self.post.id}/").data
+        self.assertEqual(detail["reply_count"], 1)
+
+    def test_popular_listing_does_not_aggregate(self):
+        with CaptureQueriesContext(connection) as ctx:
+            APIClient().get("/api/forum/threads/", {"sort": "popular"})
+        sql = " ".join(q["sql"] for q in ctx.captured_queries).lower()
+        self.assertNotIn("group by", sql)
+        self.assertNotIn("forum_postupvote", sql)
+
+    def test_reconcile_command_fixes_drift(self):
+        PostUpvote.objects.create(user=self.reader, post=self.post)  # bypasses services
+        reply = Reply.objects.create(post=self.post, author=self.reader, content="x")
+        ReplyUpvote.objects.create(user=self.author, reply=reply)
+
+        out = StringIO()
+        call_command("reconcile_forum_counters", stdout=out)
+        self.assertIn("Fixed 1 thread(s) and 1 comment(s)", out.getvalue())
+
+        self.post.refresh_from_db()
+        reply.refresh_from_db()
+        self.assertEqual((self.post.reply_count, self.post.upvote_count), (1, 1))
+        self.assertEqual(reply.upvote_count, 1)
+
+        out = StringIO()
+        call_command("reconcile_forum_counters", stdout=out)
+        self.assertIn("in sync", out.getvalue())
+
+
+# ===================================================================
+# LISTING QUERY COUNTS
+# ===================================================================
+
+class ListingQueryCountTest(BaseForumTestCase):
+
+    def listing_queries(self, client, url, params=None):
+        with CaptureQueriesContext(connection) as ctx:
+            res = client.get(url, params or {})
+        self.assertEqual(res.status_code, 200)
+        return len(ctx.captured_queries), res.data
+
+    def test_thread_page_is_fixed_query_count(self):
+        client = self.get_client(self.reader)
+        counts = []
+        for total in (5, 50):
+            for i in range(total - ForumPost.objects.count()):
+                thread = self.create_thread(title=f"P{i}")
+                if i % 2:
+                    client.post(f"/api/forum/threads/{thread['id']}/upvote/")
+            cache.clear()
+            count, data = self.listing_queries(
+                client, "/api/forum/threads/", {"page_size": 50}
+            )
+            counts.append(count)
+
+        self.assertEqual(counts[0], counts[1])
+        self.assertEqual(len(data["results"]), 50)
+        upvoted = set(
+            PostUpvote.objects.filter(user=self.reader).values_list("post_id", flat=True)
+        )
+        for row in data["results"]:
+            self.assertEqual(row["user_has_upvoted"], row["id"] in upvoted)
+            self.assertEqual(row["tags"], ["general"])
+
+    def test_comment_list_is_fixed_query_count(self):
+        thread = self.create_thread()
+        client = self.get_client(self.reader)
+        url = f"/api/forum/threads/{thread['id']}/comments/"
+        counts = []
+        for total in (3, 30):
+            while Reply.objects.count() < total:
+                res = client.post(
+                    f"{url}create/", {"content": "Hi"}, format="json"
+                )
+                client.post(f"/api/forum/comments/{res.data['id']}/upvote/")
+            count, data = self.listing_queries(client, url)
+            counts.append(count)
+
+        self.assertEqual(counts[0], counts[1])
+        self.assertTrue(all(c["user_has_upvoted"] for c in data["results"]))
+
+
+# ===================================================================
+# SEARCH
+# ===================================================================
+
+class ForumSearchTest(BaseForumTestCase):
+
+    def search(self, **params):
+        res = APIClient().get("/api/forum/threads/", params)
+        self.assertEqual(res.status_code, 200, res.data)
+        return [t["title"] for t in res.data["results"]]
+
+    def post_thread(self, title, body="", tags=("general",)):
+        res = self.get_client(self.author).post(
+            "/api/forum/threads/create/",
+            {"title": title, "body": body, "tags": list(tags)},
+            format="json",
+        )
+        return res.data
+
+    def test_tokenize_drops_noise(self):
+        self.assertEqual(tokenize("The Newton's LAWS, of motion!"), ["newton", "laws", "motion"])
+
+    def test_matches_title_body_and_replies(self):
+        self.post_thread("Photosynthesis basics")
+        self.post_thread("Biology doubt", body="How does photosynthesis work?")
+        other = self.post_thread("Random question")
+        self.get_client(self.reader).post(
+            f"/api/forum/threads/{other['id']}/comments/create/",
+            {"content": "Photosynthesis happens in chloroplasts"},
+            format="json",
+        )
+        self.post_thread("Unrelated")
+
+        titles = self.search(search="photosynthesis")
+        # Title hits outrank body hits, which outrank reply hits
+        self.assertEqual(
+            titles, ["Photosynthesis basics", "Biology doubt", "Random question"]
+        )
+
+    def test_all_terms_must_match(self):
+        self.post_thread("Quadratic equations", body="roots and factoring")
+        self.post_thread("Linear equations")
+        self.assertEqual(self.search(search="quadratic equations"), ["Quadratic equations"])
+        self.assertEqual(self.search(search="the of"), [])
+
+    def test_combines_with_tag_and_date_filters(self):
+        self.post_thread("Algebra help", tags=["math"])
+        self.post_thread("Algebra history", tags=["history"])
+        ForumPost.objects.filter(title="Algebra history").update(
+            created_at=timezone.now() - timedelta(days=30)
+        )
+
+        self.assertEqual(self.search(search="algebra", tag="math"), ["Algebra help"])
+        since = (timezone.now() - timedelta(days=1)).date().isoformat()
+        self.assertEqual(self.search(search="algebra", date_from=since), ["Algebra help"])
+
+    def test_edit_reindexes(self):
+        thread = self.post_thread("Old title")
+        post = ForumPost.objects.get(pk=thread["id"])
+        post.title = "Trigonometry identities"
+        post.save()
+        self.assertEqual(self.search(search="old"), [])
+        self.assertEqual(self.search(search="trigonometry"), ["Trigonometry identities"])
+
+    def test_search_does_not_scan_with_like(self):
+        self.post_thread("Indexed lookup")
+        with CaptureQueriesContext(connection) as ctx:
+            self.search(search="indexed")
+        sql = " ".join(q["sql"] for q in ctx.captured_queries).upper()
+        self.assertNotIn(" LIKE ", sql)
+
+    def test_invalid_date_is_rejected(self):
+        res = APIClient().get("/api/forum/threads/", {"date_from": "yesterday"})
+        self.assertEqual(res.status_code, 400)
@@ -1,11 +1,29 @@
+from datetime import datetime, time, timedelta
+
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework import status
+from rest_framework.exceptions import ValidationError
 from django.shortcuts import get_object_or_404
-from django.db.models import Count, Q
-
-from .models import Tag, ForumPost, Reply, PostUpvote, ReplyUpvote, Notification
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from config.pagination import KeysetPaginator
+from .search import search_threads
+from .models import Tag, ForumPost, Reply, Notification
+from .services import (
+    broadcast_notification,
+    visible_notifications,
+    read_state_context,
+    unread_notification_count,
+    mark_all_notifications_read,
+    mark_notification_read,
+    toggle_upvote,
+    upvote_context,
+    create_reply,
+    delete_reply,
+)
 from .serializers import (
     TagSerializer,
     ForumPostSerializer,
@@ -14,9 +32,6 @@ from .serializers import (
     CreateCommentSerializer,
     NotificationSerializer,
 )
-from django.contrib.auth import get_user_model
-
-User = get_user_model()
 
 
 # =====================================================
@@ -34,52 +49,70 @@ class ListTagsView(APIView):
 # =====================================================
 # Thread (ForumPost) Views
 # =====================================================
+THREAD_ORDERINGS = {
+    "newest": ["-created_at", "-id"],
+    "oldest": ["created_at", "id"],
+    "popular": ["-upvote_count", "-created_at", "-id"],
+    # Only with ?search= (search_rank is annotated by forum.search)
+    "relevance": ["-search_rank", "-id"],
+}
+
+
+def _start_of_day(value, param):
+    day = parse_date(value or "")
+    if day is None:
+        raise ValidationError({param: "Expected a date (YYYY-MM-DD)."})
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
 class ListThreadsView(APIView):
     permission_classes = [AllowAny]
 
     def get(self, request):
-        qs = ForumPost.objects.select_related("author").prefetch_related("tags").annotate(
-            reply_count=Count("replies"),
-            upvote_count=Count("upvotes"),
-        )
+        qs = ForumPost.objects.select_related("author").prefetch_related("tags")
 
-        # Search by title or content
-        search = request.query_params.get("search")
+        # Full-text search over title, body and replies (indexed)
+        search = request.query_params.get("search", "").strip()
         if search:
-            qs = qs.filter(Q(title__icontains=search) | Q(content__icontains=search))
+            qs = search_threads(qs, search)
 
         # Filter by tag name
         tag = request.query_params.get("tag")
         if tag:
             qs = qs.filter(tags__name=tag)
 
-        # Filter by date range
+        # Filter by date range (plain range on created_at, so it can use
+        # the created_at index instead of a per-row date cast)
         date_from = request.query_params.get("date_from")
         date_to = request.query_params.get("date_to")
         if date_from:
-            qs = qs.filter(created_at__date__gte=date_from)
+            qs = qs.filter(created_at__gte=_start_of_day(date_from, "date_from"))
         if date_to:
-            qs = qs.filter(created_at__date__lte=date_to)
-
-        # Sort
-        sort = request.query_params.get("sort", "newest")
-        if sort == "oldest":
-            qs = qs.order_by("created_at")
-        elif sort == "popular":
-            qs = qs.order_by("-upvote_count", "-created_at")
-        else:
-            qs = qs.order_by("-created_at")
+            qs = qs.filter(
+                created_at__lt=_start_of_day(date_to, "date_to") + timedelta(days=1)
+            )
 
-        # Pagination
-        page = int(request.query_params.get("page", 1))
-        page_size = int(request.query_params.get("page_size", 10))
-        total = qs.count()
-        start = (page - 1) * page_size
-        end = start + page_size
-        threads = qs[start:end]
+        # Sort + keyset pagination (cursor encodes the sort key)
+        sort = request.query_params.get("sort", "relevance" if search else "newest")
+        if sort == "relevance" and not search:
+            sort = "newest"
+        paginator = KeysetPaginator(
+            ordering=THREAD_ORDERINGS.get(sort, THREAD_ORDERINGS["newest"]),
+            cached_count=True,
+        )
+        page = paginator.paginate(qs, request)
 
-        serializer = ForumPostSerializer(threads, many=True, context={"request": request})
-        return Response({"results": serializer.data, "count": total})
+        serializer = ForumPostSerializer(
+            page.items,
+            many=True,
+            context={"request": request, **upvote_context(request.user, page.items)},
+        )
+        return Response({
+            "results": serializer.data,
+            "next": page.next_cursor,
+            "previous": page.previous_cursor,
+            "count": page.count,
+        })
 
 
 class CreateThreadView(APIView):
@@ -101,25 +134,18 @@ class CreateThreadView(APIView):
             tag, _ = Tag.objects.get_or_create(name=name.lower().strip())
             post.tags.add(tag)
 
-        # Notify all other users about the new thread
-        other_users = User.objects.exclude(pk=request.user.pk)
-        notifications = [
-            Notification(
-                recipient=user,
-                sender=request.user,
-                notification_type="new_thread",
-                message=f'{request.user.username} posted a new thread: "{post.title}"',
-                thread=post,
-            )
-            for user in other_users
-        ]
-        Notification.objects.bulk_create(notifications)
+        # Notify all other users about the new thread (single broadcast row)
+        broadcast_notification(
+            sender=request.user,
+            notification_type="new_thread",
+            message=f'{request.user.username} posted a new thread: "{post.title}"',
+            thread=post,
+        )
 
-        # Re-fetch with annotations for response
-        post = ForumPost.objects.filter(pk=post.pk).annotate(
-            reply_count=Count("replies"),
-            upvote_count=Count("upvotes"),
-        ).select_related("author").prefetch_related("tags").first()
+        # Re-fetch with tags for response
+        post = ForumPost.objects.filter(pk=post.pk).select_related(
+            "author"
+        ).prefetch_related("tags").first()
 
         return Response(
             ForumPostSerializer(post, context={"request": request}).data,
@@ -132,13 +158,11 @@ class ThreadDetailView(APIView):
 
     def get(self, request, thread_id):
         post = get_object_or_404(
-            ForumPost.objects.annotate(
-                reply_count=Count("replies"),
-                upvote_count=Count("upvotes"),
-            ).select_related("author").prefetch_related("tags"),
+            ForumPost.objects.select_related("author").prefetch_related("tags"),
             pk=thread_id,
         )
-        return Response(ForumPostSerializer(post, context={"request": request}).data)
+        context = {"request": request, **upvote_context(request.user, [post])}
+        return Response(ForumPostSerializer(post, context=context).data)
 
 
 class DeleteThreadView(APIView):
@@ -167,9 +191,7 @@ class ListCommentsView(APIView):
     def get(self, request, thread_id):
         get_object_or_404(ForumPost, pk=thread_id)
 
-        qs = Reply.objects.filter(post_id=thread_id).select_related("author").annotate(
-            upvote_count=Count("upvotes"),
-        )
+        qs = Reply.objects.filter(post_id=thread_id).select_related("author")
 
         # Sort
         sort = request.query_params.get("sort", "oldest")
@@ -178,9 +200,13 @@ class ListCommentsView(APIView):
         else:
             qs = qs.order_by("created_at")
 
-        total = qs.count()
-        serializer = CommentSerializer(qs, many=True, context={"request": request})
-        return Response({"results": serializer.data, "count": total})
+        replies = list(qs)
+        serializer = CommentSerializer(
+            replies,
+            many=True,
+            context={"request": request, **upvote_context(request.user, replies)},
+        )
+        return Response({"results": serializer.data, "count": len(replies)})
 
 
 class CreateCommentView(APIView):
@@ -196,7 +222,7 @@ class CreateCommentView(APIView):
         if reply_to_id:
             reply_to = get_object_or_404(Reply, pk=reply_to_id, post=post)
 
-        reply = Reply.objects.create(
+        reply = create_reply(
             post=post,
             author=request.user,
             content=serializer.validated_data["content"],
@@ -213,11 +239,6 @@ class CreateCommentView(APIView):
                 thread=post,
             )
 
-        # Re-fetch with annotation
-        reply = Reply.objects.filter(pk=reply.pk).annotate(
-            upvote_count=Count("upvotes"),
-        ).select_related("author").first()
-
         return Response(
             CommentSerializer(reply, context={"request": request}).data,
             status=status.HTTP_201_CREATED,
@@ -234,7 +255,7 @@ class DeleteCommentView(APIView):
                 {"detail": "You can only delete your own comments."},
                 status=status.HTTP_403_FORBIDDEN,
             )
-        reply.delete()
+        delete_reply(reply)
         return Response(
             {"detail": "Comment deleted successfully."},
             status=status.HTTP_204_NO_CONTENT,
@@ -249,13 +270,8 @@ class TogglePostUpvoteView(APIView):
 
     def post(self, request, thread_id):
         post = get_object_or_404(ForumPost, pk=thread_id)
-        upvote, created = PostUpvote.objects.get_or_create(
-            user=request.user, post=post
-        )
-        if not created:
-            upvote.delete()
-            return Response({"upvoted": False, "upvote_count": post.upvotes.count()})
-        return Response({"upvoted": True, "upvote_count": post.upvotes.count()})
+        upvoted, upvote_count = toggle_upvote(request.user, post)
+        return Response({"upvoted": upvoted, "upvote_count": upvote_count})
 
 
 class ToggleCommentUpvoteView(APIView):
@@ -263,13 +279,8 @@ class ToggleCommentUpvoteView(APIView):
 
     def post(self, request, comment_id):
         reply = get_object_or_404(Reply, pk=comment_id)
-        upvote, created = ReplyUpvote.objects.get_or_create(
-            user=request.user, reply=reply
-        )
-        if not created:
-            upvote.delete()
-            return Response({"upvoted": False, "upvote_count": reply.upvotes.count()})
-        return Response({"upvoted": True, "upvote_count": reply.upvotes.count()})
+        upvoted, upvote_count = toggle_upvote(request.user, reply)
+        return Response({"upvoted": upvoted, "upvote_count": upvote_count})
 
 
 # =====================================================
@@ -279,21 +290,28 @@ class ListNotificationsView(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
-        notifications = Notification.objects.filter(
-            recipient=request.user
+        notifications = visible_notifications(
+            request.user
         ).select_related("sender", "thread")
 
-        # Pagination
-        page = int(request.query_params.get("page", 1))
-        page_size = int(request.query_params.get("page_size", 8))
-        total = notifications.count()
-        start = (page - 1) * page_size
-        end = start + page_size
+        paginator = KeysetPaginator(
+            ordering=["-created_at", "-id"],
+            page_size=8,
+            cached_count=True,
+        )
+        page = paginator.paginate(notifications, request)
 
-        serializer = NotificationSerializer(notifications[start:end], many=True)
+        serializer = NotificationSerializer(
+            page.items,
+            many=True,
+            context=read_state_context(request.user, page.items),
+        )
         return Response({
             "results": serializer.data,
-            "count": total,
+            "next": page.next_cursor,
+            "previous": page.previous_cursor,
+            "count": page.count,
+            "unread_count": unread_notification_count(request.user),
         })
 
 
@@ -301,9 +319,7 @@ class MarkAllNotificationsReadView(APIView):
     permission_classes = [IsAuthenticated]
 
     def post(self, request):
-        Notification.objects.filter(
-            recipient=request.user, is_read=False
-        ).update(is_read=True)
+        mark_all_notifications_read(request.user)
         return Response({"detail": "All notifications marked as read."})
 
 
@@ -312,8 +328,7 @@ class MarkNotificationReadView(APIView):
 
     def post(self, request, notification_id):
         notification = get_object_or_404(
-            Notification, pk=notification_id, recipient=request.user
+            visible_notifications(request.user), pk=notification_id
         )
-        notification.is_read = True
-        notification.save()
+        mark_notification_read(request.user, notification)
         return Response({"detail": "Notification marked as read."})
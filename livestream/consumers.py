@@ -2,8 +2,7 @@ from channels.generic.websocket import AsyncWebsocketConsumer
 from channels.db import database_sync_to_async
 import json
 
-from livestream.services.session_state import get_session_state, set_session_state
-from .models import LiveSession
+from livestream.services.session_state import get_state, public_state
 
 
 class LiveSessionConsumer(AsyncWebsocketConsumer):
@@ -20,30 +19,13 @@ class LiveSessionConsumer(AsyncWebsocketConsumer):
 
         await self.accept()
 
-        # 🔥 GET STATE FROM REDIS
-        state = await database_sync_to_async(get_session_state)(self.session_id)
-
-        # 🔥 FALLBACK TO DB
-        if not state:
-            session = await database_sync_to_async(
-                LiveSession.objects.get
-            )(id=self.session_id)
-
-            state = {
-                "status": session.computed_status(),  # ✅ FIXED
-                "teacher_left_at": (
-                    session.teacher_left_at.isoformat()
-                    if session.teacher_left_at else None
-                ),
-            }
-
-            # save to Redis
-            await database_sync_to_async(set_session_state)(session)
+        # 🔥 GET STATE FROM REDIS (loaded from the DB on first use)
+        state = await database_sync_to_async(get_state)(self.session_id)
 
         # 🔥 SEND INITIAL STATE
         await self.send(text_data=json.dumps({
             "type": "initial_state",
-            "data": state
+            "data": public_state(state) if state else None
         }))
 
     async def disconnect(self, close_code):
@@ -0,0 +1,59 @@
+"""
+Write live-session state and attendance held in Redis back to Postgres.
+
+Webhooks only touch Redis: session state lives in
+livestream.services.session_state, participant join / leave events are
+queued on a stream by livestream.services.attendance. Each pass drains
+both in batches of LIVE_STATE_FLUSH_BATCH.
+
+Usage:
+    python manage.py flush_live_state             # one pass
+    python manage.py flush_live_state --every 5   # keep flushing every 5s
+
+Run it as a single long-lived process next to Daphne (one worker keeps
+per-participant order simple), or via cron every minute:
+    * * * * * cd /path/to/project && python manage.py flush_live_state
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from livestream.services import attendance
+from livestream.services.session_state import flush_dirty
+
+
+class Command(BaseCommand):
+    help = "Flush live-session state and attendance from Redis to the database."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--every",
+            type=float,
+            default=0,
+            help="Seconds between passes; runs once when omitted.",
+        )
+
+    def handle(self, *args, **options):
+        every = options["every"]
+
+        while True:
+            total_sessions = total_events = 0
+            # Drain everything that is queued right now
+            while True:
+                sessions = flush_dirty()
+                events = attendance.ingest()
+                if not sessions and not events:
+                    break
+                total_sessions += sessions
+                total_events += events
+
+            if total_sessions or total_events:
+                self.stdout.write(
+                    f"Flushed {total_sessions} session(s), "
+                    f"{total_events} attendance event(s)."
+                )
+
+            if not every:
+                break
+            time.sleep(every)
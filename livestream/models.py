@@ -1,5 +1,8 @@
 import uuid
+from datetime import timedelta
+
 from django.db import models
+from django.utils import timezone
 from django.conf import settings
 
 
@@ -88,38 +91,64 @@ class LiveSession(models.Model):
         return self.end_time - self.start_time
 
     # 🔥 CORE STATE LOGIC (VERY IMPORTANT)
-    def computed_status(self):
-        from django.utils import timezone
-        from datetime import timedelta
+    def computed_status(self, now=None):
+        return resolve_status(
+            self.status,
+            self.teacher_left_at,
+            self.start_time,
+            now or timezone.now(),
+        )
+
 
-        now = timezone.now()
+# Teacher disconnect windows (see resolve_status)
+RECONNECT_WINDOW = timedelta(minutes=10)
+PAUSE_WINDOW = timedelta(minutes=60)
+EARLY_JOIN_WINDOW = timedelta(minutes=15)
 
-        if self.status == self.STATUS_CANCELLED:
-            return self.STATUS_CANCELLED
 
-        if self.teacher_left_at:
-            diff = now - self.teacher_left_at
+def resolve_status(status, teacher_left_at, start_time, now):
+    """
+    Pure state logic over plain column values, so listings can evaluate
+    many sessions against one ``now``.
+    """
+    # Terminal states are final whatever the timestamps say
+    if status in (LiveSession.STATUS_CANCELLED, LiveSession.STATUS_COMPLETED):
+        return status
 
-        # 🔥 NEW SMART LOGIC
+    if teacher_left_at:
+        diff = now - teacher_left_at
 
         # 0–10 min → reconnecting
-            if diff <= timedelta(minutes=10):
-                return self.STATUS_RECONNECTING
+        if diff <= RECONNECT_WINDOW:
+            return LiveSession.STATUS_RECONNECTING
 
         # 10–60 min → paused
-            if diff <= timedelta(minutes=60):
-                return self.STATUS_PAUSED
+        if diff <= PAUSE_WINDOW:
+            return LiveSession.STATUS_PAUSED
 
         # >60 min → completed
-            return self.STATUS_COMPLETED
+        return LiveSession.STATUS_COMPLETED
+
+    if status == LiveSession.STATUS_LIVE:
+        return LiveSession.STATUS_LIVE
+
+    if now < start_time:
+        return LiveSession.STATUS_SCHEDULED
+
+    return LiveSession.STATUS_WAITING
+
+
+def resolve_can_join(status, teacher_left_at, start_time, now, is_teacher):
+    if status in (LiveSession.STATUS_CANCELLED, LiveSession.STATUS_COMPLETED):
+        return False
 
-        if self.status == self.STATUS_LIVE and not self.teacher_left_at:
-            return self.STATUS_LIVE
+    if teacher_left_at and now > teacher_left_at + PAUSE_WINDOW:
+        return False
 
-        if now < self.start_time:
-            return self.STATUS_SCHEDULED
+    if is_teacher:
+        return True
 
-        return self.STATUS_WAITING
+    return now >= start_time - EARLY_JOIN_WINDOW
 
 
 class LiveSessionAttendance(models.Model):
@@ -149,3 +178,35 @@ class LiveSessionAttendance(models.Model):
         if self.joined_at and self.left_at:
             return self.left_at - self.joined_at
         return None
+
+
+class LiveSessionAttendanceInterval(models.Model):
+    """
+    One join → leave stretch. A participant who drops and rejoins gets a
+    row per stretch; LiveSessionAttendance keeps the latest join / leave.
+    Written by livestream.services.attendance.
+    """
+    session = models.ForeignKey(
+        LiveSession,
+        on_delete=models.CASCADE,
+        related_name="attendance_intervals",
+    )
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+    )
+
+    joined_at = models.DateTimeField()
+    left_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["joined_at"]
+        indexes = [
+            models.Index(fields=["session", "user", "joined_at"]),
+        ]
+
+    def duration(self):
+        if self.left_at:
+            return self.left_at - self.joined_at
+        return None
@@ -1,11 +1,11 @@
 from rest_framework import serializers
 from django.utils import timezone
-from django.db.models import Q
-from datetime import timedelta
+from django.db.models import Manager, Q
 import uuid
 from zoneinfo import ZoneInfo
 
 from .models import LiveSession
+from .services.listing import SessionViewer, evaluate_sessions
 from courses.models import Subject
 
 IST = ZoneInfo("Asia/Kolkata")
@@ -107,17 +107,34 @@ class LiveSessionCreateSerializer(serializers.ModelSerializer):
         )
 
 
+class LiveSessionListListSerializer(serializers.ListSerializer):
+    """Evaluates status / can_join for the whole page in one pass."""
+
+    def to_representation(self, data):
+        sessions = list(data.all() if isinstance(data, Manager) else data)
+        evaluate_sessions(sessions, _viewer(self.context))
+        return super().to_representation(sessions)
+
+
+def _viewer(context):
+    viewer = context.get("viewer")
+    if viewer is None:
+        viewer = context["viewer"] = SessionViewer(context["request"].user)
+    return viewer
+
+
 class LiveSessionListSerializer(serializers.ModelSerializer):
     teacher = serializers.CharField(source="created_by.email", read_only=True)
     can_join = serializers.SerializerMethodField()
     computed_status = serializers.SerializerMethodField()
 
-    subject_id = serializers.UUIDField(source="subject.id", read_only=True)
+    subject_id = serializers.UUIDField(read_only=True)
     subject_name = serializers.CharField(source="subject.name", read_only=True)
     course_name = serializers.CharField(source="course.title", read_only=True)
 
     class Meta:
         model = LiveSession
+        list_serializer_class = LiveSessionListListSerializer
         fields = [
             "id",
             "title",
@@ -131,41 +148,14 @@ class LiveSessionListSerializer(serializers.ModelSerializer):
             "course_name",
         ]
 
-    def get_computed_status(self, obj):
-        now = timezone.now()
-
-        if obj.status == LiveSession.STATUS_CANCELLED:
-            return "CANCELLED"
-
-        if obj.teacher_left_at:
-            diff = now - obj.teacher_left_at
-            if diff <= timedelta(minutes=10):
-                return "RECONNECTING"
-            if diff <= timedelta(minutes=60):
-                return "PAUSED"
-            return "COMPLETED"
-
-        if obj.status == LiveSession.STATUS_LIVE:
-            return "LIVE"
+    def _evaluate(self, obj):
+        if not hasattr(obj, "listing_status"):
+            evaluate_sessions([obj], _viewer(self.context))
 
-        if now < obj.start_time:
-            return "SCHEDULED"
-
-        return "WAITING_FOR_TEACHER"
+    def get_computed_status(self, obj):
+        self._evaluate(obj)
+        return obj.listing_status
 
     def get_can_join(self, obj):
-        now = timezone.now()
-
-        if obj.status == LiveSession.STATUS_CANCELLED:
-            return False
-
-        if obj.teacher_left_at:
-            if now > obj.teacher_left_at + timedelta(minutes=60):
-                return False
-
-        request = self.context.get("request")
-
-        if request and request.user.has_role("TEACHER"):
-            return True
-
-        return now >= obj.start_time - timedelta(minutes=15)
+        self._evaluate(obj)
+        return obj.listing_can_join
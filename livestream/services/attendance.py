@@ -0,0 +1,222 @@
+"""
+Live-session attendance ingestion.
+
+Webhooks append participant join / leave events to a Redis stream and
+return. ``ingest()`` (run by ``manage.py flush_live_state``) reads them
+through a consumer group, replays them per (session, user) in event
+order and applies the whole batch with bulk writes:
+
+    LiveSessionAttendanceInterval   one row per join → leave stretch
+    LiveSessionAttendance           latest join / leave per participant
+
+Entries are acknowledged and deleted only after the batch commits. A
+worker re-reads its own unacknowledged entries before new ones, and picks
+up entries a dead worker left pending for PENDING_RECLAIM_MS. Entries
+delivered MAX_DELIVERIES times without committing are moved to
+DEAD_LETTER_KEY, so one bad batch cannot hold up ingestion. Both streams
+are capped at about STREAM_MAXLEN entries.
+"""
+import os
+import socket
+from collections import defaultdict
+from datetime import datetime
+
+import redis
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.utils import timezone
+
+from livestream.models import (
+    LiveSession,
+    LiveSessionAttendance,
+    LiveSessionAttendanceInterval,
+)
+from livestream.services import session_state
+
+
+STREAM_KEY = "live:attendance_events"
+DEAD_LETTER_KEY = "live:attendance_events:dead"
+GROUP = "attendance"
+PENDING_RECLAIM_MS = 60 * 1000
+MAX_DELIVERIES = 5
+STREAM_MAXLEN = 1_000_000
+
+JOIN = "join"
+LEAVE = "leave"
+
+
+def enqueue(session_id, user_id, kind, at=None):
+    at = at or timezone.now()
+    session_state.redis_client().xadd(STREAM_KEY, {
+        "session": str(session_id),
+        "user": str(user_id),
+        "kind": kind,
+        "at": at.isoformat(),
+    }, maxlen=STREAM_MAXLEN, approximate=True)
+
+
+def _ensure_group(client):
+    try:
+        client.xgroup_create(STREAM_KEY, GROUP, id="0", mkstream=True)
+    except redis.ResponseError as exc:
+        if "BUSYGROUP" not in str(exc):
+            raise
+
+
+def _read_batch(client, consumer, count):
+    """(entries, redelivered): the next batch, and whether it was read before."""
+    # 1. our own entries from a batch that failed
+    response = client.xreadgroup(GROUP, consumer, {STREAM_KEY: "0"}, count=count)
+    entries = response[0][1] if response else []
+
+    # 2. entries a dead worker never acknowledged
+    if not entries:
+        _, entries, *_ = client.xautoclaim(
+            STREAM_KEY, GROUP, consumer, PENDING_RECLAIM_MS, "0-0", count=count
+        )
+    if entries:
+        return entries, True
+
+    # 3. new entries
+    response = client.xreadgroup(GROUP, consumer, {STREAM_KEY: ">"}, count=count)
+    return (response[0][1] if response else []), False
+
+
+def _drop(client, ids):
+    with client.pipeline() as pipe:
+        pipe.xack(STREAM_KEY, GROUP, *ids)
+        pipe.xdel(STREAM_KEY, *ids)
+        pipe.execute()
+
+
+def _dead_letter(client, entries):
+    """Move entries delivered MAX_DELIVERIES times aside; return the rest."""
+    pending = client.xpending_range(
+        STREAM_KEY, GROUP, min=entries[0][0], max=entries[-1][0], count=len(entries),
+    )
+    exhausted = {
+        row["message_id"] for row in pending
+        if row["times_delivered"] >= MAX_DELIVERIES
+    }
+    if not exhausted:
+        return entries
+
+    with client.pipeline() as pipe:
+        for entry_id, fields in entries:
+            if entry_id in exhausted and fields:
+                pipe.xadd(
+                    DEAD_LETTER_KEY, {**fields, "id": entry_id},
+                    maxlen=STREAM_MAXLEN, approximate=True,
+                )
+        pipe.execute()
+    _drop(client, list(exhausted))
+    return [entry for entry in entries if entry[0] not in exhausted]
+
+
+def ingest(count=None, consumer=None):
+    """Apply up to ``count`` queued events. Returns how many were consumed."""
+    client = session_state.redis_client()
+    _ensure_group(client)
+
+    count = count or settings.LIVE_STATE_FLUSH_BATCH
+    consumer = consumer or f"{socket.gethostname()}-{os.getpid()}"
+
+    entries, redelivered = _read_batch(client, consumer, count)
+    if not entries:
+        return 0
+
+    consumed = len(entries)
+    if redelivered:
+        entries = _dead_letter(client, entries)
+        if not entries:
+            return consumed
+
+    apply_events([fields for _, fields in entries if fields])
+    _drop(client, [entry_id for entry_id, _ in entries])
+
+    return consumed
+
+
+def apply_events(events):
+    """Coalesce ``events`` per participant and write them in one transaction."""
+    by_participant = defaultdict(list)
+    for event in events:
+        by_participant[(event["session"], event["user"])].append(
+            (datetime.fromisoformat(event["at"]), event["kind"])
+        )
+
+    session_ids = {session_id for session_id, _ in by_participant}
+    user_ids = {user_id for _, user_id in by_participant}
+
+    known_sessions = {
+        str(pk) for pk in
+        LiveSession.objects.filter(pk__in=session_ids).values_list("pk", flat=True)
+    }
+    known_users = {
+        str(pk) for pk in
+        get_user_model().objects.filter(pk__in=user_ids).values_list("pk", flat=True)
+    }
+
+    open_intervals = {
+        (str(i.session_id), str(i.user_id)): i
+        for i in LiveSessionAttendanceInterval.objects.filter(
+            session_id__in=known_sessions,
+            user_id__in=known_users,
+            left_at__isnull=True,
+        ).order_by("joined_at")
+    }
+    summaries = {
+        (str(a.session_id), str(a.user_id)): a
+        for a in LiveSessionAttendance.objects.filter(
+            session_id__in=known_sessions,
+            user_id__in=known_users,
+        )
+    }
+
+    new_intervals, closed_intervals = [], []
+    new_summaries, changed_summaries = [], []
+
+    for (session_id, user_id), participant_events in by_participant.items():
+        if session_id not in known_sessions or user_id not in known_users:
+            continue
+
+        # Stable sort: events with the same timestamp keep arrival order
+        participant_events.sort(key=lambda event: event[0])
+
+        current = open_intervals.get((session_id, user_id))
+        last_join = last_leave = None
+
+        for at, kind in participant_events:
+            if kind == JOIN:
+                last_join = at
+                # A repeated join while already in keeps the earlier start
+                if current is None:
+                    current = LiveSessionAttendanceInterval(
+                        session_id=session_id, user_id=user_id, joined_at=at
+                    )
+                    new_intervals.append(current)
+            else:
+                last_leave = at
+                if current is not None:
+                    current.left_at = at
+                    if current.pk:
+                        closed_intervals.append(current)
+                    current = None
+
+        summary = summaries.get((session_id, user_id))
+        if summary is None:
+            summary = LiveSessionAttendance(session_id=session_id, user_id=user_id)
+            new_summaries.append(summary)
+        else:
+            changed_summaries.append(summary)
+        if last_join:
+            summary.joined_at = last_join
+        if last_leave:
+            summary.left_at = last_leave
+
+    with transaction.atomic():
+        LiveSessionAttendanceInterval.objects.bulk_update(closed_intervals, ["left_at"])
+        LiveSessionAttendanceInterval.objects.bulk_create(new_intervals)
+        LiveSessionAttendance.objects.bulk_update(changed_summaries, ["joined_at", "left_at"])
+        LiveSessionAttendance.objects.bulk_create(new_summaries)
@@ -0,0 +1,55 @@
+"""
+Live-session listings.
+
+Viewer facts (teacher or not, enrolled course ids) are resolved once per
+request; status and joinability are then evaluated for every row against
+one ``now`` from the columns already loaded, so a page of sessions costs
+the same number of queries however many rows it holds.
+"""
+from django.utils import timezone
+
+from accounts.models import Role
+from enrollments.models import Enrollment
+from livestream.models import resolve_can_join, resolve_status
+
+
+class SessionViewer:
+
+    def __init__(self, user, course_ids=None):
+        self.user = user
+        self.is_teacher = user.has_role(Role.TEACHER)
+        self._course_ids = None if course_ids is None else set(course_ids)
+
+    @property
+    def course_ids(self):
+        # Only students need it; resolved on first use
+        if self._course_ids is None:
+            self._course_ids = set(
+                Enrollment.objects.filter(
+                    user=self.user,
+                    status=Enrollment.STATUS_ACTIVE,
+                ).values_list("course_id", flat=True)
+            )
+        return self._course_ids
+
+
+def evaluate_sessions(sessions, viewer, now=None):
+    """Sets ``listing_status`` and ``listing_can_join`` on every session."""
+    now = now or timezone.now()
+
+    for session in sessions:
+        session.listing_status = resolve_status(
+            session.status, session.teacher_left_at, session.start_time, now
+        )
+        session.listing_can_join = (
+            (viewer.is_teacher or session.course_id in viewer.course_ids)
+            and resolve_can_join(
+                session.status,
+                session.teacher_left_at,
+                session.start_time,
+                now,
+                viewer.is_teacher,
+            )
+        )
+
+    return sessions
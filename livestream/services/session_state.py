@@ -1,29 +1,315 @@
+"""
+Live-session state machine.
+
+While a session is running Redis is the authoritative copy of its state;
+Postgres is brought up to date in batches by ``flush_dirty()`` (run by
+``manage.py flush_live_state``). LiveKit webhooks, the WebSocket consumer
+and join_live_session all read and write through this module, so a class
+joining at once costs Redis round trips, not one DB transaction per
+participant. Attendance goes through livestream.services.attendance.
+
+Keys:
+    live:session:{id}      hash   status, teacher_left_at, last_activity_at,
+                                  start_time, created_by
+    live:room:{room_name}  hash   id, created_by (webhooks only carry the room)
+    live:dirty             set    session ids with unflushed changes
+
+Transitions are optimistic (WATCH / MULTI) and retried on conflict. Only
+the stored status is a transition target; RECONNECTING → PAUSED →
+COMPLETED after the teacher leaves is derived from ``teacher_left_at`` on
+read (see livestream.models.resolve_status).
+"""
+import functools
+from datetime import datetime
+
 import redis
-import json
+from django.conf import settings
 from django.utils import timezone
 
-r = redis.Redis(host="127.0.0.1", port=6379, db=0)
+from livestream.models import LiveSession, resolve_status
+
+
+SESSION_TTL = 60 * 60 * 24  # seconds
+DIRTY_KEY = "live:dirty"
+
+# =========================
+# TRANSITIONS
+# =========================
+ROOM_STARTED = "room_started"
+TEACHER_JOINED = "teacher_joined"
+TEACHER_LEFT = "teacher_left"
+ROOM_FINISHED = "room_finished"
+CANCEL = "cancel"
+EXPIRE = "expire"
+
+_RUNNING = {
+    LiveSession.STATUS_SCHEDULED,
+    LiveSession.STATUS_WAITING,
+    LiveSession.STATUS_LIVE,
+    LiveSession.STATUS_RECONNECTING,
+    LiveSession.STATUS_PAUSED,
+}
+
+# event → (stored statuses it may leave from, stored status it sets)
+TRANSITIONS = {
+    ROOM_STARTED: (
+        {LiveSession.STATUS_SCHEDULED, LiveSession.STATUS_WAITING},
+        LiveSession.STATUS_LIVE,
+    ),
+    TEACHER_JOINED: (_RUNNING, LiveSession.STATUS_LIVE),
+    TEACHER_LEFT: (_RUNNING, LiveSession.STATUS_RECONNECTING),
+    ROOM_FINISHED: (_RUNNING, LiveSession.STATUS_COMPLETED),
+    CANCEL: (_RUNNING, LiveSession.STATUS_CANCELLED),
+    EXPIRE: (_RUNNING, LiveSession.STATUS_COMPLETED),
+}
+
+
+class InvalidTransition(Exception):
+    pass
+
+
+@functools.lru_cache(maxsize=1)
+def redis_client():
+    return redis.Redis.from_url(settings.LIVE_STATE_REDIS_URL, decode_responses=True)
+
 
+def _session_key(session_id):
+    return f"live:session:{session_id}"
 
-def _key(session_id):
-    return f"live_session:{session_id}"
 
+def _room_key(room_name):
+    return f"live:room:{room_name}"
 
-def set_session_state(session):
-    data = {
-        "status": session.computed_status(),  # 🔥 FIXED
-        "teacher_left_at": (
-            session.teacher_left_at.isoformat()
-            if session.teacher_left_at else None
-        ),
-        "last_activity_at": timezone.now().isoformat(),
+
+def _dump(value):
+    return value.isoformat() if value else ""
+
+
+def _load(value):
+    return datetime.fromisoformat(value) if value else None
+
+
+# =========================
+# READS
+# =========================
+def _row_state(session_id):
+    row = (
+        LiveSession.objects
+        .filter(pk=session_id)
+        .values("status", "teacher_left_at", "last_activity_at", "start_time", "created_by_id")
+        .first()
+    )
+    if row is None:
+        return None
+    return {
+        "status": row["status"],
+        "teacher_left_at": _dump(row["teacher_left_at"]),
+        "last_activity_at": _dump(row["last_activity_at"]),
+        "start_time": _dump(row["start_time"]),
+        "created_by": str(row["created_by_id"] or ""),
     }
 
-    r.set(_key(session.id), json.dumps(data), ex=3600)
 
+def _parse(raw):
+    return {
+        "status": raw["status"],
+        "teacher_left_at": _load(raw.get("teacher_left_at")),
+        "last_activity_at": _load(raw.get("last_activity_at")),
+        "start_time": _load(raw.get("start_time")),
+        "created_by": raw.get("created_by") or None,
+    }
+
+
+def _read(client, session_id):
+    """Raw hash, filled in from Postgres for any field Redis lacks."""
+    raw = client.hgetall(_session_key(session_id))
+    if raw.get("status"):
+        return raw, False
+
+    row = _row_state(session_id)
+    if row is None:
+        return None, False
+    # Attendance events may already have written last_activity_at
+    return {**row, **raw}, True
+
+
+def get_state(session_id):
+    """
+    Parsed state (status, teacher_left_at, last_activity_at, start_time,
+    created_by) or None for an unknown session. Loads it into Redis on
+    first use.
+    """
+    client = redis_client()
+    raw, missing = _read(client, session_id)
+    if raw is None:
+        return None
+    if missing:
+        client.hset(_session_key(session_id), mapping=raw)
+        client.expire(_session_key(session_id), SESSION_TTL)
+    return _parse(raw)
+
+
+def effective_status(state, now=None):
+    return resolve_status(
+        state["status"],
+        state["teacher_left_at"],
+        state["start_time"],
+        now or timezone.now(),
+    )
+
+
+def public_state(state, now=None):
+    """What WebSocket clients get."""
+    return {
+        "status": effective_status(state, now),
+        "teacher_left_at": _dump(state["teacher_left_at"]) or None,
+    }
+
+
+def resolve_room(room_name):
+    """{"id", "created_by"} for a LiveKit room, cached in Redis."""
+    client = redis_client()
+    room = client.hgetall(_room_key(room_name))
+    if room:
+        return room
+
+    row = (
+        LiveSession.objects
+        .filter(room_name=room_name)
+        .values("id", "created_by_id")
+        .first()
+    )
+    if row is None:
+        return None
+
+    room = {"id": str(row["id"]), "created_by": str(row["created_by_id"] or "")}
+    client.hset(_room_key(room_name), mapping=room)
+    client.expire(_room_key(room_name), SESSION_TTL)
+    return room
+
+
+# =========================
+# WRITES
+# =========================
+def transition(session_id, event, at=None, flush=False):
+    """
+    Apply ``event`` atomically. Returns the new parsed state; raises
+    InvalidTransition if the session's current status does not allow it
+    and LiveSession.DoesNotExist for an unknown session. ``flush=True``
+    writes the session through to Postgres straight away.
+    """
+    allowed, target = TRANSITIONS[event]
+    at = at or timezone.now()
+    client = redis_client()
+    key = _session_key(session_id)
+
+    with client.pipeline() as pipe:
+        while True:
+            try:
+                pipe.watch(key)
+                raw, _ = _read(pipe, session_id)
+                if raw is None:
+                    raise LiveSession.DoesNotExist(session_id)
+
+                if raw["status"] not in allowed:
+                    raise InvalidTransition(f"{event} not allowed from {raw['status']}")
+
+                raw["status"] = target
+                raw["last_activity_at"] = _dump(at)
+                if event == TEACHER_JOINED:
+                    raw["teacher_left_at"] = ""
+                elif event == TEACHER_LEFT:
+                    raw["teacher_left_at"] = _dump(at)
+
+                pipe.multi()
+                pipe.hset(key, mapping=raw)
+                pipe.expire(key, SESSION_TTL)
+                pipe.sadd(DIRTY_KEY, str(session_id))
+                pipe.execute()
+                break
+            except redis.WatchError:
+                continue
+
+    if flush:
+        flush_sessions([str(session_id)])
+    return _parse(raw)
+
+
+def touch(session_id, at=None):
+    """
+    Bump last_activity_at (participant traffic) without a transition. A
+    late event older than the stored value changes nothing.
+    """
+    at = at or timezone.now()
+    key = _session_key(session_id)
+
+    with redis_client().pipeline() as pipe:
+        while True:
+            try:
+                pipe.watch(key)
+                raw, missing = _read(pipe, session_id)
+                if raw is None:
+                    pipe.unwatch()
+                    return
+
+                current = _load(raw.get("last_activity_at"))
+                pipe.multi()
+                if missing:
+                    pipe.hset(key, mapping=raw)
+                if current is None or at > current:
+                    pipe.hset(key, "last_activity_at", _dump(at))
+                    pipe.sadd(DIRTY_KEY, str(session_id))
+                pipe.expire(key, SESSION_TTL)
+                pipe.execute()
+                return
+            except redis.WatchError:
+                continue
+
+
+# =========================
+# FLUSH TO POSTGRES
+# =========================
+def flush_dirty(limit=None):
+    """Write up to ``limit`` dirty sessions to Postgres. Returns how many."""
+    limit = limit or settings.LIVE_STATE_FLUSH_BATCH
+    session_ids = redis_client().spop(DIRTY_KEY, limit)
+    if not session_ids:
+        return 0
+    return flush_sessions(session_ids)
+
+
+def flush_sessions(session_ids):
+    client = redis_client()
+
+    # Session hashes stay: they are the live state
+    with client.pipeline() as pipe:
+        for session_id in session_ids:
+            pipe.srem(DIRTY_KEY, session_id)
+            pipe.hgetall(_session_key(session_id))
+        results = pipe.execute()
+
+    states = {
+        session_id: _parse(state)
+        for session_id, state in zip(session_ids, results[1::2])
+        if state.get("status")
+    }
+
+    try:
+        sessions = {
+            str(pk): session
+            for pk, session in LiveSession.objects.in_bulk(list(states)).items()
+        }
+        for session_id, session in sessions.items():
+            state = states[session_id]
+            session.status = state["status"]
+            session.teacher_left_at = state["teacher_left_at"]
+            session.last_activity_at = state["last_activity_at"]
+        LiveSession.objects.bulk_update(
+            sessions.values(), ["status", "teacher_left_at", "last_activity_at"]
+        )
+    except Exception:
+        # Retry on the next run
+        client.sadd(DIRTY_KEY, *session_ids)
+        raise
 
-def get_session_state(session_id):
-    data = r.get(_key(session_id))
-    if data:
-        return json.loads(data)
-    return None
+    return len(session_ids)
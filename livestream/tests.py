@@ -1,3 +1,363 @@
-from django.test import TestCase
+"""
+Tests for livestream — session listings and the Redis state machine.
 
-# Create your tests here.
+Covers:
+  - computed_status / can_join per state (scheduled, early join window,
+    reconnecting, ended, cancelled) for students and teachers
+  - Listing 200 sessions costs a fixed number of queries
+  - State transitions, rejected transitions and write-through on
+    room start / teacher join / cancel / room finish (fakeredis)
+  - Activity touches keep the newest timestamp and expire with the session
+  - A 500-student join burst touches only Redis; one batch writes it
+  - Join / leave intervals per participant, applied in event order,
+    replay of a batch that failed, dead-lettering of one that keeps
+    failing, and the stream length cap
+"""
+
+from datetime import timedelta
+from types import SimpleNamespace
+from unittest import mock
+
+import fakeredis
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from accounts.models import User, Role, UserRole
+from courses.models import Course, Subject, SubjectTeacher
+from enrollments.models import Enrollment
+from .models import LiveSession, LiveSessionAttendance, LiveSessionAttendanceInterval
+from .services import attendance, session_state
+from .views import _handle_participant_join, _handle_participant_left, _handle_room_finished
+
+
+class LiveSessionListTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = User.objects.create_user(
+            username="liveteacher", email="liveteacher@test.com", password="testpass123"
+        )
+        cls.student = User.objects.create_user(
+            username="livestudent", email="livestudent@test.com", password="testpass123"
+        )
+        UserRole.objects.create(
+            user=cls.teacher, role=Role.objects.create(name=Role.TEACHER), is_active=True
+        )
+        UserRole.objects.create(
+            user=cls.student, role=Role.objects.create(name=Role.STUDENT), is_active=True
+        )
+
+        cls.course = Course.objects.create(title="Class 6")
+        cls.subject = Subject.objects.create(course=cls.course, name="Science")
+        SubjectTeacher.objects.create(subject=cls.subject, teacher=cls.teacher)
+        Enrollment.objects.create(user=cls.student, course=cls.course)
+
+    def setUp(self):
+        cache.clear()
+
+    def session(self, title, start_in, **kwargs):
+        start = timezone.now() + start_in
+        return LiveSession.objects.create(
+            course=self.course,
+            subject=self.subject,
+            title=title,
+            start_time=start,
+            end_time=start + timedelta(hours=1),
+            room_name=f"room_{title}",
+            created_by=self.teacher,
+            **kwargs,
+        )
+
+    def listing(self, user, path):
+        client = APIClient()
+        client.force_authenticate(user=user)
+        res = client.get(path)
+        self.assertEqual(res.status_code, 200)
+        return {row["title"]: (row["computed_status"], row["can_join"]) for row in res.data}
+
+    def test_status_and_can_join(self):
+        now = timezone.now()
+        self.session("later", timedelta(hours=2))
+        self.session("soon", timedelta(minutes=10))
+        self.session("dropped", timedelta(minutes=-20), teacher_left_at=now - timedelta(minutes=5))
+        self.session("ended", timedelta(minutes=-50), teacher_left_at=now - timedelta(minutes=61))
+        self.session("off", timedelta(minutes=5), status=LiveSession.STATUS_CANCELLED)
+
+        student = self.listing(self.student, "/api/livestream/student/sessions/")
+        self.assertEqual(student, {
+            "later": ("SCHEDULED", False),
+            "soon": ("SCHEDULED", True),
+            "dropped": ("RECONNECTING", True),
+            "ended": ("COMPLETED", False),
+            "off": ("CANCELLED", False),
+        })
+
+        teacher = self.listing(self.teacher, "/api/livestream/teacher/sessions/")
+        self.assertEqual(teacher["later"], ("SCHEDULED", True))
+        self.assertEqual(teacher["ended"], ("COMPLETED", False))
+
+    def test_listing_query_count_is_fixed(self):
+        start = timezone.now() + timedelta(days=1)
+        LiveSession.objects.bulk_create([
+            LiveSession(
+                course=self.course,
+                subject=self.subject,
+                title=f"S{i}",
+                start_time=start + timedelta(hours=i),
+                end_time=start + timedelta(hours=i, minutes=45),
+                room_name=f"bulk_{i}",
+                created_by=self.teacher,
+            )
+            for i in range(200)
+        ])
+
+        for user, path, queries in (
+            # enrolled course ids, sessions
+            (self.student, "/api/livestream/student/sessions/", 2),
+            # sessions (assigned subjects inlined)
+            (self.teacher, "/api/livestream/teacher/sessions/", 1),
+        ):
+            client = APIClient()
+            client.force_authenticate(user=user)
+            client.get(path)  # warm role cache
+
+            with self.assertNumQueries(queries):
+                res = client.get(path)
+            self.assertEqual(len(res.data), 200)
+
+
+def _event(room_name, identity="", created_at=0):
+    return SimpleNamespace(
+        room=SimpleNamespace(name=room_name),
+        participant=SimpleNamespace(identity=identity),
+        created_at=created_at,
+    )
+
+
+@override_settings(CHANNEL_LAYERS={"default": {"BACKEND": "channels.layers.InMemoryChannelLayer"}})
+class LiveSessionStateTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = User.objects.create_user(
+            username="stateteacher", email="stateteacher@test.com", password="testpass123"
+        )
+        cls.student = User.objects.create_user(
+            username="statestudent", email="statestudent@test.com", password="testpass123"
+        )
+        UserRole.objects.create(
+            user=cls.student, role=Role.objects.create(name=Role.STUDENT), is_active=True
+        )
+        course = Course.objects.create(title="Class 5")
+        subject = Subject.objects.create(course=course, name="EVS")
+        Enrollment.objects.create(user=cls.student, course=course)
+
+        start = timezone.now() + timedelta(minutes=5)
+        cls.session = LiveSession.objects.create(
+            course=course,
+            subject=subject,
+            title="State",
+            start_time=start,
+            end_time=start + timedelta(hours=1),
+            room_name="room_state",
+            created_by=cls.teacher,
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.redis = fakeredis.FakeRedis(decode_responses=True)
+        patcher = mock.patch.object(session_state, "redis_client", return_value=self.redis)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def status(self):
+        return session_state.effective_status(session_state.get_state(self.session.id))
+
+    def test_teacher_join_and_leave(self):
+        teacher_id = str(self.teacher.id)
+
+        _handle_participant_join(_event("room_state", teacher_id))
+        self.assertEqual(self.status(), LiveSession.STATUS_LIVE)
+
+        # Going live is written through, so DB-backed listings see it
+        self.session.refresh_from_db()
+        self.assertEqual(self.session.status, LiveSession.STATUS_LIVE)
+
+        _handle_participant_left(_event("room_state", teacher_id))
+        state = session_state.get_state(self.session.id)
+        self.assertEqual(session_state.effective_status(state), LiveSession.STATUS_RECONNECTING)
+        self.assertEqual(
+            session_state.effective_status(state, state["teacher_left_at"] + timedelta(minutes=30)),
+            LiveSession.STATUS_PAUSED,
+        )
+
+        # The leave waits for the next batch
+        self.session.refresh_from_db()
+        self.assertEqual(self.session.status, LiveSession.STATUS_LIVE)
+
+        session_state.flush_dirty()
+        self.session.refresh_from_db()
+        self.assertEqual(self.session.status, LiveSession.STATUS_RECONNECTING)
+        self.assertIsNotNone(self.session.teacher_left_at)
+
+    def test_touch_keeps_the_newest_activity_and_expires(self):
+        key = f"live:session:{self.session.id}"
+        now = timezone.now()
+
+        session_state.touch(self.session.id, now)
+        session_state.touch(self.session.id, now - timedelta(minutes=5))  # late webhook
+
+        state = session_state.get_state(self.session.id)
+        self.assertEqual(state["last_activity_at"], now)
+        self.assertEqual(state["status"], LiveSession.STATUS_SCHEDULED)
+        self.assertGreater(self.redis.ttl(key), 0)
+
+    def test_invalid_transitions_are_rejected(self):
+        session_state.transition(self.session.id, session_state.ROOM_FINISHED)
+
+        with self.assertRaises(session_state.InvalidTransition):
+            session_state.transition(self.session.id, session_state.ROOM_STARTED)
+        with self.assertRaises(session_state.InvalidTransition):
+            session_state.transition(self.session.id, session_state.CANCEL)
+
+    def test_teacher_gone_for_an_hour_expires_on_join(self):
+        left = timezone.now() - timedelta(minutes=61)
+        session_state.transition(self.session.id, session_state.TEACHER_LEFT, at=left)
+        self.assertEqual(self.status(), LiveSession.STATUS_COMPLETED)
+
+        client = APIClient()
+        client.force_authenticate(user=self.student)
+        res = client.post(f"/api/livestream/sessions/{self.session.id}/join/")
+        self.assertEqual(res.status_code, 403)
+
+        # Expiry is written through
+        self.session.refresh_from_db()
+        self.assertEqual(self.session.status, LiveSession.STATUS_COMPLETED)
+
+    def test_room_finished_writes_through(self):
+        _handle_room_finished(_event("room_state"))
+
+        self.session.refresh_from_db()
+        self.assertEqual(self.session.status, LiveSession.STATUS_COMPLETED)
+        self.assertFalse(self.redis.sismember(session_state.DIRTY_KEY, str(self.session.id)))
+
+    def test_join_reads_redis_state(self):
+        # Cancelled in Redis only; the row still says SCHEDULED
+        self.redis.hset(
+            f"live:session:{self.session.id}",
+            mapping={**session_state._row_state(self.session.id), "status": LiveSession.STATUS_CANCELLED},
+        )
+
+        client = APIClient()
+        client.force_authenticate(user=self.student)
+        res = client.post(f"/api/livestream/sessions/{self.session.id}/join/")
+        self.assertEqual(res.status_code, 400)
+
+    def flush(self):
+        session_state.flush_dirty()
+        while attendance.ingest(consumer="test"):
+            pass
+
+    def test_class_join_burst_is_flushed_in_one_batch(self):
+        students = User.objects.bulk_create([
+            User(username=f"burst{i}", email=f"burst{i}@test.com")
+            for i in range(500)
+        ])
+        session_state.resolve_room("room_state")  # room lookup cached
+        session_state.get_state(self.session.id)  # session state loaded
+
+        with CaptureQueriesContext(connection) as ctx:
+            for student in students:
+                _handle_participant_join(_event("room_state", str(student.id)))
+        self.assertEqual(len(ctx.captured_queries), 0)
+
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(attendance.ingest(count=500, consumer="test"), 500)
+        # 4 reads + bulk inserts (SQLite splits those by its variable limit)
+        self.assertLess(len(ctx.captured_queries), 20)
+
+        self.assertEqual(
+            LiveSessionAttendance.objects.filter(
+                session=self.session, joined_at__isnull=False
+            ).count(),
+            500,
+        )
+        self.assertEqual(self.redis.xlen(attendance.STREAM_KEY), 0)
+
+    def test_rejoins_are_recorded_as_intervals_in_event_order(self):
+        user_id = str(self.student.id)
+        base = int(timezone.now().timestamp())
+
+        # Delivered out of order: the second leave arrives before the rejoin
+        for kind, offset in [(_handle_participant_join, 0), (_handle_participant_left, 60),
+                             (_handle_participant_left, 300), (_handle_participant_join, 120)]:
+            kind(_event("room_state", user_id, created_at=base + offset))
+        self.flush()
+
+        intervals = list(
+            LiveSessionAttendanceInterval.objects
+            .filter(session=self.session, user=self.student)
+            .values_list("joined_at", "left_at")
+        )
+        self.assertEqual(
+            [(j.timestamp() - base, l.timestamp() - base) for j, l in intervals],
+            [(0, 60), (120, 300)],
+        )
+
+        summary = LiveSessionAttendance.objects.get(session=self.session, user=self.student)
+        self.assertEqual(summary.joined_at.timestamp() - base, 120)
+        self.assertEqual(summary.left_at.timestamp() - base, 300)
+
+        # A later batch closes an interval opened in an earlier one
+        _handle_participant_join(_event("room_state", user_id, created_at=base + 400))
+        self.flush()
+        _handle_participant_left(_event("room_state", user_id, created_at=base + 460))
+        self.flush()
+        self.assertEqual(
+            LiveSessionAttendanceInterval.objects.filter(
+                session=self.session, user=self.student, left_at__isnull=True
+            ).count(),
+            0,
+        )
+
+    def test_failed_batch_is_replayed(self):
+        _handle_participant_join(_event("room_state", str(self.student.id)))
+
+        with mock.patch.object(attendance, "apply_events", side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                attendance.ingest(consumer="test")
+
+        self.assertEqual(attendance.ingest(consumer="test"), 1)
+        self.assertTrue(
+            LiveSessionAttendanceInterval.objects.filter(
+                session=self.session, user=self.student
+            ).exists()
+        )
+
+    def test_batch_that_keeps_failing_is_dead_lettered(self):
+        _handle_participant_join(_event("room_state", str(self.student.id)))
+
+        with mock.patch.object(attendance, "apply_events", side_effect=RuntimeError):
+            for _ in range(attendance.MAX_DELIVERIES - 1):
+                with self.assertRaises(RuntimeError):
+                    attendance.ingest(consumer="test")
+
+        # The next delivery is the last: set aside instead of retried
+        self.assertEqual(attendance.ingest(consumer="test"), 1)
+        self.assertEqual(attendance.ingest(consumer="test"), 0)
+        self.assertEqual(self.redis.xlen(attendance.STREAM_KEY), 0)
+
+        [(_, fields)] = self.redis.xrange(attendance.DEAD_LETTER_KEY)
+        self.assertEqual(fields["user"], str(self.student.id))
+        self.assertEqual(fields["kind"], attendance.JOIN)
+
+    def test_stream_is_capped(self):
+        with mock.patch.object(attendance, "STREAM_MAXLEN", 10):
+            for _ in range(500):
+                attendance.enqueue(self.session.id, self.student.id, attendance.JOIN)
+        self.assertLess(self.redis.xlen(attendance.STREAM_KEY), 500)
@@ -3,8 +3,9 @@ from .serializers import (
     LiveSessionCreateSerializer,
     LiveSessionListSerializer,
 )
+from .services.listing import SessionViewer
 from .services.token import generate_livekit_token
-from .models import LiveSession, LiveSessionAttendance
+from .models import LiveSession
 from enrollments.models import Enrollment
 from livekit.api import WebhookReceiver
 from rest_framework.response import Response
@@ -13,55 +14,65 @@ from rest_framework.exceptions import PermissionDenied
 from rest_framework.permissions import IsAuthenticated
 from rest_framework import generics, status
 from django.db.models import Q  # ✅ kept (unchanged)
-from django.db import transaction
 from django.http import HttpResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.shortcuts import get_object_or_404
 from django.utils import timezone
 import logging
-from datetime import timedelta
+from datetime import datetime, timedelta, timezone as dt_timezone
 from asgiref.sync import async_to_sync
 from channels.layers import get_channel_layer
-from django.contrib.auth import get_user_model  # ✅ ADDED
 
 
-from livestream.services.session_state import set_session_state
+from livestream.services import attendance, session_state
 
 
-def broadcast_session_update(session):
-    channel_layer = get_channel_layer()
+logger = logging.getLogger(__name__)
 
-    # 🔥 NEW: update Redis (safe)
-    try:
-        set_session_state(session)
-    except Exception:
-        pass  # never break system if Redis fails
+
+def broadcast_session_update(session_id, state):
+    channel_layer = get_channel_layer()
 
     if not channel_layer:
         return
 
     async_to_sync(channel_layer.group_send)(
-        f"session_{session.id}",
+        f"session_{session_id}",
         {
             "type": "session_update",
-            "data": {
-                "status": session.computed_status(),
-                "teacher_left_at": (
-                    session.teacher_left_at.isoformat()
-                    if session.teacher_left_at else None
-                ),
-            },
+            "data": session_state.public_state(state),
         },
     )
 
 
-logger = logging.getLogger(__name__)
+def _apply(session_id, event, **kwargs):
+    """Run a state transition and push the new state to WebSocket clients."""
+    try:
+        state = session_state.transition(session_id, event, **kwargs)
+    except session_state.InvalidTransition as exc:
+        logger.info(f"Ignored live-session event for {session_id}: {exc}")
+        return None
+
+    broadcast_session_update(session_id, state)
+    return state
+
+
+
+class SessionViewerMixin:
+    """Hands the viewer resolved in get_queryset to the list serializer."""
+
+    viewer = None
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context["viewer"] = self.viewer
+        return context
 
 
 # =========================
 # STUDENT SESSION LIST
 # =========================
-class StudentLiveSessionListView(generics.ListAPIView):
+class StudentLiveSessionListView(SessionViewerMixin, generics.ListAPIView):
     serializer_class = LiveSessionListSerializer
     permission_classes = [IsAuthenticated]
 
@@ -74,10 +85,13 @@ class StudentLiveSessionListView(generics.ListAPIView):
         course_id = self.request.query_params.get("course_id")
         subject_id = self.request.query_params.get("subject_id")
 
-        active_courses = Enrollment.objects.filter(
+        active_courses = list(Enrollment.objects.filter(
             user=user,
             status=Enrollment.STATUS_ACTIVE
-        ).values_list("course_id", flat=True)
+        ).values_list("course_id", flat=True))
+
+        # 🔥 resolved once; the serializer evaluates every row against it
+        self.viewer = SessionViewer(user, course_ids=active_courses)
 
         queryset = (
             LiveSession.objects
@@ -104,7 +118,7 @@ class StudentLiveSessionListView(generics.ListAPIView):
 # =========================
 # TEACHER SESSION LIST
 # =========================
-class TeacherLiveSessionListView(generics.ListAPIView):
+class TeacherLiveSessionListView(SessionViewerMixin, generics.ListAPIView):
     serializer_class = LiveSessionListSerializer
     permission_classes = [IsAuthenticated]
 
@@ -115,6 +129,8 @@ class TeacherLiveSessionListView(generics.ListAPIView):
         if not user.has_role("TEACHER"):
             raise PermissionDenied("Only teachers allowed.")
 
+        self.viewer = SessionViewer(user)
+
         now = timezone.now()
         cutoff = now - timedelta(hours=24)
 
@@ -151,21 +167,28 @@ def join_live_session(request, session_id):
     session = get_object_or_404(LiveSession, id=session_id)
     now = timezone.now()
 
+    # 🔥 live state comes from Redis, not the (periodically flushed) row
+    state = session_state.get_state(session.id)
+    teacher_left_at = state["teacher_left_at"]
+
     # 🚫 CANCELLED
-    if session.status == LiveSession.STATUS_CANCELLED:
+    if state["status"] == LiveSession.STATUS_CANCELLED:
         return Response({"detail": "Session cancelled"}, status=400)
 
+    # 🚫 ROOM FINISHED
+    if state["status"] == LiveSession.STATUS_COMPLETED:
+        return Response({"detail": "Session ended"}, status=403)
+
     # ==================================================
     # 🔥 TEACHER DISCONNECT / EXPIRY LOGIC (CENTRALIZED)
     # ==================================================
-    if session.teacher_left_at:
-        diff = now - session.teacher_left_at
+    if teacher_left_at:
+        diff = now - teacher_left_at
 
         # ❌ permanently ended
         if diff > timedelta(minutes=60):
-            if session.status != LiveSession.STATUS_COMPLETED:
-                session.status = LiveSession.STATUS_COMPLETED
-                session.save(update_fields=["status"])  # ✅ FIX
+            if state["status"] != LiveSession.STATUS_COMPLETED:
+                _apply(session.id, session_state.EXPIRE, at=now, flush=True)
 
             return Response(
                 {"detail": "Session permanently ended"},
@@ -192,8 +215,8 @@ def join_live_session(request, session_id):
             return Response({"detail": "Too early"}, status=403)
 
         # 🔥 optional: block if teacher gone too long
-        if session.teacher_left_at:
-            diff = now - session.teacher_left_at
+        if teacher_left_at:
+            diff = now - teacher_left_at
 
             if diff > timedelta(minutes=60):
                 return Response(
@@ -216,11 +239,9 @@ def join_live_session(request, session_id):
         is_teacher = is_creator  # presenter only if creator
 
         # 🔥 REVIVE SESSION (only creator matters)
-        if is_creator and session.teacher_left_at:
-            if now <= session.teacher_left_at + timedelta(minutes=30):
-                session.teacher_left_at = None
-                session.status = LiveSession.STATUS_LIVE
-                session.save(update_fields=["teacher_left_at", "status"])
+        if is_creator and teacher_left_at:
+            if now <= teacher_left_at + timedelta(minutes=30):
+                _apply(session.id, session_state.TEACHER_JOINED, at=now)
 
     else:
         return Response({"detail": "Unauthorized"}, status=403)
@@ -282,14 +303,16 @@ def cancel_live_session(request, session_id):
     if session.created_by != user:
         return Response({"detail": "You can only cancel your own sessions."}, status=403)
 
-    if session.status == LiveSession.STATUS_CANCELLED:
+    current = session_state.effective_status(session_state.get_state(session.id))
+
+    if current == LiveSession.STATUS_CANCELLED:
         return Response({"detail": "Session is already cancelled."}, status=400)
 
-    if session.status == LiveSession.STATUS_COMPLETED:
+    if current == LiveSession.STATUS_COMPLETED:
         return Response({"detail": "Cannot cancel a completed session."}, status=400)
 
-    session.status = LiveSession.STATUS_CANCELLED
-    session.save(update_fields=["status"])  # ✅ FIX
+    # written through so listings see it immediately
+    _apply(session.id, session_state.CANCEL, flush=True)
 
     return Response({"detail": "Session cancelled successfully."})
 
@@ -333,86 +356,53 @@ def livekit_webhook(request):
         return HttpResponse(status=400)
 
 
-@transaction.atomic
-def _handle_participant_join(event):
-    session = LiveSession.objects.filter(room_name=event.room.name).first()
-    if not session:
-        return
+def _event_time(event):
+    # LiveKit stamps events in unix seconds; keeps per-participant order
+    # even when webhooks arrive late
+    created_at = getattr(event, "created_at", 0)
+    if created_at:
+        return datetime.fromtimestamp(created_at, tz=dt_timezone.utc)
+    return timezone.now()
 
-    user_id = str(event.participant.identity)
 
-    User = get_user_model()  # ✅ FIX
-    user = User.objects.filter(id=user_id).first()
-    if not user:
+# 🔥 webhooks only touch Redis; flush_live_state batches the DB writes
+def _handle_participant_join(event):
+    room = session_state.resolve_room(event.room.name)
+    if not room:
         return
 
-    LiveSessionAttendance.objects.update_or_create(
-        session=session,
-        user=user,
-        defaults={"joined_at": timezone.now()}
-    )
-
-    session.last_activity_at = timezone.now()
+    user_id = str(event.participant.identity)
+    at = _event_time(event)
+    attendance.enqueue(room["id"], user_id, attendance.JOIN, at)
+    session_state.touch(room["id"], at)
 
     # 🔥 TEACHER JOIN
-    if str(session.created_by_id) == user_id:
-        session.teacher_left_at = None
-        session.status = LiveSession.STATUS_LIVE
-
-    session.save(update_fields=["teacher_left_at",
-                 "status", "last_activity_at"])  # ✅ FIX
-
-    broadcast_session_update(session)
+    if room["created_by"] == user_id:
+        _apply(room["id"], session_state.TEACHER_JOINED, flush=True)
 
 
-@transaction.atomic
 def _handle_participant_left(event):
-    session = LiveSession.objects.filter(room_name=event.room.name).first()
-    if not session:
+    room = session_state.resolve_room(event.room.name)
+    if not room:
         return
 
     user_id = str(event.participant.identity)
-
-    User = get_user_model()  # ✅ FIX
-    user = User.objects.filter(id=user_id).first()
-    if not user:
-        return
-
-    attendance = LiveSessionAttendance.objects.filter(
-        session=session,
-        user=user
-    ).first()
-
-    if attendance:
-        attendance.left_at = timezone.now()
-        attendance.save()
-
-    session.last_activity_at = timezone.now()
+    at = _event_time(event)
+    attendance.enqueue(room["id"], user_id, attendance.LEAVE, at)
+    session_state.touch(room["id"], at)
 
     # 🔥 TEACHER LEFT (network OR actual)
-    if str(session.created_by_id) == user_id:
-        session.teacher_left_at = timezone.now()
-        session.status = LiveSession.STATUS_RECONNECTING
-
-    session.save(update_fields=["teacher_left_at",
-                 "status", "last_activity_at"])  # ✅ FIX
-
-    broadcast_session_update(session)
+    if room["created_by"] == user_id:
+        _apply(room["id"], session_state.TEACHER_LEFT)
 
 
 def _handle_room_started(event):
-    sessions = LiveSession.objects.filter(room_name=event.room.name)
-
-    for session in sessions:
-        session.status = LiveSession.STATUS_LIVE
-        session.save(update_fields=["status"])  # ✅ FIX
-        broadcast_session_update(session)
+    room = session_state.resolve_room(event.room.name)
+    if room:
+        _apply(room["id"], session_state.ROOM_STARTED, flush=True)
 
 
 def _handle_room_finished(event):
-    sessions = LiveSession.objects.filter(room_name=event.room.name)
-
-    for session in sessions:
-        session.status = LiveSession.STATUS_COMPLETED
-        session.save(update_fields=["status"])  # ✅ FIX
-        broadcast_session_update(session)
+    room = session_state.resolve_room(event.room.name)
+    if room:
+        _apply(room["id"], session_state.ROOM_FINISHED, flush=True)
@@ -1,12 +1,15 @@
 import hmac
 import hashlib
+import json
 from django.conf import settings
+from django.db import transaction
 from django.http import HttpResponse
 from django.views.decorators.csrf import csrf_exempt
 
 from payments.models import Order, Payment
-from enrollments.models import Enrollment
+from enrollments.services import activate_enrollment
 from accounts.models import Role, UserRole
+from accounts.roles import invalidate_user_roles
 
 
 @csrf_exempt
@@ -27,40 +30,40 @@ def razorpay_webhook(request):
     event = payload.get("event")
 
     if event == "payment.captured":
-        payment_data = payload["payload"]["payment"]["entity"]
-        order_id = payment_data["order_id"]
+        # Order lock, payment, enrollment and CourseStats commit together
+        with transaction.atomic():
+            payment_data = payload["payload"]["payment"]["entity"]
+            order_id = payment_data["order_id"]
 
-        order = Order.objects.select_for_update().get(
-            razorpay_order_id=order_id
-        )
+            order = Order.objects.select_for_update().get(
+                razorpay_order_id=order_id
+            )
 
-        # Idempotency guard
-        if hasattr(order, "payment"):
-            return HttpResponse(status=200)
+            # Idempotency guard
+            if hasattr(order, "payment"):
+                return HttpResponse(status=200)
 
-        Payment.objects.create(
-            order=order,
-            razorpay_payment_id=payment_data["id"],
-            status=Payment.STATUS_SUCCESS,
-            raw_payload=payload,
-        )
+            Payment.objects.create(
+                order=order,
+                razorpay_payment_id=payment_data["id"],
+                status=Payment.STATUS_SUCCESS,
+                raw_payload=payload,
+            )
 
-        order.status = Order.STATUS_PAID
-        order.save()
+            order.status = Order.STATUS_PAID
+            order.save()
 
-        Enrollment.objects.get_or_create(
-            user=order.user,
-            course=order.course,
-            defaults={"status": Enrollment.STATUS_ACTIVE},
-        )
+            # Reactivates a revoked enrollment; CourseStats follows via signals
+            activate_enrollment(user=order.user, course=order.course)
 
-        # Role switch (GUEST → STUDENT)
-        UserRole.objects.filter(user=order.user, is_active=True).update(is_active=False)
-        student_role = Role.objects.get(name="STUDENT")
-        UserRole.objects.update_or_create(
-            user=order.user,
-            role=student_role,
-            defaults={"is_active": True},
-        )
+            # Role switch (GUEST → STUDENT)
+            UserRole.objects.filter(user=order.user, is_active=True).update(is_active=False)
+            student_role = Role.objects.get(name="STUDENT")
+            UserRole.objects.update_or_create(
+                user=order.user,
+                role=student_role,
+                defaults={"is_active": True},
+            )
+            invalidate_user_roles(order.user_id)
 
     return HttpResponse(status=200)
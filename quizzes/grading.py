@@ -0,0 +1,87 @@
+"""
+Set-based quiz grading.
+
+A submission is validated and scored entirely in memory against the quiz's
+answer key (question -> marks, choice -> question/is_correct), which comes
+from the compiled quiz snapshot (see quizzes.snapshot).
+"""
+import uuid
+
+from rest_framework.exceptions import ValidationError
+
+from .models import StudentAnswer
+
+
+class AnswerKey:
+    def __init__(self, marks, choices):
+        # {question_id: marks}
+        self.marks = marks
+        # {choice_id: (question_id, is_correct)}
+        self.choices = choices
+
+    @property
+    def question_count(self):
+        return len(self.marks)
+
+
+class GradedSubmission:
+    def __init__(self, score, answers):
+        self.score = score
+        # [(question_id, choice_id, is_correct)]
+        self.answers = answers
+
+
+def _canonical_id(value):
+    """``value`` as the key's canonical UUID string, or None if it is not one."""
+    try:
+        return str(uuid.UUID(str(value)))
+    except ValueError:
+        return None
+
+
+def grade_submission(answer_key, submitted_answers):
+    """
+    Validate and score a whole submission against ``answer_key``.
+    Raises ValidationError on unknown, mismatched or duplicate answers.
+    """
+    if len(submitted_answers) != answer_key.question_count:
+        raise ValidationError("All questions must be answered.")
+
+    score = 0
+    seen = set()
+    graded = []
+
+    for item in submitted_answers:
+        question_id = _canonical_id(item.get("question"))
+        choice_id = _canonical_id(item.get("selected_choice"))
+
+        if question_id not in answer_key.marks:
+            raise ValidationError("Invalid question.")
+
+        if question_id in seen:
+            raise ValidationError("Duplicate answer for a question.")
+        seen.add(question_id)
+
+        choice = answer_key.choices.get(choice_id)
+        if not choice or choice[0] != question_id:
+            raise ValidationError("Invalid choice.")
+
+        is_correct = choice[1]
+        if is_correct:
+            score += answer_key.marks[question_id]
+
+        graded.append((question_id, choice_id, is_correct))
+
+    return GradedSubmission(score=score, answers=graded)
+
+
+def build_student_answers(attempt, graded):
+    return [
+        StudentAnswer(
+            attempt=attempt,
+            question_id=question_id,
+            selected_choice_id=choice_id,
+            is_correct=is_correct,
+        )
+        for question_id, choice_id, is_correct in graded.answers
+    ]
@@ -10,6 +10,8 @@ from rest_framework.exceptions import ValidationError,PermissionDenied
 from courses.models import SubjectTeacher
 from enrollments.models import Enrollment
 
+from .grading import grade_submission, build_student_answers
+from .snapshot import get_quiz_snapshot
 from .models import (
     Quiz,
     Question,
@@ -129,6 +131,10 @@ class QuizCreateSerializer(serializers.ModelSerializer):
 
 
 class QuizDashboardSerializer(serializers.ModelSerializer):
+    """
+    Expects a queryset prepared with
+    quizzes.services.with_dashboard_annotations().
+    """
     subject_name = serializers.CharField(source="subject.name", read_only=True)
     course_title = serializers.CharField(
         source="subject.course.title", read_only=True)
@@ -138,10 +144,14 @@ class QuizDashboardSerializer(serializers.ModelSerializer):
         read_only=True
     )
 
-    questions_count = serializers.SerializerMethodField()
+    questions_count = serializers.IntegerField(read_only=True)
 
     status = serializers.SerializerMethodField()
-    score = serializers.SerializerMethodField()
+    score = serializers.FloatField(
+        source="latest_submitted_score",
+        read_only=True,
+        allow_null=True,
+    )
 
     class Meta:
         model = Quiz
@@ -160,32 +170,8 @@ class QuizDashboardSerializer(serializers.ModelSerializer):
             "is_published",
         ]
 
-    def get_questions_count(self, obj):
-        return obj.questions.count()
-
     def get_status(self, obj):
-        user = self.context["request"].user
-
-        attempt = QuizAttempt.objects.filter(
-            quiz=obj,
-            student=user
-        ).order_by("-attempt_number").first()
-
-        if not attempt:
-            return "PENDING"
-
-        return attempt.status
-
-    def get_score(self, obj):
-        user = self.context["request"].user
-
-        attempt = QuizAttempt.objects.filter(
-            quiz=obj,
-            student=user,
-            status=QuizAttempt.STATUS_SUBMITTED
-        ).order_by("-attempt_number").first()
-
-        return attempt.score if attempt else None
+        return obj.latest_attempt_status or QuizAttempt.STATUS_PENDING
 
 
 # =====================================================
@@ -215,8 +201,9 @@ class QuizSubmitSerializer(serializers.Serializer):
         if quiz.due_date <= timezone.now():
             raise ValidationError("Quiz expired.")
 
-        if len(attrs["answers"]) != quiz.questions.count():
-            raise ValidationError("All questions must be answered.")
+        # Grade in memory before any row is locked
+        answer_key = get_quiz_snapshot(quiz).answer_key
+        attrs["graded"] = grade_submission(answer_key, attrs["answers"])
 
         return attrs
 
@@ -224,7 +211,7 @@ class QuizSubmitSerializer(serializers.Serializer):
     def save(self, **kwargs):
         quiz = self.context["quiz"]
         user = self.context["request"].user
-        submitted_answers = self.validated_data["answers"]
+        graded = self.validated_data["graded"]
 
         # ✅ FIXED: get latest pending attempt
         attempt = QuizAttempt.objects.select_for_update().filter(
@@ -236,40 +223,12 @@ class QuizSubmitSerializer(serializers.Serializer):
         if not attempt:
             raise ValidationError("No active attempt found.")
 
-        score = 0
         attempt.answers.all().delete()
+        StudentAnswer.objects.bulk_create(
+            build_student_answers(attempt, graded)
+        )
 
-        for item in submitted_answers:
-            question_id = item.get("question")
-            choice_id = item.get("selected_choice")
-
-            question = Question.objects.filter(
-                id=question_id,
-                quiz=quiz
-            ).first()
-
-            if not question:
-                raise ValidationError("Invalid question.")
-
-            choice = Choice.objects.filter(
-                id=choice_id,
-                question=question
-            ).first()
-
-            if not choice:
-                raise ValidationError("Invalid choice.")
-
-            if choice.is_correct:
-                score += question.marks
-
-            StudentAnswer.objects.create(
-                attempt=attempt,
-                question=question,
-                selected_choice=choice,
-                is_correct=choice.is_correct,
-            )
-
-        attempt.score = score
+        attempt.score = graded.score
         attempt.status = QuizAttempt.STATUS_SUBMITTED
         attempt.submitted_at = timezone.now()
         attempt.save(update_fields=["score", "status", "submitted_at"])
@@ -325,8 +284,8 @@ class QuizDetailSerializer(serializers.ModelSerializer):
         ]
 
     def get_questions(self, obj):
-        questions = obj.questions.all().order_by("order")
-        return QuestionPublicSerializer(questions, many=True).data
+        # Served from the compiled snapshot, not the questions table
+        return get_quiz_snapshot(obj).paper
 
 
 # =====================================================
@@ -0,0 +1,47 @@
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from .models import Question, QuizAttempt
+
+
+def with_dashboard_annotations(queryset, *, user):
+    """
+    Annotate a Quiz queryset with everything QuizDashboardSerializer reads,
+    so a whole listing is served in a single query:
+
+      - questions_count
+      - latest_attempt_status   (None when the user never started)
+      - latest_submitted_score  (None when nothing was submitted)
+    """
+    questions_count = (
+        Question.objects
+        .filter(quiz=OuterRef("pk"))
+        .order_by()
+        .values("quiz")
+        .annotate(c=Count("id"))
+        .values("c")
+    )
+
+    user_attempts = QuizAttempt.objects.filter(
+        quiz=OuterRef("pk"),
+        student=user,
+    ).order_by("-attempt_number")
+
+    return (
+        queryset
+        .select_related("subject", "subject__course", "created_by")
+        .annotate(
+            questions_count=Coalesce(
+                Subquery(questions_count, output_field=IntegerField()),
+                Value(0),
+            ),
+            latest_attempt_status=Subquery(
+                user_attempts.values("status")[:1]
+            ),
+            latest_submitted_score=Subquery(
+                user_attempts
+                .filter(status=QuizAttempt.STATUS_SUBMITTED)
+                .values("score")[:1]
+            ),
+        )
+    )
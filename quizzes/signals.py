@@ -0,0 +1,38 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .models import Quiz, Question, Choice
+from .snapshot import invalidate_quiz_snapshot
+
+
+# =========================
+# SNAPSHOT INVALIDATION
+# =========================
+@receiver(post_save, sender=Quiz)
+@receiver(post_delete, sender=Quiz)
+def quiz_changed(sender, instance, **kwargs):
+    invalidate_quiz_snapshot(instance.pk)
+
+
+@receiver(post_save, sender=Question)
+@receiver(post_delete, sender=Question)
+def question_changed(sender, instance, **kwargs):
+    invalidate_quiz_snapshot(instance.quiz_id)
+
+
+@receiver(post_save, sender=Choice)
+@receiver(post_delete, sender=Choice)
+def choice_changed(sender, instance, **kwargs):
+    # Choices are edited inline under their question (admin), which has the
+    # question loaded already
+    if Choice.question.is_cached(instance):
+        quiz_id = instance.question.quiz_id
+    else:
+        quiz_id = (
+            Question.objects
+            .filter(pk=instance.question_id)
+            .values_list("quiz_id", flat=True)
+            .first()
+        )
+    if quiz_id:
+        invalidate_quiz_snapshot(quiz_id)
@@ -0,0 +1,190 @@
+"""
+Compiled quiz snapshots.
+
+Once a quiz is published its questions and choices are effectively
+immutable, so everything the read paths need (the student paper, the
+answer key, correct answers and explanations) is compiled once into a
+QuizSnapshot and kept in the cache named by settings.QUIZ_SNAPSHOT_CACHE
+(local memory in development, Redis in production).
+
+Snapshots are versioned: every edit to a quiz, question or choice bumps the
+quiz's version token once the edit commits, so a snapshot compiled from
+stale rows (including pre-commit rows read by a concurrent request) is never
+read again even if it lands in the cache after the edit.
+"""
+import threading
+import time
+import weakref
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+from .grading import AnswerKey
+from .models import Question
+
+
+SNAPSHOT_CACHE_TIMEOUT = 60 * 60 * 24  # seconds
+VERSION_CACHE_TIMEOUT = SNAPSHOT_CACHE_TIMEOUT * 7
+
+
+class QuizSnapshot:
+    def __init__(self, quiz_id, version, paper, answer_key, question_text,
+                 choice_text, question_options, correct_choice, explanations):
+        self.quiz_id = quiz_id
+        self.version = version
+        # Student paper, same shape as QuestionPublicSerializer output
+        self.paper = paper
+        self.answer_key = answer_key
+        # {question_id: text}
+        self.question_text = question_text
+        # {choice_id: text}
+        self.choice_text = choice_text
+        # {question_id: [choice text, ...]}
+        self.question_options = question_options
+        # {question_id: choice_id}
+        self.correct_choice = correct_choice
+        # {question_id: explanation}
+        self.explanations = explanations
+
+    def question_ids(self):
+        return [q["id"] for q in self.paper]
+
+    def options(self, question_id):
+        return self.question_options.get(question_id, [])
+
+    def correct_choice_text(self, question_id):
+        choice_id = self.correct_choice.get(question_id)
+        return self.choice_text.get(choice_id, "")
+
+
+def _cache():
+    return caches[getattr(settings, "QUIZ_SNAPSHOT_CACHE", "default")]
+
+
+def _version_key(quiz_id):
+    return f"quizzes:snapshot_version:{quiz_id}"
+
+
+def _snapshot_key(quiz_id, version):
+    return f"quizzes:snapshot:{quiz_id}:{version}"
+
+
+def build_snapshot(quiz, version=0):
+    questions = (
+        Question.objects
+        .filter(quiz=quiz)
+        .prefetch_related("choices")
+        .order_by("order")
+    )
+
+    paper = []
+    marks = {}
+    choices = {}
+    question_text = {}
+    choice_text = {}
+    question_options = {}
+    correct_choice = {}
+    explanations = {}
+
+    for question in questions:
+        qid = str(question.id)
+        question_choices = []
+
+        for choice in question.choices.all():
+            cid = str(choice.id)
+            question_choices.append({"id": cid, "text": choice.text})
+            choices[cid] = (qid, choice.is_correct)
+            choice_text[cid] = choice.text
+            if choice.is_correct and qid not in correct_choice:
+                correct_choice[qid] = cid
+
+        paper.append({
+            "id": qid,
+            "text": question.text,
+            "marks": question.marks,
+            "order": question.order,
+            "choices": question_choices,
+            "explanation": question.explanation,
+        })
+        marks[qid] = question.marks
+        question_text[qid] = question.text
+        question_options[qid] = [c["text"] for c in question_choices]
+        explanations[qid] = question.explanation
+
+    return QuizSnapshot(
+        quiz_id=str(quiz.pk),
+        version=version,
+        paper=paper,
+        answer_key=AnswerKey(marks=marks, choices=choices),
+        question_text=question_text,
+        choice_text=choice_text,
+        question_options=question_options,
+        correct_choice=correct_choice,
+        explanations=explanations,
+    )
+
+
+def get_quiz_snapshot(quiz):
+    """
+    Snapshot for ``quiz``. Published quizzes are served from the cache and
+    compiled on a miss; drafts are always compiled fresh.
+    """
+    if not quiz.is_published:
+        return build_snapshot(quiz)
+
+    cache = _cache()
+    version = cache.get(_version_key(quiz.pk))
+    if version is None:
+        version = time.time_ns()
+        cache.add(_version_key(quiz.pk), version, VERSION_CACHE_TIMEOUT)
+        version = cache.get(_version_key(quiz.pk), version)
+
+    key = _snapshot_key(quiz.pk, version)
+    snapshot = cache.get(key)
+    if snapshot is None:
+        snapshot = build_snapshot(quiz, version=version)
+        cache.set(key, snapshot, SNAPSHOT_CACHE_TIMEOUT)
+    return snapshot
+
+
+def publish_snapshot(quiz):
+    """Compile and store the snapshot once the publish commits."""
+    invalidate_quiz_snapshot(quiz.pk)
+    transaction.on_commit(lambda: get_quiz_snapshot(quiz))
+
+
+# {quiz_id: _VersionBump} registered in this thread's open transaction.
+# Weak, so bumps dropped by a rollback disappear with it.
+_pending = threading.local()
+
+
+class _VersionBump:
+    """on_commit callback bumping one quiz's version."""
+
+    def __init__(self, quiz_id):
+        self.quiz_id = quiz_id
+
+    def __call__(self):
+        _pending_bumps().pop(self.quiz_id, None)
+        _cache().set(_version_key(self.quiz_id), time.time_ns(), VERSION_CACHE_TIMEOUT)
+
+
+def _pending_bumps():
+    if not hasattr(_pending, "bumps"):
+        _pending.bumps = weakref.WeakValueDictionary()
+    return _pending.bumps
+
+
+def invalidate_quiz_snapshot(quiz_id):
+    """
+    Bump the quiz's version once the current transaction commits. A quiz
+    edited several times in one transaction (a question saved with its
+    choices inline, say) is bumped once.
+    """
+    pending = _pending_bumps()
+    if quiz_id in pending:
+        return
+    bump = _VersionBump(quiz_id)
+    pending[quiz_id] = bump
+    transaction.on_commit(bump)
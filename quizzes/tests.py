@@ -1,3 +1,352 @@
+"""
+Tests for quizzes.
+
+Covers:
+  - Dashboard annotations (questions count, latest status, latest score)
+  - Query count of the student dashboard stays constant as quizzes grow
+  - Set-based grading of submissions (any UUID spelling, malformed ids
+    rejected)
+  - Published snapshots: no question reads, one version bump per edit on
+    commit, none lost to a rolled-back edit
+"""
+
+from datetime import timedelta
+
+from django.db import connection, transaction
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from accounts.models import User, Role, UserRole
+from courses.models import Course, Subject
+from enrollments.models import Enrollment
+from .models import Quiz, Question, Choice, QuizAttempt, StudentAnswer
+from .snapshot import get_quiz_snapshot
+
+
+# ===================================================================
+# HELPERS
+# ===================================================================
+
+class BaseQuizTestCase(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.student_role = Role.objects.create(name=Role.STUDENT)
+        cls.teacher_role = Role.objects.create(name=Role.TEACHER)
+
+        cls.teacher = User.objects.create_user(
+            username="quizteacher",
+            email="quizteacher@test.com",
+            password="testpass123",
+        )
+        UserRole.objects.create(
+            user=cls.teacher, role=cls.teacher_role, is_active=True
+        )
+
+        cls.student = User.objects.create_user(
+            username="quizstudent",
+            email="quizstudent@test.com",
+            password="testpass123",
+            is_verified=True,
+        )
+        UserRole.objects.create(
+            user=cls.student, role=cls.student_role, is_active=True
+        )
+
+        cls.course = Course.objects.create(title="Class 10")
+        cls.subject = Subject.objects.create(course=cls.course, name="Maths")
+        Enrollment.objects.create(user=cls.student, course=cls.course)
+
+    def get_client(self, user):
+        client = APIClient()
+        client.force_authenticate(user=user)
+        return client
+
+    def create_quizzes(self, count):
+        due = timezone.now() + timedelta(days=7)
+        return Quiz.objects.bulk_create([
+            Quiz(
+                subject=self.subject,
+                created_by=self.teacher,
+                title=f"Quiz {i}",
+                due_date=due,
+                is_published=True,
+            )
+            for i in range(count)
+        ])
+
+
+# ===================================================================
+# DASHBOARD
+# ===================================================================
+
+class StudentDashboardTest(BaseQuizTestCase):
+
+    url = "/api/student/quizzes/"
+
+    def test_annotated_fields(self):
+        pending, submitted, untouched = self.create_quizzes(3)
+        Question.objects.bulk_create([
+            Question(quiz=submitted, text="Q1", marks=2),
+            Question(quiz=submitted, text="Q2", marks=3),
+        ])
+        QuizAttempt.objects.create(
+            quiz=pending, student=self.student, attempt_number=1
+        )
+        QuizAttempt.objects.create(
+            quiz=submitted,
+            student=self.student,
+            attempt_number=1,
+            score=4,
+            status=QuizAttempt.STATUS_SUBMITTED,
+        )
+        QuizAttempt.objects.create(
+            quiz=submitted, student=self.student, attempt_number=2
+        )
+
+        res = self.get_client(self.student).get(self.url)
+        self.assertEqual(res.status_code, 200)
+        rows = {row["title"]: row for row in res.data}
+
+        self.assertEqual(rows[pending.title]["status"], "PENDING")
+        self.assertIsNone(rows[pending.title]["score"])
+
+        # Latest attempt is a new pending one; score still shows last submission
+        self.assertEqual(rows[submitted.title]["status"], "PENDING")
+        self.assertEqual(rows[submitted.title]["score"], 4)
+        self.assertEqual(rows[submitted.title]["questions_count"], 2)
+
+        self.assertEqual(rows[untouched.title]["status"], "PENDING")
+        self.assertEqual(rows[untouched.title]["questions_count"], 0)
+
+    def test_query_count_is_constant(self):
+        client = self.get_client(self.student)
+        counts = []
+        created = 0
+
+        for size in (50, 500, 5000):
+            self.create_quizzes(size - created)
+            created = size
+
+            with CaptureQueriesContext(connection) as ctx:
+                res = client.get(self.url)
+
+            self.assertEqual(res.status_code, 200)
+            self.assertEqual(len(res.data), size)
+            counts.append(len(ctx.captured_queries))
+
+        self.assertEqual(len(set(counts)), 1, counts)
+
+
+# ===================================================================
+# SUBMISSION / GRADING
+# ===================================================================
+
+class SubmitQuizTest(BaseQuizTestCase):
+
+    def setUp(self):
+        self.quiz = self.create_quizzes(1)[0]
+        self.correct = {}
+        self.wrong = {}
+        for i in range(20):
+            question = Question.objects.create(
+                quiz=self.quiz, text=f"Q{i}", marks=2, order=i
+            )
+            self.correct[question.id] = Choice.objects.create(
+                question=question, text="right", is_correct=True
+            )
+            self.wrong[question.id] = Choice.objects.create(
+                question=question, text="wrong", is_correct=False
+            )
+        QuizAttempt.objects.create(
+            quiz=self.quiz, student=self.student, attempt_number=1
+        )
+        self.url = f"/api/student/quizzes/{self.quiz.id}/submit/"
+
+    def submit(self, answers):
+        return self.get_client(self.student).post(
+            self.url, {"answers": answers}, format="json"
+        )
+
+    def test_scores_submission(self):
+        answers = [
+            {
+                "question": str(qid),
+                "selected_choice": str(
+                    (self.correct if i % 2 == 0 else self.wrong)[qid].id
+                ),
+            }
+            for i, qid in enumerate(self.correct)
+        ]
+        res = self.submit(answers)
+        self.assertEqual(res.status_code, 200, res.data)
+        self.assertEqual(res.data["score"], 20)
+
+        attempt = QuizAttempt.objects.get(quiz=self.quiz, student=self.student)
+        self.assertEqual(attempt.status, QuizAttempt.STATUS_SUBMITTED)
+        self.assertEqual(
+            StudentAnswer.objects.filter(attempt=attempt, is_correct=True).count(),
+            10,
+        )
+
+    def test_query_count_independent_of_question_count(self):
+        answers = [
+            {"question": str(qid), "selected_choice": str(choice.id)}
+            for qid, choice in self.correct.items()
+        ]
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.submit(answers)
+        self.assertEqual(res.status_code, 200, res.data)
+        self.assertLess(len(ctx.captured_queries), 20)
+
+    def test_accepts_any_uuid_spelling(self):
+        answers = [
+            {"question": str(qid).upper(), "selected_choice": choice.id.hex}
+            for qid, choice in self.correct.items()
+        ]
+        res = self.submit(answers)
+        self.assertEqual(res.status_code, 200, res.data)
+        self.assertEqual(res.data["score"], 40)
+
+    def test_rejects_malformed_id(self):
+        answers = [
+            {"question": str(qid), "selected_choice": str(choice.id)}
+            for qid, choice in self.correct.items()
+        ]
+        answers[0]["selected_choice"] = "not-a-uuid"
+        res = self.submit(answers)
+        self.assertEqual(res.status_code, 400)
+
+    def test_rejects_choice_from_other_question(self):
+        qids = list(self.correct)
+        answers = [
+            {"question": str(qid), "selected_choice": str(self.correct[qid].id)}
+            for qid in qids
+        ]
+        answers[0]["selected_choice"] = str(self.correct[qids[1]].id)
+        res = self.submit(answers)
+        self.assertEqual(res.status_code, 400)
+        self.assertFalse(StudentAnswer.objects.exists())
+
+    def test_rejects_duplicate_question(self):
+        qids = list(self.correct)
+        answers = [
+            {"question": str(qids[0]), "selected_choice": str(self.correct[qids[0]].id)}
+            for _ in qids
+        ]
+        res = self.submit(answers)
+        self.assertEqual(res.status_code, 400)
+
+    def test_rejects_partial_submission(self):
+        qid = next(iter(self.correct))
+        res = self.submit([
+            {"question": str(qid), "selected_choice": str(self.correct[qid].id)}
+        ])
+        self.assertEqual(res.status_code, 400)
+
+
+# ===================================================================
+# SNAPSHOTS
+# ===================================================================
+
+class QuizSnapshotTest(BaseQuizTestCase):
+
+    def setUp(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.publish_quiz()
+
+    def publish_quiz(self):
+        due = timezone.now() + timedelta(days=7)
+        self.quiz = Quiz.objects.create(
+            subject=self.subject,
+            created_by=self.teacher,
+            title="Snapshot quiz",
+            due_date=due,
+        )
+        self.question = Question.objects.create(
+            quiz=self.quiz, text="2 + 2?", marks=1, explanation="Basic sum"
+        )
+        self.right = Choice.objects.create(
+            question=self.question, text="4", is_correct=True
+        )
+        self.wrong = Choice.objects.create(
+            question=self.question, text="5", is_correct=False
+        )
+        res = self.get_client(self.teacher).patch(
+            f"/api/teacher/quizzes/{self.quiz.id}/publish/"
+        )
+        self.assertEqual(res.status_code, 200)
+        self.quiz.refresh_from_db()
+
+    def captured_tables(self, ctx):
+        return " ".join(q["sql"] for q in ctx.captured_queries)
+
+    def test_detail_reads_no_questions_after_publish(self):
+        client = self.get_client(self.student)
+        with CaptureQueriesContext(connection) as ctx:
+            res = client.get(f"/api/quizzes/{self.quiz.id}/")
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.data["questions"][0]["text"], "2 + 2?")
+        self.assertNotIn("is_correct", res.data["questions"][0]["choices"][0])
+        sql = self.captured_tables(ctx)
+        self.assertNotIn("quizzes_question", sql)
+        self.assertNotIn("quizzes_choice", sql)
+
+    def test_edit_invalidates_snapshot(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.question.text = "3 + 1?"
+            self.question.save()
+        res = self.get_client(self.student).get(f"/api/quizzes/{self.quiz.id}/")
+        self.assertEqual(res.data["questions"][0]["text"], "3 + 1?")
+
+    def test_edit_bumps_version_once_after_commit(self):
+        version = get_quiz_snapshot(self.quiz).version
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.question.text = "3 + 1?"
+            self.question.save()
+            for choice in (self.right, self.wrong):
+                choice.question = self.question
+                choice.save()
+            # Readers before the commit keep the old version
+            self.assertEqual(get_quiz_snapshot(self.quiz).version, version)
+
+        self.assertEqual(len(callbacks), 1)
+        callbacks[0]()
+        self.assertNotEqual(get_quiz_snapshot(self.quiz).version, version)
+
+    def test_rolled_back_edit_does_not_swallow_the_next_bump(self):
+        version = get_quiz_snapshot(self.quiz).version
+        with self.assertRaises(RuntimeError):
+            with transaction.atomic():
+                self.question.save()
+                raise RuntimeError
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.question.save()
+        self.assertNotEqual(get_quiz_snapshot(self.quiz).version, version)
+
+    def test_result_uses_snapshot(self):
+        QuizAttempt.objects.create(
+            quiz=self.quiz, student=self.student, attempt_number=1
+        )
+        client = self.get_client(self.student)
+        res = client.post(
+            f"/api/student/quizzes/{self.quiz.id}/submit/",
+            {"answers": [{
+                "question": str(self.question.id),
+                "selected_choice": str(self.wrong.id),
+            }]},
+            format="json",
+        )
+        self.assertEqual(res.status_code, 200, res.data)
 
-# Create your tests here.
+        with CaptureQueriesContext(connection) as ctx:
+            res = client.get(f"/api/quizzes/{self.quiz.id}/result/")
+        self.assertEqual(res.status_code, 200, res.data)
+        row = res.data["questions"][0]
+        self.assertEqual(row["selected_choice"], "5")
+        self.assertEqual(row["correct_choice"], "4")
+        self.assertEqual(row["explanation"], "Basic sum")
+        self.assertNotIn("quizzes_choice", self.captured_tables(ctx))
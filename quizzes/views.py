@@ -17,6 +17,8 @@ from django.db.models import Count, Avg, Max, Min
 from courses.models import Subject, SubjectTeacher
 
 from .models import Quiz, QuizAttempt
+from .services import with_dashboard_annotations
+from .snapshot import get_quiz_snapshot, publish_snapshot
 from .serializers import (
     QuizCreateSerializer,
     QuestionCreateSerializer,
@@ -108,6 +110,9 @@ class PublishQuizView(APIView):
         quiz.is_published = True
         quiz.save(update_fields=["total_marks", "is_published"])
 
+        # Questions are frozen from here on, compile the read paths once
+        publish_snapshot(quiz)
+
         return Response(
             {"detail": "Quiz published successfully."},
             status=status.HTTP_200_OK,
@@ -148,6 +153,8 @@ class StudentDashboardView(APIView):
         elif status_filter == "pending":
             quizzes = quizzes.exclude(id__in=submitted_ids)
 
+        quizzes = with_dashboard_annotations(quizzes, user=request.user)
+
         serializer = QuizDashboardSerializer(
             quizzes,
             many=True,
@@ -240,8 +247,7 @@ class QuizDetailView(APIView):
                 "subject",
                 "subject__course",
                 "created_by",
-            )
-            .prefetch_related("questions__choices"),
+            ),
             pk=pk,
             is_published=True,
         )
@@ -290,20 +296,28 @@ class QuizResultView(APIView):
         if not attempt:
             raise ValidationError("No submitted attempt found.")
 
+        snapshot = get_quiz_snapshot(quiz)
+        answers = {
+            str(question_id): (str(choice_id), is_correct)
+            for question_id, choice_id, is_correct in attempt.answers.values_list(
+                "question_id", "selected_choice_id", "is_correct"
+            )
+        }
+
         result_questions = []
 
-        for answer in attempt.answers.all():
-            correct_choice = answer.question.choices.filter(
-                is_correct=True
-            ).first()
+        for question_id in snapshot.question_ids():
+            if question_id not in answers:
+                continue
+            choice_id, is_correct = answers[question_id]
 
             result_questions.append({
-                "id": answer.question.id,
-                "text": answer.question.text,
-                "selected_choice": answer.selected_choice.text,
-                "correct_choice": correct_choice.text if correct_choice else "",
-                "is_correct": answer.is_correct,
-                "explanation": answer.question.explanation,
+                "id": question_id,
+                "text": snapshot.question_text[question_id],
+                "selected_choice": snapshot.choice_text.get(choice_id, ""),
+                "correct_choice": snapshot.correct_choice_text(question_id),
+                "is_correct": is_correct,
+                "explanation": snapshot.explanations[question_id],
             })
 
         data = {
@@ -370,10 +384,13 @@ class TeacherSubjectQuizListView(generics.ListAPIView):
         ).exists():
             raise PermissionDenied("Not assigned to this subject.")
 
-        return Quiz.objects.filter(
-            subject=subject,
-            is_published=True
-        ).order_by("-created_at")
+        return with_dashboard_annotations(
+            Quiz.objects.filter(
+                subject=subject,
+                is_published=True
+            ).order_by("-created_at"),
+            user=user,
+        )
 
 
 class TeacherDeleteQuizView(APIView):
@@ -573,32 +590,39 @@ class TeacherQuizAttemptDetailView(APIView):
 
     def get(self, request, pk):
         attempt = get_object_or_404(
-            QuizAttempt.objects.prefetch_related(
-                "answers__question__choices",
-                "answers__selected_choice",
+            QuizAttempt.objects.select_related(
+                "quiz",
+                "student__profile",
             ),
             id=pk
         )
 
         # ensure teacher owns this quiz
         if not SubjectTeacher.objects.filter(
-            subject=attempt.quiz.subject,
+            subject_id=attempt.quiz.subject_id,
             teacher=request.user
         ).exists():
             raise PermissionDenied("Not authorized.")
 
+        snapshot = get_quiz_snapshot(attempt.quiz)
+        selected = {
+            str(question_id): str(choice_id)
+            for question_id, choice_id in attempt.answers.values_list(
+                "question_id", "selected_choice_id"
+            )
+        }
+
         result_questions = []
 
-        for answer in attempt.answers.all():
-            correct_choice = answer.question.choices.filter(
-                is_correct=True
-            ).first()
+        for question_id in snapshot.question_ids():
+            if question_id not in selected:
+                continue
 
             result_questions.append({
-                "question": answer.question.text,
-                "options": [c.text for c in answer.question.choices.all()],
-                "selected": answer.selected_choice.text,
-                "correct": correct_choice.text if correct_choice else "",
+                "question": snapshot.question_text[question_id],
+                "options": snapshot.options(question_id),
+                "selected": snapshot.choice_text.get(selected[question_id], ""),
+                "correct": snapshot.correct_choice_text(question_id),
             })
 
         return Response({
@@ -607,4 +631,4 @@ class TeacherQuizAttemptDetailView(APIView):
             "total": attempt.quiz.total_marks,
             "submitted_at": attempt.submitted_at,
             "questions": result_questions,
-        })
\ No newline at end of file
+        })
@@ -4,4 +4,7 @@ from django.apps import AppConfig
 class SessionsAppConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "sessions_app"
-    verbose_name = "Private Sessions"
\ No newline at end of file
+    verbose_name = "Private Sessions"
+
+    def ready(self):
+        from . import signals
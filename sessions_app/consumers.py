@@ -1,182 +1,222 @@
 import json
 import asyncio
 import logging
+from collections import defaultdict
 
+from asgiref.sync import sync_to_async
 from channels.generic.websocket import AsyncWebsocketConsumer
 from channels.db import database_sync_to_async
-from django.db.models import F
-from django.utils import timezone
+from django.core.exceptions import ValidationError
+
+from .services import chat, presence
 
 logger = logging.getLogger(__name__)
 
-# How long (seconds) to wait after everyone leaves before auto-ending the session
-AUTO_EXPIRE_DELAY = 5 * 60  # 5 minutes
+# Client message ids remembered per connection to drop resends
+RECENT_CLIENT_IDS = 256
+
+# Connections held by this worker (session_id → channel names), kept
+# alive in Redis by the presence loop.
+_local_connections: dict[str, set[str]] = defaultdict(set)
+_presence_loop: asyncio.Task | None = None
+
+
+def _ensure_presence_loop():
+    global _presence_loop
+    loop = asyncio.get_running_loop()
+    if _presence_loop is None or _presence_loop.done() or _presence_loop.get_loop() is not loop:
+        _presence_loop = loop.create_task(_run_presence_loop())
 
-# In-memory map of pending auto-expire asyncio tasks keyed by session_id.
-# Used to cancel the timer if someone rejoins before it fires.
-_expire_tasks: dict[str, asyncio.Task] = {}
+
+async def _run_presence_loop():
+    """
+    One per worker: heartbeat this worker's connections, then sweep the
+    shared expiry schedule (every worker sweeps; each session is claimed
+    by exactly one).
+    """
+    while True:
+        await asyncio.sleep(presence.HEARTBEAT_INTERVAL)
+        try:
+            await sync_to_async(presence.heartbeat)({
+                session_id: set(names)
+                for session_id, names in _local_connections.items()
+                if names
+            })
+            for session_id in await database_sync_to_async(presence.expire_due)():
+                logger.info(
+                    "Session %s auto-expired after %ds with no participants",
+                    session_id,
+                    presence.AUTO_EXPIRE_DELAY,
+                )
+        except Exception:
+            logger.exception("Presence loop iteration failed")
 
 
 class PrivateSessionChatConsumer(AsyncWebsocketConsumer):
     """
     WebSocket consumer for private session real-time chat.
 
-    Also tracks active connections per session so rooms can auto-expire
-    when every participant has left for 5 minutes.
+    Clients send {"type": "chat_message", "message": ..., "client_id": ...}
+    frames. The sender is authorized once at connect; each message is
+    broadcast straight away and persisted in micro-batches by
+    services.chat.writer. ``client_id`` comes back in the broadcast so the
+    sender can match its optimistic copy, and resends are dropped. Chat
+    opens and closes with the session_started / session_ended group events.
+
+    Presence is tracked in Redis (services.presence) so rooms can
+    auto-expire when every participant has left for 5 minutes; connecting
+    and disconnecting write nothing to Postgres.
     """
 
     async def connect(self):
         self.session_id = self.scope["url_route"]["kwargs"]["session_id"]
-        self.group_name = f"private_session_chat_{self.session_id}"
+        self.group_name = chat.chat_group_name(self.session_id)
+
+        # ── Authorize once for the life of the connection ─────────
+        self.sender = await self._load_sender()
+        if self.sender is None:
+            await self.close(code=4403)
+            return
+        self.chat_open = self.sender.pop("chat_open")
+        self._recent_client_ids = {}
 
         # Join the channel-layer group
         await self.channel_layer.group_add(self.group_name, self.channel_name)
-        await self.accept()
 
         # ── Track this connection ──────────────────────────────────
-        await self._increment_connections()
+        _local_connections[self.session_id].add(self.channel_name)
+        await sync_to_async(presence.join)(self.session_id, self.channel_name)
+        _ensure_presence_loop()
 
-        # If an auto-expire timer is pending for this room, cancel it
-        task = _expire_tasks.pop(self.session_id, None)
-        if task and not task.done():
-            task.cancel()
-            logger.info(
-                "Auto-expire timer cancelled for session %s (participant rejoined)",
-                self.session_id,
-            )
+        await self.accept()
 
     async def disconnect(self, close_code):
+        if getattr(self, "sender", None) is None:
+            return  # rejected at connect
+
         # Leave the channel-layer group
         await self.channel_layer.group_discard(self.group_name, self.channel_name)
 
+        # Don't leave this client's last messages waiting on the timer
+        await chat.writer.flush()
+
         # ── Track this disconnection ───────────────────────────────
-        remaining = await self._decrement_connections()
+        names = _local_connections[self.session_id]
+        names.discard(self.channel_name)
+        if not names:
+            del _local_connections[self.session_id]
 
+        remaining = await sync_to_async(presence.leave)(self.session_id, self.channel_name)
         if remaining <= 0:
-            # Everyone has left — start the 5-minute countdown
-            await self._mark_all_left()
             logger.info(
-                "All participants left session %s — starting %ds auto-expire timer",
+                "All participants left session %s — auto-expires in %ds",
                 self.session_id,
-                AUTO_EXPIRE_DELAY,
-            )
-            # Schedule the auto-expire check (non-blocking)
-            task = asyncio.ensure_future(
-                self._auto_expire_after_delay(self.session_id)
+                presence.AUTO_EXPIRE_DELAY,
             )
-            _expire_tasks[self.session_id] = task
-
-    async def chat_message(self, event):
-        """Receives broadcast from views.send_chat_message and forwards to WebSocket client."""
-        await self.send(text_data=json.dumps({
-            "type": "chat_message",
-            "data": event["data"],
-        }))
 
-    # ──────────────────────────────────────────────────────────────
-    # Connection-count helpers (DB operations via sync_to_async)
-    # ──────────────────────────────────────────────────────────────
+    async def receive(self, text_data=None, bytes_data=None):
+        try:
+            frame = json.loads(text_data or "")
+        except ValueError:
+            frame = None
+        if not isinstance(frame, dict) or frame.get("type") != "chat_message":
+            await self._send_error("Unsupported message.")
+            return
 
-    @database_sync_to_async
-    def _increment_connections(self):
-        """Atomically add 1 to active_connections and clear all_left_at."""
-        from .models import PrivateSession
+        client_id = str(frame.get("client_id") or "")[:64] or None
 
-        PrivateSession.objects.filter(
-            pk=self.session_id, status="ongoing"
-        ).update(
-            active_connections=F("active_connections") + 1,
-            all_left_at=None,
-        )
+        if not self.chat_open:
+            await self._send_error("Chat is only available for active sessions.", client_id)
+            return
 
-    @database_sync_to_async
-    def _decrement_connections(self) -> int:
-        """
-        Atomically subtract 1 from active_connections.
-        Returns the new count (clamped to 0).
-        """
-        from .models import PrivateSession
+        text = str(frame.get("message") or "").strip()
+        if not text:
+            await self._send_error("Message cannot be empty.", client_id)
+            return
 
-        PrivateSession.objects.filter(
-            pk=self.session_id, status="ongoing"
-        ).update(
-            active_connections=F("active_connections") - 1,
+        if client_id:
+            if client_id in self._recent_client_ids:
+                return  # resend of a message already broadcast
+            self._recent_client_ids[client_id] = None
+            if len(self._recent_client_ids) > RECENT_CLIENT_IDS:
+                del self._recent_client_ids[next(iter(self._recent_client_ids))]
+
+        from .models import ChatMessage
+        from .serializers import ChatMessageSerializer
+
+        # id and created_at are assigned now, so the broadcast and the row agree
+        message = ChatMessage(
+            session_id=self.sender["session_pk"],
+            sender_id=self.sender["id"],
+            sender_name=self.sender["name"],
+            sender_role=self.sender["role"],
+            message=text,
+            client_id=client_id,
         )
 
-        # Read back the current value
-        try:
-            session = PrivateSession.objects.get(pk=self.session_id)
-            count = max(session.active_connections, 0)
-            # Clamp to 0 if it somehow went negative
-            if session.active_connections < 0:
-                session.active_connections = 0
-                session.save(update_fields=["active_connections"])
-            return count
-        except PrivateSession.DoesNotExist:
-            return 0
-
-    @database_sync_to_async
-    def _mark_all_left(self):
-        """Set all_left_at timestamp when the room becomes empty."""
-        from .models import PrivateSession
-
-        PrivateSession.objects.filter(
-            pk=self.session_id, status="ongoing"
-        ).update(
-            all_left_at=timezone.now(),
-            active_connections=0,  # ensure clean state
-        )
+        # 🔥 Broadcast first; the row is written with the next batch
+        await self.channel_layer.group_send(self.group_name, {
+            "type": "chat_message",
+            "data": ChatMessageSerializer(message).data,
+        })
+        chat.writer.submit(message)
 
-    # ──────────────────────────────────────────────────────────────
-    # Auto-expire logic
-    # ──────────────────────────────────────────────────────────────
+    async def chat_message(self, event):
+        """Forwards a broadcast chat message to the WebSocket client."""
+        await self.send(text_data=json.dumps({
+            "type": "chat_message",
+            "data": event["data"],
+        }))
 
-    @staticmethod
-    async def _auto_expire_after_delay(session_id: str):
-        """
-        Wait AUTO_EXPIRE_DELAY seconds, then check if the room is still
-        empty. If so, end the session automatically.
-        """
-        try:
-            await asyncio.sleep(AUTO_EXPIRE_DELAY)
-        except asyncio.CancelledError:
-            # Timer was cancelled because someone rejoined
-            return
+    async def session_started(self, event):
+        self.chat_open = True
+        await self.send(text_data=json.dumps({"type": "session_started"}))
 
-        # Remove ourselves from the pending-tasks map
-        _expire_tasks.pop(session_id, None)
+    async def session_ended(self, event):
+        self.chat_open = False
+        await self.send(text_data=json.dumps({"type": "session_ended"}))
 
-        # Check DB and end if still empty
-        ended = await PrivateSessionChatConsumer._try_auto_end(session_id)
-        if ended:
-            logger.info(
-                "Session %s auto-expired after %ds with no participants",
-                session_id,
-                AUTO_EXPIRE_DELAY,
-            )
+    async def _send_error(self, error, client_id=None):
+        await self.send(text_data=json.dumps({
+            "type": "error",
+            "client_id": client_id,
+            "error": error,
+        }))
 
-    @staticmethod
     @database_sync_to_async
-    def _try_auto_end(session_id: str) -> bool:
+    def _load_sender(self):
         """
-        If the session is still ongoing AND all_left_at is set (meaning
-        nobody reconnected), end it. Returns True if ended.
+        Sender details if the connecting user belongs to this session,
+        else None.
         """
         from .models import PrivateSession
+        from .serializers import get_user_name
+
+        user = self.scope.get("user")
+        if user is None or not user.is_authenticated:
+            return None
 
         try:
-            session = PrivateSession.objects.get(pk=session_id)
-        except PrivateSession.DoesNotExist:
-            return False
-
-        # Only auto-end if still ongoing and still empty
-        if session.status != "ongoing":
-            return False
-        if session.all_left_at is None:
-            return False  # someone reconnected
-        if session.active_connections > 0:
-            return False  # someone is still here
-
-        # Use the shared helper from views
-        from .views import _end_session_internal
-        return _end_session_internal(session, reason="auto_expired_all_left")
+            session = (
+                PrivateSession.objects
+                .only("id", "teacher_id", "requested_by_id", "status")
+                .get(pk=self.session_id)
+            )
+        except (PrivateSession.DoesNotExist, ValidationError, ValueError):
+            return None
+
+        is_teacher = session.teacher_id == user.id
+        if not (
+            is_teacher
+            or session.requested_by_id == user.id
+            or session.participants.filter(user=user).exists()
+        ):
+            return None
+
+        return {
+            "session_pk": session.pk,
+            "id": user.id,
+            "name": get_user_name(user),
+            "role": "teacher" if is_teacher else "student",
+            "chat_open": session.status == "ongoing",
+        }
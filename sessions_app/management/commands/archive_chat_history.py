@@ -0,0 +1,46 @@
+"""
+Compact the chat of finished private sessions into one compressed
+ChatArchive row per session and delete their ChatMessage rows, keeping
+the hot chat table down to sessions that are still running. History
+stays readable through the chat endpoint.
+
+Usage:
+    python manage.py archive_chat_history [--batch 100]
+
+Run via cron every few minutes on the server, e.g.:
+    */5 * * * * cd /path/to/project && python manage.py archive_chat_history
+"""
+
+from django.core.management.base import BaseCommand
+
+from sessions_app.services.chat_history import archive_session, sessions_to_archive
+
+
+class Command(BaseCommand):
+    help = "Archive the chat history of finished private sessions."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch", type=int, default=100,
+            help="Sessions to look up per query.",
+        )
+
+    def handle(self, *args, **options):
+        sessions = messages = 0
+
+        while True:
+            session_ids = sessions_to_archive(limit=options["batch"])
+            if not session_ids:
+                break
+            for session_id in session_ids:
+                archived = archive_session(session_id)
+                if archived:
+                    sessions += 1
+                    messages += archived
+
+        if sessions:
+            self.stdout.write(
+                self.style.SUCCESS(f"Archived {messages} message(s) from {sessions} session(s).")
+            )
+        else:
+            self.stdout.write("No chats to archive.")
@@ -0,0 +1,32 @@
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("sessions_app", "0002_privatesession_active_connections_privatesession_all_left_at"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="chatmessage",
+            name="client_id",
+            field=models.CharField(blank=True, max_length=64, null=True),
+        ),
+        migrations.AlterField(
+            model_name="chatmessage",
+            name="created_at",
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AddConstraint(
+            model_name="chatmessage",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(client_id__isnull=False),
+                fields=("session", "sender", "client_id"),
+                name="uniq_chat_client_id",
+            ),
+        ),
+    ]
@@ -0,0 +1,20 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    """Connection tracking moved to Redis (sessions_app.services.presence)."""
+
+    dependencies = [
+        ("sessions_app", "0003_chatmessage_client_id"),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name="privatesession",
+            name="active_connections",
+        ),
+        migrations.RemoveField(
+            model_name="privatesession",
+            name="all_left_at",
+        ),
+    ]
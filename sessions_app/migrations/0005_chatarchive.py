@@ -0,0 +1,30 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("sessions_app", "0004_remove_privatesession_connection_tracking"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ChatArchive",
+            fields=[
+                (
+                    "session",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="chat_archive",
+                        serialize=False,
+                        to="sessions_app.privatesession",
+                    ),
+                ),
+                ("message_count", models.PositiveIntegerField(default=0)),
+                ("data", models.BinaryField()),
+                ("archived_at", models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,82 @@
+from django.db import migrations, models
+
+
+def _search_text(subject, *users):
+    # Frozen copy of sessions_app.services.listing.build_search_text
+    parts = [subject or ""]
+    for user in users:
+        if user is None:
+            continue
+        profile = getattr(user, "profile", None)
+        parts += [
+            getattr(profile, "full_name", None) or "",
+            f"{user.first_name} {user.last_name}".strip(),
+            user.username,
+        ]
+    return " ".join(part for part in parts if part).lower()
+
+
+def backfill_search_text(apps, schema_editor):
+    PrivateSession = apps.get_model("sessions_app", "PrivateSession")
+    batch = []
+    sessions = PrivateSession.objects.select_related(
+        "teacher__profile", "requested_by__profile"
+    )
+    for session in sessions.iterator(chunk_size=1000):
+        session.search_text = _search_text(
+            session.subject, session.teacher, session.requested_by
+        )
+        batch.append(session)
+        if len(batch) >= 1000:
+            PrivateSession.objects.bulk_update(batch, ["search_text"])
+            batch = []
+    PrivateSession.objects.bulk_update(batch, ["search_text"])
+
+
+def create_trigram_index(apps, schema_editor):
+    # Trigram GIN only exists on PostgreSQL; elsewhere search is a plain scan
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    schema_editor.execute(
+        "CREATE INDEX IF NOT EXISTS sessions_ap_search_trgm "
+        "ON sessions_app_privatesession USING GIN (search_text gin_trgm_ops)"
+    )
+
+
+def drop_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute("DROP INDEX IF EXISTS sessions_ap_search_trgm")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("sessions_app", "0005_chatarchive"),
+        ("accounts", "0005_migrate_fullname_data"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="privatesession",
+            name="search_text",
+            field=models.TextField(blank=True, default="", editable=False),
+        ),
+        migrations.AddIndex(
+            model_name="privatesession",
+            index=models.Index(
+                fields=["teacher", "scheduled_date", "scheduled_time", "id"],
+                name="sessions_ap_teacher_slot_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="privatesession",
+            index=models.Index(
+                fields=["requested_by", "scheduled_date", "scheduled_time", "id"],
+                name="sessions_ap_request_slot_idx",
+            ),
+        ),
+        migrations.RunPython(backfill_search_text, migrations.RunPython.noop),
+        migrations.RunPython(create_trigram_index, drop_trigram_index),
+    ]
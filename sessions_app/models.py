@@ -1,6 +1,10 @@
+import json
 import uuid
+import zlib
+
 from django.conf import settings
 from django.db import models
+from django.utils import timezone
 
 
 class PrivateSession(models.Model):
@@ -72,11 +76,9 @@ class PrivateSession(models.Model):
     started_at = models.DateTimeField(null=True, blank=True)
     ended_at = models.DateTimeField(null=True, blank=True)
 
-    # --- Auto-expire tracking ---
-    # Number of active WebSocket connections in this room
-    active_connections = models.IntegerField(default=0)
-    # When the last participant left (null = someone is still connected)
-    all_left_at = models.DateTimeField(null=True, blank=True)
+    # --- Listing search (see services.listing) ---
+    # Lower-cased subject + teacher / student names, set by sessions_app.signals
+    search_text = models.TextField(blank=True, default="", editable=False)
 
     class Meta:
         ordering = ["-created_at"]
@@ -85,6 +87,15 @@ class PrivateSession(models.Model):
             models.Index(fields=["requested_by", "status"]),
             models.Index(fields=["status"]),
             models.Index(fields=["scheduled_date"]),
+            # Keyset pagination of the listing tabs
+            models.Index(
+                fields=["teacher", "scheduled_date", "scheduled_time", "id"],
+                name="sessions_ap_teacher_slot_idx",
+            ),
+            models.Index(
+                fields=["requested_by", "scheduled_date", "scheduled_time", "id"],
+                name="sessions_ap_request_slot_idx",
+            ),
         ]
 
     def __str__(self):
@@ -164,13 +175,52 @@ class ChatMessage(models.Model):
     sender_name = models.CharField(max_length=255)
     sender_role = models.CharField(max_length=20, default="student")  # "teacher" or "student"
     message = models.TextField()
-    created_at = models.DateTimeField(auto_now_add=True)
+    # Set by the sender's client; resends with the same id are dropped
+    client_id = models.CharField(max_length=64, null=True, blank=True)
+    # Assigned when the message is received, not when its batch is written
+    created_at = models.DateTimeField(default=timezone.now)
 
     class Meta:
         ordering = ["created_at"]
         indexes = [
             models.Index(fields=["session", "created_at"]),
         ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["session", "sender", "client_id"],
+                condition=models.Q(client_id__isnull=False),
+                name="uniq_chat_client_id",
+            ),
+        ]
+
+    def __str__(self):
+        return f"Chat in {self.session.id} by {self.sender_name} at {self.created_at}"
+
+
+class ChatArchive(models.Model):
+    """
+    A finished session's chat compacted into one zlib-compressed JSON
+    array (ChatMessageSerializer rows, oldest first). Written by
+    ``manage.py archive_chat_history``, which then drops the session's
+    ChatMessage rows.
+    """
+
+    session = models.OneToOneField(
+        PrivateSession,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="chat_archive",
+    )
+    message_count = models.PositiveIntegerField(default=0)
+    data = models.BinaryField()
+    archived_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
-        return f"Chat in {self.session.id} by {self.sender_name} at {self.created_at}"
\ No newline at end of file
+        return f"Chat archive for {self.session_id} ({self.message_count} messages)"
+
+    @staticmethod
+    def pack(rows):
+        return zlib.compress(json.dumps(rows, separators=(",", ":")).encode())
+
+    def messages(self):
+        return json.loads(zlib.decompress(bytes(self.data)))
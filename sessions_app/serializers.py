@@ -28,13 +28,17 @@ def get_student_id(user):
     return None
 
 
-def calculate_duration_minutes(obj):
-    if obj.started_at and obj.ended_at:
-        delta = obj.ended_at - obj.started_at
+def minutes_between(started_at, ended_at):
+    if started_at and ended_at:
+        delta = ended_at - started_at
         return max(1, round(delta.total_seconds() / 60))
     return None
 
 
+def calculate_duration_minutes(obj):
+    return minutes_between(obj.started_at, obj.ended_at)
+
+
 # ---------------------------------------------------------------------------
 # Participant serializer
 # ---------------------------------------------------------------------------
@@ -63,53 +67,29 @@ class ParticipantSerializer(serializers.ModelSerializer):
 # List serializer
 # ---------------------------------------------------------------------------
 
-class SessionListSerializer(serializers.ModelSerializer):
-    teacher_name = serializers.SerializerMethodField()
-    student_name = serializers.SerializerMethodField()
-    student_id = serializers.SerializerMethodField()
-    teacher_id = serializers.SerializerMethodField()
-    requested_by_id = serializers.SerializerMethodField()
-    actual_duration_minutes = serializers.SerializerMethodField()
+class SessionListSerializer(serializers.Serializer):
+    """Rows from services.listing (``values()`` dicts, names already resolved)."""
 
-    class Meta:
-        model = PrivateSession
-        fields = [
-            "id",
-            "subject",
-            "status",
-            "session_type",
-            "group_strength",
-            "scheduled_date",
-            "scheduled_time",
-            "duration_minutes",
-            "started_at",
-            "ended_at",
-            "actual_duration_minutes",
-            "teacher_name",
-            "teacher_id",
-            "student_name",
-            "student_id",
-            "requested_by_id",
-            "created_at",
-        ]
-
-    def get_teacher_name(self, obj):
-        return get_user_name(obj.teacher)
-
-    def get_student_name(self, obj):
-        return get_user_name(obj.requested_by)
-
-    def get_student_id(self, obj):
-        return get_student_id(obj.requested_by)
-
-    def get_teacher_id(self, obj):
-        return str(obj.teacher_id) if obj.teacher_id else None
-
-    def get_requested_by_id(self, obj):
-        return str(obj.requested_by_id) if obj.requested_by_id else None
+    id = serializers.UUIDField()
+    subject = serializers.CharField()
+    status = serializers.CharField()
+    session_type = serializers.CharField()
+    group_strength = serializers.IntegerField()
+    scheduled_date = serializers.DateField()
+    scheduled_time = serializers.TimeField()
+    duration_minutes = serializers.IntegerField()
+    started_at = serializers.DateTimeField()
+    ended_at = serializers.DateTimeField()
+    actual_duration_minutes = serializers.SerializerMethodField()
+    teacher_name = serializers.CharField()
+    teacher_id = serializers.CharField()
+    student_name = serializers.CharField()
+    student_id = serializers.CharField()
+    requested_by_id = serializers.CharField()
+    created_at = serializers.DateTimeField()
 
-    def get_actual_duration_minutes(self, obj):
-        return calculate_duration_minutes(obj)
+    def get_actual_duration_minutes(self, row):
+        return minutes_between(row["started_at"], row["ended_at"])
 
 
 # ---------------------------------------------------------------------------
@@ -180,11 +160,11 @@ class PrivateSessionSerializer(serializers.ModelSerializer):
 # ---------------------------------------------------------------------------
 
 class ChatMessageSerializer(serializers.ModelSerializer):
-    sender_id = serializers.CharField(source="sender.id", read_only=True)
+    sender_id = serializers.CharField(read_only=True)
 
     class Meta:
         model = ChatMessage
-        fields = ["id", "sender_id", "sender_name",
+        fields = ["id", "client_id", "sender_id", "sender_name",
                   "sender_role", "message", "created_at"]
         read_only_fields = ["id", "sender_id",
                             "sender_name", "sender_role", "created_at"]
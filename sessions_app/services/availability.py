@@ -0,0 +1,291 @@
+"""
+Teacher availability.
+
+A teacher's committed time is every approved / ongoing private session,
+the proposed slot of a session awaiting reconfirmation, and every live
+class they created that has not finished or been cancelled. For each day
+those intervals are loaded once (two queries) into a DayIndex:
+
+    {teacher_id: (starts, prefix_max_ends, intervals)}
+
+with the intervals sorted by start. "Does [start, end) clash with
+anything" is then one bisect on ``starts`` plus a look at the running
+maximum end, O(log n) per teacher, and free-slot search walks the sorted
+intervals once.
+
+The index serves reads (teacher filters, free slots) and may lag a write
+by a moment. Bookings go through ``check_slot()`` instead, which re-reads
+the teacher's commitments from the database under a row lock.
+
+Day indexes are cached (per process and in the shared cache) under an
+availability version; sessions_app.signals bumps the version on commit
+whenever a PrivateSession or LiveSession is saved or deleted. Writes that
+skip signals (the live status flush's bulk_update, admin bulk actions)
+only free time up, and are picked up within AVAILABILITY_CACHE_TIMEOUT:
+the shared entry expires after it, and so does each process's copy.
+"""
+import time
+from bisect import bisect_left
+from datetime import datetime, timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from livestream.models import LiveSession
+from sessions_app.models import PrivateSession
+
+
+AVAILABILITY_CACHE_TIMEOUT = 60 * 10  # seconds
+AVAILABILITY_VERSION_KEY = "sessions:availability:version"
+
+COMMITTED_STATUSES = ["approved", "ongoing"]
+LIVE_ENDED_STATUSES = [LiveSession.STATUS_COMPLETED, LiveSession.STATUS_CANCELLED]
+
+# Bookable hours for free-slot search (local time)
+BOOKING_DAY_START = 8  # hour
+BOOKING_DAY_END = 22  # hour
+
+# (version, {date: (built_at, DayIndex)}) for this process; replaced, never
+# mutated. Entries older than AVAILABILITY_CACHE_TIMEOUT are rebuilt.
+_memory = {}
+
+
+class SlotConflict(Exception):
+    pass
+
+
+def _day_key(version, day):
+    return f"sessions:availability:{version}:{day.isoformat()}"
+
+
+def _local(day, at):
+    return timezone.make_aware(datetime.combine(day, at))
+
+
+def _day_bounds(day):
+    start = timezone.make_aware(datetime.combine(day, datetime.min.time()))
+    return start, timezone.make_aware(
+        datetime.combine(day + timedelta(days=1), datetime.min.time())
+    )
+
+
+# =========================
+# VERSION
+# =========================
+def get_availability_version():
+    version = cache.get(AVAILABILITY_VERSION_KEY)
+    if version is None:
+        cache.add(AVAILABILITY_VERSION_KEY, time.time_ns(), None)
+        version = cache.get(AVAILABILITY_VERSION_KEY)
+    return version
+
+
+def bump_availability_version():
+    transaction.on_commit(
+        lambda: cache.set(AVAILABILITY_VERSION_KEY, time.time_ns(), None)
+    )
+
+
+# =========================
+# INDEX
+# =========================
+class DayIndex:
+    def __init__(self, intervals_by_teacher):
+        # teacher_id → (starts, prefix max of ends, [(start, end, key)])
+        self._teachers = {}
+        for teacher_id, intervals in intervals_by_teacher.items():
+            intervals = sorted(intervals)
+            running, prefix_max = 0, []
+            for _, end, _ in intervals:
+                running = max(running, end)
+                prefix_max.append(running)
+            self._teachers[teacher_id] = (
+                [start for start, _, _ in intervals], prefix_max, intervals,
+            )
+
+    def conflicts(self, teacher_id, start, end, exclude=None):
+        """
+        Whether ``teacher_id`` has anything overlapping [start, end)
+        (epoch seconds), ignoring the interval keyed ``exclude``.
+        """
+        entry = self._teachers.get(str(teacher_id))
+        if entry is None:
+            return False
+        starts, prefix_max, intervals = entry
+
+        # Intervals [0, k) start before ``end``; one of them overlaps iff
+        # the latest end among them is after ``start``
+        k = bisect_left(starts, end)
+        if k == 0 or prefix_max[k - 1] <= start:
+            return False
+        if exclude is None:
+            return True
+        return any(
+            e > start and key != exclude for _, e, key in intervals[:k]
+        )
+
+    def busy(self, teacher_id, start, end):
+        """Merged busy stretches of ``teacher_id`` clipped to [start, end)."""
+        entry = self._teachers.get(str(teacher_id))
+        if entry is None:
+            return []
+        starts, _, intervals = entry
+
+        merged = []
+        for s, e, _ in intervals[:bisect_left(starts, end)]:
+            if e <= start:
+                continue
+            s, e = max(s, start), min(e, end)
+            if merged and s <= merged[-1][1]:
+                merged[-1][1] = max(merged[-1][1], e)
+            else:
+                merged.append([s, e])
+        return merged
+
+
+def _commitments(start, end, teacher_id=None):
+    """(teacher_id, start, end, key) of every commitment overlapping [start, end)."""
+    # Sessions from the previous day may run past midnight
+    window = (
+        timezone.localtime(start).date() - timedelta(days=1),
+        timezone.localtime(end).date(),
+    )
+    private = PrivateSession.objects.filter(
+        Q(status__in=COMMITTED_STATUSES, scheduled_date__range=window)
+        | Q(status="needs_reconfirmation", rescheduled_date__range=window)
+    )
+    live = LiveSession.objects.filter(
+        created_by__isnull=False,
+        start_time__lt=end,
+        end_time__gt=start,
+    ).exclude(status__in=LIVE_ENDED_STATUSES)
+    if teacher_id is not None:
+        private = private.filter(teacher_id=teacher_id)
+        live = live.filter(created_by_id=teacher_id)
+
+    rows = private.values(
+        "id", "teacher_id", "status", "duration_minutes",
+        "scheduled_date", "scheduled_time", "rescheduled_date", "rescheduled_time",
+    )
+    for row in rows:
+        if row["status"] == "needs_reconfirmation":
+            # The teacher's proposed slot is the one being held
+            s = _local(row["rescheduled_date"], row["rescheduled_time"])
+        else:
+            s = _local(row["scheduled_date"], row["scheduled_time"])
+        e = s + timedelta(minutes=row["duration_minutes"])
+        if s < end and e > start:
+            yield row["teacher_id"], s, e, f"private:{row['id']}"
+
+    for row in live.values("id", "created_by_id", "start_time", "end_time"):
+        yield row["created_by_id"], row["start_time"], row["end_time"], f"live:{row['id']}"
+
+
+def build_day_index(day):
+    intervals = {}
+    for teacher_id, start, end, key in _commitments(*_day_bounds(day)):
+        intervals.setdefault(str(teacher_id), []).append(
+            (start.timestamp(), end.timestamp(), key)
+        )
+    return DayIndex(intervals)
+
+
+def get_day_index(day):
+    version = get_availability_version()
+
+    now = time.monotonic()
+
+    current = _memory.get("days")
+    days = current[1] if current and current[0] == version else {}
+    if day in days and now - days[day][0] < AVAILABILITY_CACHE_TIMEOUT:
+        return days[day][1]
+
+    index = cache.get(_day_key(version, day))
+    if index is None:
+        index = build_day_index(day)
+        cache.set(_day_key(version, day), index, AVAILABILITY_CACHE_TIMEOUT)
+
+    _memory["days"] = (version, {**days, day: (now, index)})
+    return index
+
+
+# =========================
+# QUERIES
+# =========================
+def _days_between(start, end):
+    day = timezone.localtime(start).date()
+    last = timezone.localtime(end - timedelta(microseconds=1)).date()
+    while day <= last:
+        yield day
+        day += timedelta(days=1)
+
+
+def is_free(teacher_id, start, end, exclude=None):
+    """Whether the teacher has nothing committed in [start, end)."""
+    s, e = start.timestamp(), end.timestamp()
+    return not any(
+        get_day_index(day).conflicts(teacher_id, s, e, exclude)
+        for day in _days_between(start, end)
+    )
+
+
+def free_teachers(teacher_ids, start, end):
+    return [teacher_id for teacher_id in teacher_ids if is_free(teacher_id, start, end)]
+
+
+def check_slot(teacher_id, day, at, duration_minutes, session=None):
+    """
+    Raise SlotConflict if the slot clashes with the teacher's commitments.
+
+    Reads the database, not the cached index, after locking the teacher's
+    user row, so concurrent bookings of one teacher run one at a time. Call
+    it inside the transaction that writes the booking.
+    """
+    start = _local(day, at)
+    end = start + timedelta(minutes=duration_minutes)
+    exclude = f"private:{session.pk}" if session is not None else None
+
+    list(
+        get_user_model().objects.select_for_update()
+        .filter(pk=teacher_id).values_list("pk", flat=True)
+    )
+    for _, _, _, key in _commitments(start, end, teacher_id):
+        if key != exclude:
+            raise SlotConflict("The teacher already has a session at this time.")
+
+
+def free_slots(teacher_ids, day, duration_minutes, step_minutes=30, now=None):
+    """
+    {teacher_id: ["HH:MM", ...]} start times on ``day`` (within booking
+    hours, not in the past) where ``duration_minutes`` fits.
+    """
+    now = (now or timezone.now()).timestamp()
+    window_start = _local(day, datetime.min.time()) + timedelta(hours=BOOKING_DAY_START)
+    window_end = _local(day, datetime.min.time()) + timedelta(hours=BOOKING_DAY_END)
+    lo, hi = window_start.timestamp(), window_end.timestamp()
+    length, step = duration_minutes * 60, step_minutes * 60
+
+    index = get_day_index(day)
+
+    slots = {}
+    for teacher_id in teacher_ids:
+        busy = index.busy(teacher_id, lo, hi)
+        free, t, i = [], lo, 0
+        while t + length <= hi:
+            # Skip busy stretches that ended before this candidate
+            while i < len(busy) and busy[i][1] <= t:
+                i += 1
+            if i < len(busy) and busy[i][0] < t + length:
+                # Clash: jump to the first step after the stretch ends
+                t = lo + -(-(busy[i][1] - lo) // step) * step
+                continue
+            if t >= now:
+                free.append(timezone.localtime(
+                    datetime.fromtimestamp(t, tz=timezone.get_current_timezone())
+                ).strftime("%H:%M"))
+            t += step
+        slots[str(teacher_id)] = free
+    return slots
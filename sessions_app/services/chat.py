@@ -0,0 +1,86 @@
+"""
+Private-session chat persistence.
+
+The chat consumer broadcasts a message as soon as it arrives and hands it
+to ``writer``, which writes messages in micro-batches: one bulk INSERT
+per CHAT_BATCH_SIZE messages or CHAT_BATCH_WINDOW seconds, whichever
+comes first. Messages carry the sender's ``client_id``; a resend of an
+already stored id is dropped by the unique constraint (ignore_conflicts),
+so a batch that failed can simply be written again.
+
+A message is authorized when the consumer accepts it, and what was
+broadcast is stored even if the session ended before the batch landed;
+archival waits CHAT_ARCHIVE_GRACE after the end for those last writes.
+"""
+import asyncio
+import logging
+
+from channels.db import database_sync_to_async
+
+from sessions_app.models import ChatMessage, PrivateSession
+
+logger = logging.getLogger(__name__)
+
+CHAT_BATCH_SIZE = 100
+CHAT_BATCH_WINDOW = 0.05  # seconds
+CHAT_RETRY_DELAY = 1  # seconds
+# Stop re-queueing failed batches past this many pending messages
+CHAT_MAX_PENDING = 10_000
+# How long after a session ends its last batches may still arrive
+CHAT_ARCHIVE_GRACE = 5 * 60  # seconds
+
+
+def chat_group_name(session_id):
+    return f"private_session_chat_{session_id}"
+
+
+def persist_messages(messages):
+    """
+    Bulk insert ``messages`` (already authorized and broadcast); only rows
+    of sessions that have since been deleted are skipped.
+    """
+    existing = set(
+        PrivateSession.objects
+        .filter(pk__in={m.session_id for m in messages})
+        .values_list("pk", flat=True)
+    )
+    ChatMessage.objects.bulk_create(
+        [m for m in messages if m.session_id in existing],
+        ignore_conflicts=True,
+    )
+
+
+class ChatWriter:
+    def __init__(self, batch_size=CHAT_BATCH_SIZE, window=CHAT_BATCH_WINDOW):
+        self.batch_size = batch_size
+        self.window = window
+        self._pending = []
+        self._timer = None
+
+    def submit(self, message):
+        """Queue an unsaved ChatMessage. Must be called from the event loop."""
+        self._pending.append(message)
+        if len(self._pending) >= self.batch_size:
+            asyncio.ensure_future(self.flush())
+        elif self._timer is None or self._timer.done():
+            self._timer = asyncio.ensure_future(self._flush_later(self.window))
+
+    async def _flush_later(self, delay):
+        await asyncio.sleep(delay)
+        await self.flush()
+
+    async def flush(self):
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+
+        try:
+            await database_sync_to_async(persist_messages)(batch)
+        except Exception:
+            logger.exception("Failed to persist %d chat messages", len(batch))
+            if len(self._pending) + len(batch) <= CHAT_MAX_PENDING:
+                self._pending[:0] = batch
+                self._timer = asyncio.ensure_future(self._flush_later(CHAT_RETRY_DELAY))
+
+
+writer = ChatWriter()
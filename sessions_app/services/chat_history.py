@@ -0,0 +1,116 @@
+"""
+Private-session chat history.
+
+History is read newest first in pages, walking back with ``?before=``
+cursors over the (session, created_at) index while the session is live.
+Once a session has finished (and CHAT_ARCHIVE_GRACE has passed, so the
+chat writer's last batches are in), ``archive_session()`` (run by ``manage.py
+archive_chat_history``) compacts its messages into one ChatArchive blob
+and deletes the rows, so ChatMessage only holds chats that may still
+change. Archived history is paged the same way, with the same cursors.
+"""
+import uuid
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from config.pagination import KeysetPage, KeysetPaginator
+from sessions_app.models import ChatArchive, ChatMessage, PrivateSession
+from sessions_app.services.chat import CHAT_ARCHIVE_GRACE
+from sessions_app.serializers import ChatMessageSerializer
+
+
+HISTORY_ORDERING = ["-created_at", "-id"]
+
+
+class ChatHistoryPaginator(KeysetPaginator):
+    cursor_param = "before"
+
+    def __init__(self):
+        super().__init__(ordering=HISTORY_ORDERING, page_size=50, max_page_size=200)
+
+    def paginate_archive(self, rows, request):
+        """Page archived rows (serialized dicts) exactly like paginate()."""
+        page_size = self.get_page_size(request)
+        cursor = request.query_params.get(self.cursor_param)
+
+        def key(row):
+            return parse_datetime(row["created_at"]), uuid.UUID(row["id"])
+
+        rows = sorted(rows, key=key, reverse=True)
+        if cursor:
+            values, _ = self.decode_cursor(cursor, ChatMessage)
+            rows = [row for row in rows if key(row) < tuple(values)]
+
+        items = rows[:page_size]
+        next_cursor = None
+        if len(rows) > page_size:
+            created_at, pk = key(items[-1])
+            next_cursor = self.encode_cursor({"created_at": created_at, "id": pk})
+
+        return KeysetPage(items=items, next_cursor=next_cursor, previous_cursor=None)
+
+
+def history_page(session, request):
+    """(rows, paginator, page) for a session, newest first."""
+    paginator = ChatHistoryPaginator()
+    archive = ChatArchive.objects.filter(session=session).first()
+    if archive is not None:
+        page = paginator.paginate_archive(archive.messages(), request)
+        return page.items, paginator, page
+
+    page = paginator.paginate(ChatMessage.objects.filter(session=session), request)
+    return ChatMessageSerializer(page.items, many=True).data, paginator, page
+
+
+# =========================
+# ARCHIVAL
+# =========================
+def sessions_to_archive(limit=100, now=None):
+    """
+    Finished sessions that still have rows in ChatMessage, once the chat
+    writer's last batches for them have had CHAT_ARCHIVE_GRACE to land.
+    """
+    settled = (now or timezone.now()) - timedelta(seconds=CHAT_ARCHIVE_GRACE)
+    return list(
+        PrivateSession.objects
+        .exclude(status="ongoing")
+        .exclude(ended_at__gt=settled)
+        .filter(Exists(ChatMessage.objects.filter(session=OuterRef("pk"))))
+        .values_list("pk", flat=True)[:limit]
+    )
+
+
+def archive_session(session_id):
+    """Move a finished session's messages into its ChatArchive. Returns how many."""
+    with transaction.atomic():
+        session = (
+            PrivateSession.objects
+            .select_for_update()
+            .filter(pk=session_id)
+            .exclude(status="ongoing")
+            .first()
+        )
+        if session is None:
+            return 0
+
+        messages = list(
+            ChatMessage.objects.filter(session=session).order_by("created_at", "id")
+        )
+        if not messages:
+            return 0
+
+        archive = ChatArchive.objects.filter(session=session).first()
+        rows = archive.messages() if archive else []
+        rows += ChatMessageSerializer(messages, many=True).data
+
+        ChatArchive.objects.update_or_create(
+            session=session,
+            defaults={"data": ChatArchive.pack(rows), "message_count": len(rows)},
+        )
+        ChatMessage.objects.filter(pk__in=[m.pk for m in messages]).delete()
+
+    return len(messages)
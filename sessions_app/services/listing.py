@@ -0,0 +1,127 @@
+"""
+Private-session listings (student and teacher tabs).
+
+Every tab is one ``values()`` query: the teacher / student display names
+and student id are resolved in SQL with the same fallbacks as
+serializers.get_user_name, and rows are keyset-paginated on
+(scheduled_date, scheduled_time, id), so a page costs the same however
+long the history is.
+
+Search matches ``PrivateSession.search_text``: the lower-cased subject
+and both parties' names and usernames, kept up to date by
+sessions_app.signals. On PostgreSQL it sits behind a trigram GIN index,
+so the substring match needs no joins and no DISTINCT.
+"""
+from django.contrib.auth import get_user_model
+from django.db.models import Exists, F, OuterRef, Q, Value
+from django.db.models.functions import Coalesce, Concat, NullIf, Trim
+
+from sessions_app.models import PrivateSession, SessionParticipant
+
+
+SCHEDULED_STATUSES = ["approved", "ongoing", "needs_reconfirmation"]
+HISTORY_STATUSES = [
+    "completed", "cancelled", "declined", "expired",
+    "withdrawn", "teacher_no_show", "student_no_show",
+]
+
+UPCOMING_ORDERING = ["scheduled_date", "scheduled_time", "id"]
+HISTORY_ORDERING = ["-scheduled_date", "-scheduled_time", "-id"]
+
+LISTING_FIELDS = [
+    "id", "subject", "status", "session_type", "group_strength",
+    "scheduled_date", "scheduled_time", "duration_minutes",
+    "started_at", "ended_at", "created_at", "teacher_id", "requested_by_id",
+    "teacher_name", "student_name", "student_id",
+]
+
+
+def _display_name(user):
+    """SQL version of serializers.get_user_name for the ``user`` relation."""
+    return Coalesce(
+        NullIf(f"{user}__profile__full_name", Value("")),
+        NullIf(
+            Trim(Concat(f"{user}__first_name", Value(" "), f"{user}__last_name")),
+            Value(""),
+        ),
+        f"{user}__username",
+    )
+
+
+def build_search_text(subject, *users):
+    """The PrivateSession.search_text value; ``users`` with profile loaded."""
+    parts = [subject or ""]
+    for user in users:
+        if user is None:
+            continue
+        profile = getattr(user, "profile", None)
+        parts += [
+            getattr(profile, "full_name", None) or "",
+            f"{user.first_name} {user.last_name}".strip(),
+            user.username,
+        ]
+    return " ".join(part for part in parts if part).lower()
+
+
+def compute_search_text(session):
+    users = get_user_model().objects.select_related("profile").in_bulk(
+        [session.teacher_id, session.requested_by_id]
+    )
+    return build_search_text(
+        session.subject,
+        users.get(session.teacher_id),
+        users.get(session.requested_by_id),
+    )
+
+
+def listing_queryset(queryset, statuses, search=""):
+    queryset = queryset.filter(status__in=statuses)
+    if search:
+        queryset = queryset.filter(search_text__contains=search.lower())
+
+    return queryset.annotate(
+        teacher_name=_display_name("teacher"),
+        student_name=_display_name("requested_by"),
+        student_id=F("requested_by__profile__student_id"),
+    ).values(*LISTING_FIELDS)
+
+
+def student_listing(user, statuses, search=""):
+    """Sessions ``user`` requested or takes part in (group sessions)."""
+    return listing_queryset(
+        PrivateSession.objects.filter(
+            Q(requested_by=user)
+            | Exists(SessionParticipant.objects.filter(session=OuterRef("pk"), user=user))
+        ),
+        statuses,
+        search,
+    )
+
+
+def teacher_listing(user, statuses, search=""):
+    return listing_queryset(
+        PrivateSession.objects.filter(teacher=user), statuses, search
+    )
+
+
+def refresh_search_text(user_id):
+    """Recompute search_text on every session ``user_id`` is a party to."""
+    sessions = (
+        PrivateSession.objects
+        .filter(Q(teacher_id=user_id) | Q(requested_by_id=user_id))
+        .select_related("teacher__profile", "requested_by__profile")
+        .only(
+            "id", "subject",
+            "teacher__username", "teacher__first_name", "teacher__last_name",
+            "teacher__profile__full_name",
+            "requested_by__username", "requested_by__first_name",
+            "requested_by__last_name", "requested_by__profile__full_name",
+        )
+    )
+    batch = []
+    for session in sessions:
+        session.search_text = build_search_text(
+            session.subject, session.teacher, session.requested_by
+        )
+        batch.append(session)
+    PrivateSession.objects.bulk_update(batch, ["search_text"], batch_size=500)
@@ -0,0 +1,162 @@
+"""
+Private-session presence.
+
+Who is connected to a private session's chat lives in Redis (the live
+session state client), not in PrivateSession rows, so connecting and
+disconnecting cost no Postgres writes and every worker sees the same
+rooms.
+
+Keys:
+    presence:private:{id}        zset   channel name → heartbeat deadline
+    presence:private:deadlines   zset   session id → when to check it for expiry
+
+A connection counts while its deadline is in the future. Each worker
+re-heartbeats its own connections every HEARTBEAT_INTERVAL (see
+consumers.py), so the connections of a worker that died lapse after
+PRESENCE_TTL. A session becomes due AUTO_EXPIRE_DELAY after its room
+emptied, or after its last heartbeat lapsed.
+
+``expire_due()`` claims due sessions with ZREM, so however many workers
+sweep, each session is handled once. ``manage.py
+cleanup_expired_sessions`` runs the same sweep as a fallback.
+"""
+import logging
+
+import redis
+from django.utils import timezone
+
+from livestream.services import session_state
+
+logger = logging.getLogger(__name__)
+
+PRESENCE_TTL = 90  # seconds
+HEARTBEAT_INTERVAL = 30  # seconds
+# How long to wait after everyone leaves before auto-ending the session
+AUTO_EXPIRE_DELAY = 5 * 60  # seconds
+
+DEADLINES_KEY = "presence:private:deadlines"
+
+
+def _room_key(session_id):
+    return f"presence:private:{session_id}"
+
+
+def _ts(now):
+    return (now or timezone.now()).timestamp()
+
+
+# =========================
+# CONNECTIONS
+# =========================
+def join(session_id, connection, now=None):
+    now = _ts(now)
+    key = _room_key(session_id)
+
+    with session_state.redis_client().pipeline() as pipe:
+        pipe.zadd(key, {connection: now + PRESENCE_TTL})
+        pipe.expire(key, PRESENCE_TTL + AUTO_EXPIRE_DELAY)
+        # Pushes back an expiry scheduled when the room last emptied
+        pipe.zadd(
+            DEADLINES_KEY,
+            {str(session_id): now + PRESENCE_TTL + AUTO_EXPIRE_DELAY},
+            gt=True,
+        )
+        pipe.execute()
+
+
+def heartbeat(connections, now=None):
+    """``connections``: {session_id: channel names} held by this worker."""
+    if not connections:
+        return
+    now = _ts(now)
+
+    with session_state.redis_client().pipeline() as pipe:
+        for session_id, names in connections.items():
+            key = _room_key(session_id)
+            pipe.zadd(key, {name: now + PRESENCE_TTL for name in names})
+            pipe.expire(key, PRESENCE_TTL + AUTO_EXPIRE_DELAY)
+            pipe.zadd(
+                DEADLINES_KEY,
+                {str(session_id): now + PRESENCE_TTL + AUTO_EXPIRE_DELAY},
+                gt=True,
+            )
+        pipe.execute()
+
+
+def leave(session_id, connection, now=None):
+    """Drop ``connection``. Returns how many live connections remain."""
+    now = _ts(now)
+    key = _room_key(session_id)
+
+    with session_state.redis_client().pipeline() as pipe:
+        while True:
+            try:
+                pipe.watch(key)
+                others = [
+                    name for name in pipe.zrangebyscore(key, now, "+inf")
+                    if name != connection
+                ]
+
+                pipe.multi()
+                pipe.zrem(key, connection)
+                pipe.zremrangebyscore(key, "-inf", now)  # lapsed connections
+                if not others:
+                    # Room is empty: start the countdown
+                    pipe.zadd(DEADLINES_KEY, {str(session_id): now + AUTO_EXPIRE_DELAY})
+                pipe.execute()
+                return len(others)
+            except redis.WatchError:
+                continue
+
+
+def count(session_id, now=None):
+    return session_state.redis_client().zcount(_room_key(session_id), _ts(now), "+inf")
+
+
+# =========================
+# EXPIRY
+# =========================
+def claim_due(now=None, limit=100):
+    """
+    Up to ``limit`` (None: all) session ids whose deadline has passed;
+    each is returned to one caller only.
+    """
+    client = session_state.redis_client()
+    page = {"start": 0, "num": limit} if limit else {}
+    due = client.zrangebyscore(DEADLINES_KEY, "-inf", _ts(now), **page)
+    if not due:
+        return []
+
+    with client.pipeline(transaction=False) as pipe:
+        for session_id in due:
+            pipe.zrem(DEADLINES_KEY, session_id)
+        removed = pipe.execute()
+
+    return [session_id for session_id, ok in zip(due, removed) if ok]
+
+
+def expire_due(now=None, limit=100):
+    """End due sessions whose room is still empty. Returns the ended ids."""
+    from sessions_app.models import PrivateSession
+    from sessions_app.views import _end_session_internal
+
+    now_ts = _ts(now)
+    client = session_state.redis_client()
+    ended = []
+
+    for session_id in claim_due(now, limit):
+        latest = client.zrevrange(_room_key(session_id), 0, 0, withscores=True)
+        if latest and latest[0][1] > now_ts:
+            # Someone joined while we were claiming it
+            client.zadd(DEADLINES_KEY, {session_id: latest[0][1] + AUTO_EXPIRE_DELAY}, gt=True)
+            continue
+
+        try:
+            session = PrivateSession.objects.filter(pk=session_id, status="ongoing").first()
+            if session and _end_session_internal(session, reason="auto_expired_all_left"):
+                ended.append(session_id)
+        except Exception:
+            logger.exception("Auto-expire failed for session %s", session_id)
+            client.zadd(DEADLINES_KEY, {session_id: now_ts + HEARTBEAT_INTERVAL})
+
+    return ended
@@ -0,0 +1,66 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_init, post_save, pre_save
+from django.dispatch import receiver
+
+from accounts.models import Profile
+from livestream.models import LiveSession
+
+from .models import PrivateSession
+from .services.availability import bump_availability_version
+from .services.listing import compute_search_text, refresh_search_text
+
+User = get_user_model()
+
+_NAME_FIELDS = {"username", "first_name", "last_name"}
+
+
+# =========================
+# LISTING SEARCH TEXT
+# =========================
+_SEARCH_SOURCE_FIELDS = ("subject", "teacher_id", "requested_by_id")
+
+
+def _search_source(instance):
+    # Deferred fields are left out rather than loaded
+    return tuple(instance.__dict__.get(field) for field in _SEARCH_SOURCE_FIELDS)
+
+
+@receiver(post_init, sender=PrivateSession)
+def remember_search_source(sender, instance, **kwargs):
+    instance._search_source = _search_source(instance)
+
+
+@receiver(pre_save, sender=PrivateSession)
+def session_search_text(sender, instance, update_fields=None, **kwargs):
+    # Partial saves (status changes etc.) never touch the searched fields,
+    # and neither do full saves that leave subject and parties alone
+    if update_fields is not None:
+        return
+    if instance._state.adding or instance._search_source != _search_source(instance):
+        instance.search_text = compute_search_text(instance)
+        instance._search_source = _search_source(instance)
+
+
+@receiver(post_save, sender=Profile)
+def profile_renamed(sender, instance, update_fields=None, **kwargs):
+    if update_fields is None or "full_name" in update_fields:
+        refresh_search_text(instance.user_id)
+
+
+@receiver(post_save, sender=User)
+def user_renamed(sender, instance, created, update_fields=None, **kwargs):
+    if created:
+        return
+    if update_fields is None or _NAME_FIELDS & set(update_fields):
+        refresh_search_text(instance.pk)
+
+
+# =========================
+# TEACHER AVAILABILITY
+# =========================
+@receiver(post_save, sender=PrivateSession)
+@receiver(post_delete, sender=PrivateSession)
+@receiver(post_save, sender=LiveSession)
+@receiver(post_delete, sender=LiveSession)
+def availability_changed(sender, **kwargs):
+    bump_availability_version()
@@ -11,18 +11,41 @@ Covers:
   - Session detail access control
   - Join (LiveKit token) endpoint
   - Edge cases (wrong status transitions, unauthorized access)
+  - WebSocket chat (origin check, connect-time authorization, open / close
+    on start / end, batched persistence, client ids)
+  - Presence & auto-expiry (fakeredis)
+  - Chat history pagination & archival
+  - Listing tabs (projection, keyset pagination, search index kept in
+    step with subject / party changes only)
+  - Teacher availability (overlap checks, free slots, index invalidation)
 """
 
-from datetime import date, time, timedelta
+from datetime import date, datetime, time, timedelta
+from io import StringIO
 from unittest.mock import patch
 
-from django.test import TestCase, override_settings
+import json
+
+import fakeredis
+from asgiref.testing import ApplicationCommunicator
+from channels.db import database_sync_to_async
+from channels.routing import URLRouter
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.utils import timezone
 from rest_framework.test import APIClient
 from rest_framework import status
 
 from accounts.models import User, Profile, Role, UserRole
-from .models import PrivateSession, SessionParticipant, SessionRescheduleHistory
+from livestream.models import LiveSession
+from livestream.services import session_state
+from .models import ChatArchive, ChatMessage, PrivateSession, SessionParticipant, SessionRescheduleHistory
+from .routing import websocket_urlpatterns
+from .services import availability, chat, presence
+from .views import _end_session_internal
 
 
 # ===================================================================
@@ -663,4 +686,602 @@ class SerializerHelperTest(BaseTestCase):
         from .serializers import get_student_id
         self.assertEqual(get_student_id(self.student), "STU001")
         self.assertIsNone(get_student_id(self.teacher))
-        self.assertIsNone(get_student_id(self.outsider))
\ No newline at end of file
+        self.assertIsNone(get_student_id(self.outsider))
+
+# ===================================================================
+# WEBSOCKET CHAT
+# ===================================================================
+
+class _Socket(ApplicationCommunicator):
+    """Minimal WebSocket client for a consumer (JSON text frames)."""
+
+    async def send_json_to(self, data):
+        await self.send_input({"type": "websocket.receive", "text": json.dumps(data)})
+
+    async def receive_json_from(self):
+        return json.loads((await self.receive_output(1))["text"])
+
+    async def disconnect(self):
+        await self.send_input({"type": "websocket.disconnect", "code": 1000})
+        await self.wait(1)
+
+
+@override_settings(CHANNEL_LAYERS={"default": {"BACKEND": "channels.layers.InMemoryChannelLayer"}})
+class ChatConsumerTest(TransactionTestCase):
+    """
+    Standalone (not BaseTestCase): the consumer reads the database from
+    another thread, so the rows must be committed.
+    """
+
+    def setUp(self):
+        self.redis = fakeredis.FakeRedis(decode_responses=True)
+        patcher = patch.object(session_state, "redis_client", return_value=self.redis)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.teacher = User.objects.create_user(username="chat_teacher", email="ct@test.com")
+        self.student = User.objects.create_user(username="chat_student", email="cs@test.com")
+        self.outsider = User.objects.create_user(username="chat_outsider", email="co@test.com")
+        self.session = PrivateSession.objects.create(
+            teacher=self.teacher,
+            requested_by=self.student,
+            subject="Mathematics",
+            scheduled_date=date.today(),
+            scheduled_time=time(14, 0),
+            status="ongoing",
+        )
+
+    async def connect(self, user):
+        communicator = _Socket(URLRouter(websocket_urlpatterns), {
+            "type": "websocket",
+            "path": f"/ws/private-session/{self.session.id}/chat/",
+            "headers": [],
+            "subprotocols": [],
+            "user": user,
+        })
+        await communicator.send_input({"type": "websocket.connect"})
+        response = await communicator.receive_output(1)
+        return communicator, response["type"] == "websocket.accept"
+
+    async def test_non_participant_is_rejected(self):
+        communicator, connected = await self.connect(self.outsider)
+        self.assertFalse(connected)
+
+    async def test_foreign_origin_is_rejected(self):
+        from config.asgi import application
+
+        communicator = _Socket(application, {
+            "type": "websocket",
+            "path": f"/ws/private-session/{self.session.id}/chat/",
+            "headers": [(b"origin", b"https://evil.example")],
+            "subprotocols": [],
+        })
+        await communicator.send_input({"type": "websocket.connect"})
+        response = await communicator.receive_output(1)
+        self.assertEqual(response["type"], "websocket.close")
+
+    async def test_messages_are_broadcast_then_persisted_in_a_batch(self):
+        teacher, _ = await self.connect(self.teacher)
+        student, _ = await self.connect(self.student)
+
+        for client_id, text in [("c1", "hello"), ("c2", "second"), ("c1", "hello")]:
+            await student.send_json_to({
+                "type": "chat_message", "client_id": client_id, "message": text,
+            })
+
+        received = [await teacher.receive_json_from() for _ in range(2)]
+        self.assertTrue(await teacher.receive_nothing())  # resend dropped
+        self.assertEqual([m["data"]["client_id"] for m in received], ["c1", "c2"])
+        self.assertEqual(received[0]["data"]["sender_role"], "student")
+
+        await chat.writer.flush()
+        stored = await database_sync_to_async(list)(
+            ChatMessage.objects.filter(session=self.session)
+            .order_by("created_at").values_list("id", "client_id")
+        )
+        self.assertEqual(
+            [(str(pk), client_id) for pk, client_id in stored],
+            [(m["data"]["id"], m["data"]["client_id"]) for m in received],
+        )
+
+        await teacher.disconnect()
+        await student.disconnect()
+
+    async def test_chat_closes_when_session_ends(self):
+        student, _ = await self.connect(self.student)
+
+        await database_sync_to_async(_end_session_internal)(self.session)
+        self.assertEqual((await student.receive_json_from())["type"], "session_ended")
+
+        await student.send_json_to({"type": "chat_message", "client_id": "c1", "message": "hi"})
+        self.assertEqual((await student.receive_json_from())["type"], "error")
+
+        await student.disconnect()
+
+    async def test_chat_opens_when_session_starts(self):
+        await database_sync_to_async(
+            PrivateSession.objects.filter(pk=self.session.pk).update
+        )(status="approved")
+        role = await database_sync_to_async(Role.objects.create)(name="TEACHER")
+        await database_sync_to_async(UserRole.objects.create)(
+            user=self.teacher, role=role, is_active=True, is_primary=True
+        )
+        client = APIClient()
+        client.force_authenticate(user=self.teacher)
+        student, _ = await self.connect(self.student)
+
+        await student.send_json_to({"type": "chat_message", "client_id": "c1", "message": "early"})
+        self.assertEqual((await student.receive_json_from())["type"], "error")
+
+        await database_sync_to_async(client.post)(f"/api/sessions/{self.session.id}/start/")
+        self.assertEqual((await student.receive_json_from())["type"], "session_started")
+
+        await student.send_json_to({"type": "chat_message", "client_id": "c2", "message": "hi"})
+        self.assertEqual((await student.receive_json_from())["type"], "chat_message")
+
+        await student.disconnect()
+
+    def test_batch_landing_after_the_end_is_kept(self):
+        message = ChatMessage(
+            session=self.session, sender=self.student, sender_name="s",
+            message="last words", client_id="c1",
+        )
+        _end_session_internal(self.session)
+        chat.persist_messages([message])
+        self.assertTrue(ChatMessage.objects.filter(session=self.session, client_id="c1").exists())
+
+    def test_rewritten_batch_is_stored_once(self):
+        def batch():
+            return [ChatMessage(
+                session=self.session, sender=self.student, sender_name="s",
+                message="hi", client_id="c1",
+            )]
+
+        chat.persist_messages(batch())
+        chat.persist_messages(batch())
+        self.assertEqual(ChatMessage.objects.filter(session=self.session).count(), 1)
+
+    async def test_connect_and_disconnect_track_presence_in_redis(self):
+        teacher, _ = await self.connect(self.teacher)
+        self.assertEqual(presence.count(self.session.id), 1)
+
+        await teacher.disconnect()
+        self.assertEqual(presence.count(self.session.id), 0)
+        self.assertIsNotNone(self.redis.zscore(presence.DEADLINES_KEY, str(self.session.id)))
+
+
+@override_settings(CHANNEL_LAYERS={"default": {"BACKEND": "channels.layers.InMemoryChannelLayer"}})
+class PresenceTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = User.objects.create_user(username="p_teacher", email="pt@test.com")
+        cls.student = User.objects.create_user(username="p_student", email="ps@test.com")
+
+    def setUp(self):
+        self.redis = fakeredis.FakeRedis(decode_responses=True)
+        patcher = patch.object(session_state, "redis_client", return_value=self.redis)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.session = PrivateSession.objects.create(
+            teacher=self.teacher,
+            requested_by=self.student,
+            subject="Mathematics",
+            scheduled_date=date.today(),
+            scheduled_time=time(14, 0),
+            status="ongoing",
+        )
+        self.t0 = timezone.now()
+
+    def at(self, seconds):
+        return self.t0 + timedelta(seconds=seconds)
+
+    def assertStatus(self, expected):
+        self.session.refresh_from_db()
+        self.assertEqual(self.session.status, expected)
+
+    def test_join_and_leave_cost_no_queries(self):
+        with self.assertNumQueries(0):
+            presence.join(self.session.id, "a", now=self.t0)
+            presence.join(self.session.id, "b", now=self.t0)
+            self.assertEqual(presence.leave(self.session.id, "a", now=self.t0), 1)
+            self.assertEqual(presence.leave(self.session.id, "b", now=self.t0), 0)
+
+    def test_empty_room_expires_once(self):
+        presence.join(self.session.id, "a", now=self.t0)
+        presence.leave(self.session.id, "a", now=self.t0)
+
+        self.assertEqual(presence.expire_due(now=self.at(presence.AUTO_EXPIRE_DELAY - 1)), [])
+        self.assertStatus("ongoing")
+
+        ended = presence.expire_due(now=self.at(presence.AUTO_EXPIRE_DELAY + 1))
+        self.assertEqual(ended, [str(self.session.id)])
+        self.assertStatus("completed")
+
+        # A second worker sweeping the same schedule finds nothing
+        self.assertEqual(presence.expire_due(now=self.at(presence.AUTO_EXPIRE_DELAY + 2)), [])
+
+    def test_rejoin_cancels_the_countdown(self):
+        presence.join(self.session.id, "a", now=self.t0)
+        presence.leave(self.session.id, "a", now=self.t0)
+        presence.join(self.session.id, "b", now=self.at(60))
+
+        self.assertEqual(presence.expire_due(now=self.at(presence.AUTO_EXPIRE_DELAY + 1)), [])
+        self.assertStatus("ongoing")
+
+    def test_heartbeats_keep_the_room_alive(self):
+        presence.join(self.session.id, "a", now=self.t0)
+        later = presence.PRESENCE_TTL + presence.AUTO_EXPIRE_DELAY
+        presence.heartbeat({str(self.session.id): {"a"}}, now=self.at(later - 10))
+
+        self.assertEqual(presence.expire_due(now=self.at(later + 1)), [])
+        self.assertEqual(presence.count(self.session.id, now=self.at(later + 1)), 1)
+
+    def test_room_of_a_dead_worker_expires(self):
+        # Joined, then the worker died: no leave, no more heartbeats
+        presence.join(self.session.id, "a", now=self.t0)
+
+        lapsed = presence.PRESENCE_TTL + presence.AUTO_EXPIRE_DELAY + 1
+        self.assertEqual(presence.expire_due(now=self.at(lapsed)), [str(self.session.id)])
+        self.assertStatus("completed")
+
+
+@override_settings(CHANNEL_LAYERS={"default": {"BACKEND": "channels.layers.InMemoryChannelLayer"}})
+class ChatHistoryTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = User.objects.create_user(username="h_teacher", email="ht@test.com")
+        cls.student = User.objects.create_user(username="h_student", email="hs@test.com")
+        cls.session = PrivateSession.objects.create(
+            teacher=cls.teacher,
+            requested_by=cls.student,
+            subject="Mathematics",
+            scheduled_date=date.today(),
+            scheduled_time=time(14, 0),
+            status="ongoing",
+        )
+        base = timezone.now() - timedelta(hours=1)
+        ChatMessage.objects.bulk_create([
+            ChatMessage(
+                session=cls.session,
+                sender=cls.student,
+                sender_name="Student",
+                message=f"message {i}",
+                created_at=base + timedelta(seconds=i // 2),  # pairs share a timestamp
+            )
+            for i in range(120)
+        ])
+
+    def read_all(self):
+        client = APIClient()
+        client.force_authenticate(user=self.teacher)
+        url = f"/api/sessions/{self.session.id}/chat/"
+        pages = []
+        while url:
+            res = client.get(url)
+            self.assertEqual(res.status_code, 200)
+            pages.append([m["id"] for m in res.data])
+            link = res.headers.get("Link")
+            url = link[1:link.index(">")] if link else None
+        return pages
+
+    def test_history_is_paged_newest_first(self):
+        pages = self.read_all()
+        self.assertEqual([len(page) for page in pages], [50, 50, 20])
+
+        expected = [
+            str(pk) for pk in
+            ChatMessage.objects.filter(session=self.session)
+            .order_by("-created_at", "-id").values_list("id", flat=True)
+        ]
+        self.assertEqual(sum(pages, []), expected)
+
+    def test_ending_keeps_chat_until_archived(self):
+        before = self.read_all()
+        _end_session_internal(self.session)
+        self.assertEqual(ChatMessage.objects.filter(session=self.session).count(), 120)
+
+        # Late chat batches may still land right after the end
+        call_command("archive_chat_history", stdout=StringIO())
+        self.assertEqual(ChatMessage.objects.filter(session=self.session).count(), 120)
+
+        PrivateSession.objects.filter(pk=self.session.pk).update(
+            ended_at=timezone.now() - timedelta(seconds=chat.CHAT_ARCHIVE_GRACE + 1)
+        )
+        call_command("archive_chat_history", stdout=StringIO())
+
+        self.assertFalse(ChatMessage.objects.filter(session=self.session).exists())
+        self.assertEqual(ChatArchive.objects.get(session=self.session).message_count, 120)
+        self.assertEqual(self.read_all(), before)
+
+    def test_running_session_is_not_archived(self):
+        call_command("archive_chat_history", stdout=StringIO())
+        self.assertEqual(ChatMessage.objects.filter(session=self.session).count(), 120)
+        self.assertFalse(ChatArchive.objects.exists())
+
+
+class SessionListingTest(TestCase):
+    """Standalone: profiles come from the accounts post_save signal."""
+
+    @classmethod
+    def setUpTestData(cls):
+        teacher_role = Role.objects.create(name="TEACHER")
+        student_role = Role.objects.create(name="STUDENT")
+
+        cls.teacher = User.objects.create_user(username="l_teacher", email="lt@test.com")
+        cls.student = User.objects.create_user(username="l_student", email="ls@test.com")
+        cls.friend = User.objects.create_user(username="l_friend", email="lf@test.com")
+        UserRole.objects.create(user=cls.teacher, role=teacher_role, is_active=True, is_primary=True)
+        UserRole.objects.create(user=cls.student, role=student_role, is_active=True, is_primary=True)
+
+        profile = cls.teacher.profile
+        profile.first_name, profile.last_name = "Ada", "Lovelace"
+        profile.save()
+
+    def create_sessions(self, count, status="completed", requested_by=None, subject="Mathematics"):
+        sessions = []
+        for i in range(count):
+            session = PrivateSession.objects.create(
+                teacher=self.teacher,
+                requested_by=requested_by or self.student,
+                subject=subject,
+                scheduled_date=date.today() - timedelta(days=i),
+                scheduled_time=time(14, 0),
+                status=status,
+            )
+            SessionParticipant.objects.create(session=session, user=session.requested_by)
+            sessions.append(session)
+        return sessions
+
+    def get_all(self, user, url):
+        client = APIClient()
+        client.force_authenticate(user=user)
+        ids = []
+        while url:
+            res = client.get(url)
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            ids += [row["id"] for row in res.data]
+            link = res.headers.get("Link", "")
+            url = next(
+                (part.split(">")[0].lstrip(" <") for part in link.split(",") if 'rel="next"' in part),
+                None,
+            )
+        return ids
+
+    def test_rows_carry_resolved_names(self):
+        self.create_sessions(1, status="pending")
+        client = APIClient()
+        client.force_authenticate(user=self.teacher)
+        row = client.get("/api/sessions/teacher/requests/").data[0]
+
+        self.assertEqual(row["teacher_name"], "Ada Lovelace")
+        self.assertEqual(row["student_name"], "l_student")
+        self.assertEqual(row["student_id"], self.student.profile.student_id)
+        self.assertEqual(row["requested_by_id"], str(self.student.id))
+
+    def test_history_pages_cost_the_same_however_long(self):
+        self.create_sessions(5)
+        client = APIClient()
+        client.force_authenticate(user=self.teacher)
+        client.get("/api/sessions/teacher/history/")  # warm role cache
+
+        with CaptureQueriesContext(connection) as short:
+            client.get("/api/sessions/teacher/history/?page_size=10")
+        self.create_sessions(40)
+        with CaptureQueriesContext(connection) as long:
+            client.get("/api/sessions/teacher/history/?page_size=10")
+        self.assertEqual(len(short.captured_queries), len(long.captured_queries))
+
+        ids = self.get_all(self.teacher, "/api/sessions/teacher/history/?page_size=10")
+        expected = [
+            str(pk) for pk in PrivateSession.objects.order_by(
+                "-scheduled_date", "-scheduled_time", "-id"
+            ).values_list("id", flat=True)
+        ]
+        self.assertEqual(ids, expected)
+
+    def test_student_sees_each_session_once(self):
+        own = self.create_sessions(2, status="approved")
+        joined = self.create_sessions(1, status="approved", requested_by=self.friend)[0]
+        SessionParticipant.objects.create(session=joined, user=self.student)
+
+        ids = self.get_all(self.student, "/api/sessions/student/?tab=scheduled")
+        self.assertCountEqual(ids, [str(s.id) for s in own + [joined]])
+
+    def test_search_tracks_subject_and_renames(self):
+        physics = self.create_sessions(1, subject="Physics")[0]
+        self.create_sessions(1, subject="Chemistry")
+
+        url = "/api/sessions/teacher/history/?search="
+        self.assertEqual(self.get_all(self.teacher, url + "PHYS"), [str(physics.id)])
+        self.assertEqual(len(self.get_all(self.teacher, url + "lovelace")), 2)
+
+        profile = self.student.profile
+        profile.first_name, profile.last_name = "Grace", "Hopper"
+        profile.save()
+        self.assertEqual(len(self.get_all(self.teacher, url + "hopper")), 2)
+
+    def test_search_text_recomputed_only_when_its_fields_change(self):
+        session = PrivateSession.objects.get(pk=self.create_sessions(1)[0].pk)
+
+        session.status = "approved"
+        with CaptureQueriesContext(connection) as status_change:
+            session.save()
+        self.assertEqual(len(status_change.captured_queries), 1)  # the UPDATE
+
+        session.subject = "Physics"
+        session.save()
+        session.refresh_from_db()
+        self.assertTrue(session.search_text.startswith("physics "))
+
+
+# ─────────────────────────────────────────────────────────────
+# Teacher availability
+# ─────────────────────────────────────────────────────────────
+class TeacherAvailabilityTest(TestCase):
+    """Standalone: profiles come from the accounts post_save signal."""
+
+    @classmethod
+    def setUpTestData(cls):
+        from courses.models import Course, Subject, SubjectTeacher
+
+        teacher_role = Role.objects.create(name="TEACHER")
+        student_role = Role.objects.create(name="STUDENT")
+
+        cls.busy = User.objects.create_user(username="a_busy", email="ab@test.com")
+        cls.free = User.objects.create_user(username="a_free", email="af@test.com")
+        cls.student = User.objects.create_user(username="a_student", email="as@test.com")
+        for teacher in (cls.busy, cls.free):
+            UserRole.objects.create(user=teacher, role=teacher_role, is_active=True, is_primary=True)
+        UserRole.objects.create(user=cls.student, role=student_role, is_active=True, is_primary=True)
+
+        cls.course = Course.objects.create(title="Class 10")
+        cls.subject = Subject.objects.create(course=cls.course, name="Physics")
+        for teacher in (cls.busy, cls.free):
+            SubjectTeacher.objects.create(subject=cls.subject, teacher=teacher)
+
+        cls.day = date.today() + timedelta(days=3)
+
+    def setUp(self):
+        cache.clear()
+        availability._memory.clear()
+
+    def book(self, teacher, at, duration=60, status="approved"):
+        with self.captureOnCommitCallbacks(execute=True):
+            return PrivateSession.objects.create(
+                teacher=teacher,
+                requested_by=self.student,
+                subject="Physics",
+                scheduled_date=self.day,
+                scheduled_time=at,
+                duration_minutes=duration,
+                status=status,
+            )
+
+    def client_for(self, user):
+        client = APIClient()
+        client.force_authenticate(user=user)
+        return client
+
+    def test_overlap_is_by_time_not_date(self):
+        self.book(self.busy, time(10, 0))
+
+        url = f"/api/sessions/subjects/{self.subject.id}/teachers/?date={self.day}&duration=60&time="
+        res = self.client_for(self.student).get(url + "10:30")
+        self.assertEqual([row["id"] for row in res.data], [str(self.free.id)])
+
+        # Back-to-back with the booked hour is fine
+        res = self.client_for(self.student).get(url + "11:00")
+        self.assertEqual(len(res.data), 2)
+
+    @override_settings(ACTIVITY_FANOUT_BACKEND="sync")
+    def test_live_classes_block_their_creator(self):
+        start = timezone.make_aware(datetime.combine(self.day, time(16, 0)))
+        with self.captureOnCommitCallbacks(execute=True):
+            live = LiveSession.objects.create(
+                course=self.course, subject=self.subject, title="Optics",
+                start_time=start, end_time=start + timedelta(hours=2),
+                room_name="room_optics", created_by=self.free,
+            )
+        self.assertFalse(availability.is_free(self.free.id, start + timedelta(hours=1), start + timedelta(hours=3)))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            live.status = LiveSession.STATUS_CANCELLED
+            live.save()
+        self.assertTrue(availability.is_free(self.free.id, start, start + timedelta(hours=2)))
+
+    def test_request_conflicting_with_committed_slot_is_rejected(self):
+        self.book(self.busy, time(10, 0))
+        payload = {
+            "teacher_id": str(self.busy.id),
+            "subject_id": str(self.subject.id),
+            "scheduled_date": str(self.day),
+            "duration_minutes": 30,
+        }
+        client = self.client_for(self.student)
+
+        res = client.post("/api/sessions/request/", {**payload, "scheduled_time": "10:45"}, format="json")
+        self.assertEqual(res.status_code, status.HTTP_409_CONFLICT)
+
+        res = client.post("/api/sessions/request/", {**payload, "scheduled_time": "11:00"}, format="json")
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+
+    def test_reschedule_ignores_own_slot_but_not_others(self):
+        session = self.book(self.busy, time(10, 0))
+        self.book(self.busy, time(14, 0))
+        client = self.client_for(self.busy)
+        url = f"/api/sessions/{session.id}/reschedule/"
+
+        res = client.post(url, {"scheduled_date": str(self.day), "scheduled_time": "14:30"}, format="json")
+        self.assertEqual(res.status_code, status.HTTP_409_CONFLICT)
+
+        res = client.post(url, {"scheduled_date": str(self.day), "scheduled_time": "10:30"}, format="json")
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data["status"], "needs_reconfirmation")
+
+    def test_accept_rejects_double_booking(self):
+        self.book(self.busy, time(10, 0))
+        pending = self.book(self.busy, time(10, 30), status="pending")
+
+        res = self.client_for(self.busy).post(f"/api/sessions/{pending.id}/accept/", {}, format="json")
+        self.assertEqual(res.status_code, status.HTTP_409_CONFLICT)
+        pending.refresh_from_db()
+        self.assertEqual(pending.status, "pending")
+
+    def test_booking_checks_the_database_not_the_index(self):
+        start = timezone.make_aware(datetime.combine(self.day, time(10, 0)))
+        self.assertTrue(availability.is_free(self.busy.id, start, start + timedelta(hours=1)))
+
+        # Committed without its on-commit version bump: the index is stale
+        for at, status_ in ((time(10, 0), "approved"), (time(10, 15), "pending")):
+            pending = PrivateSession.objects.create(
+                teacher=self.busy, requested_by=self.student, subject="Physics",
+                scheduled_date=self.day, scheduled_time=at, status=status_,
+            )
+        self.assertTrue(availability.is_free(self.busy.id, start, start + timedelta(hours=1)))
+
+        res = self.client_for(self.busy).post(f"/api/sessions/{pending.id}/accept/", {}, format="json")
+        self.assertEqual(res.status_code, status.HTTP_409_CONFLICT)
+
+    def test_free_slots_skip_commitments(self):
+        self.book(self.busy, time(9, 0), duration=90)
+        url = f"/api/sessions/subjects/{self.subject.id}/free-slots/?from={self.day}&days=1&duration=60"
+        res = self.client_for(self.student).get(url)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        slots = {row["id"]: row["slots"][str(self.day)] for row in res.data}
+        self.assertEqual(slots[str(self.free.id)][:3], ["08:00", "08:30", "09:00"])
+        self.assertEqual(slots[str(self.busy.id)][:3], ["08:00", "10:30", "11:00"])
+        self.assertEqual(slots[str(self.busy.id)][-1], "21:00")
+
+    def test_index_is_reused_until_a_session_changes(self):
+        self.book(self.busy, time(10, 0))
+        start = timezone.make_aware(datetime.combine(self.day, time(10, 0)))
+        end = start + timedelta(hours=1)
+
+        self.assertFalse(availability.is_free(self.busy.id, start, end))
+        with self.assertNumQueries(0):
+            self.assertTrue(availability.is_free(self.free.id, start, end))
+
+        self.book(self.free, time(10, 0))
+        self.assertFalse(availability.is_free(self.free.id, start, end))
+
+    def test_memoised_index_expires(self):
+        start = timezone.make_aware(datetime.combine(self.day, time(10, 0)))
+        end = start + timedelta(hours=1)
+        self.assertTrue(availability.is_free(self.busy.id, start, end))
+
+        # A write that skipped signals, e.g. a bulk update
+        PrivateSession.objects.create(
+            teacher=self.busy, requested_by=self.student, subject="Physics",
+            scheduled_date=self.day, scheduled_time=time(10, 0), status="approved",
+        )
+        # ...and the shared entry has expired since; this process's copy hasn't
+        cache.delete(availability._day_key(availability.get_availability_version(), self.day))
+        self.assertTrue(availability.is_free(self.busy.id, start, end))
+
+        later = availability.time.monotonic() + availability.AVAILABILITY_CACHE_TIMEOUT
+        with patch.object(availability.time, "monotonic", return_value=later):
+            self.assertFalse(availability.is_free(self.busy.id, start, end))
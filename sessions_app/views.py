@@ -7,13 +7,28 @@ from asgiref.sync import async_to_sync
 
 from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.db.models import Q
+from django.db import transaction
 from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_time
 from rest_framework import status
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
-
+from rest_framework.utils.urls import replace_query_param
+
+from config.pagination import KeysetPaginator
+
+from sessions_app.services import availability
+from sessions_app.services.chat import chat_group_name
+from sessions_app.services.chat_history import history_page
+from sessions_app.services.listing import (
+    HISTORY_ORDERING,
+    HISTORY_STATUSES,
+    SCHEDULED_STATUSES,
+    UPCOMING_ORDERING,
+    student_listing,
+    teacher_listing,
+)
 from sessions_app.services.private_token import generate_private_token
 
 from .models import PrivateSession, SessionParticipant, SessionRescheduleHistory, ChatMessage
@@ -66,26 +81,35 @@ def request_session(request):
     except User.DoesNotExist:
         return Response({"error": "Teacher not found"}, status=404)
 
-    # ✅ Create session
-    session = PrivateSession.objects.create(
-        teacher=teacher,
-        requested_by=request.user,
-        subject=subject_obj.name,  # store name
-        scheduled_date=d["scheduled_date"],
-        scheduled_time=d["scheduled_time"],
-        duration_minutes=d["duration_minutes"],
-        session_type=d["session_type"],
-        group_strength=d["group_strength"],
-        notes=d.get("notes", ""),
-        status="pending",
-    )
+    with transaction.atomic():
+        # ✅ Teacher must be free for the slot
+        try:
+            availability.check_slot(
+                teacher.pk, d["scheduled_date"], d["scheduled_time"], d["duration_minutes"]
+            )
+        except availability.SlotConflict as exc:
+            return Response({"error": str(exc)}, status=status.HTTP_409_CONFLICT)
+
+        # ✅ Create session
+        session = PrivateSession.objects.create(
+            teacher=teacher,
+            requested_by=request.user,
+            subject=subject_obj.name,  # store name
+            scheduled_date=d["scheduled_date"],
+            scheduled_time=d["scheduled_time"],
+            duration_minutes=d["duration_minutes"],
+            session_type=d["session_type"],
+            group_strength=d["group_strength"],
+            notes=d.get("notes", ""),
+            status="pending",
+        )
 
-    # ✅ Add requester
-    SessionParticipant.objects.create(
-        session=session,
-        user=request.user,
-        role="student"
-    )
+        # ✅ Add requester
+        SessionParticipant.objects.create(
+            session=session,
+            user=request.user,
+            role="student"
+        )
 
     return Response(
         PrivateSessionSerializer(session).data,
@@ -104,40 +128,23 @@ def student_sessions(request):
     ?tab=requests   → pending
     ?tab=history    → completed / cancelled / declined / expired / withdrawn / no_show
     ?search=keyword → filter by subject, teacher name, or student name
+
+    Paginated (?page_size=, default 50); the next page's URL is in the Link
+    header.
     """
     tab = request.query_params.get("tab", "scheduled")
     search = request.query_params.get("search", "").strip()
-    user = request.user
-
-    # Sessions where user is requester OR a participant
-    qs = PrivateSession.objects.filter(
-        Q(requested_by=user) | Q(participants__user=user)
-    ).distinct()
 
-    if tab == "scheduled":
-        qs = qs.filter(
-            status__in=["approved", "ongoing", "needs_reconfirmation"])
-    elif tab == "requests":
-        qs = qs.filter(status="pending")
+    if tab == "requests":
+        statuses, ordering = ["pending"], UPCOMING_ORDERING
     elif tab == "history":
-        qs = qs.filter(
-            status__in=[
-                "completed", "cancelled", "declined", "expired",
-                "withdrawn", "teacher_no_show", "student_no_show",
-            ]
-        )
-
-    # Search filter
-    if search:
-        qs = qs.filter(
-            Q(subject__icontains=search)
-            | Q(teacher__profile__full_name__icontains=search)
-            | Q(teacher__username__icontains=search)
-            | Q(requested_by__profile__full_name__icontains=search)
-            | Q(requested_by__username__icontains=search)
-        ).distinct()
+        statuses, ordering = HISTORY_STATUSES, HISTORY_ORDERING
+    else:
+        statuses, ordering = SCHEDULED_STATUSES, UPCOMING_ORDERING
 
-    return Response(SessionListSerializer(qs, many=True).data)
+    return _listing_response(
+        request, student_listing(request.user, statuses, search), ordering
+    )
 
 
 @api_view(["POST"])
@@ -215,17 +222,21 @@ def decline_reschedule(request, session_id):
 # ===================================================================
 
 
-def _apply_search(qs, search):
-    """Apply search filter across subject, teacher name, and student name."""
-    if not search:
-        return qs
-    return qs.filter(
-        Q(subject__icontains=search)
-        | Q(teacher__profile__full_name__icontains=search)
-        | Q(teacher__username__icontains=search)
-        | Q(requested_by__profile__full_name__icontains=search)
-        | Q(requested_by__username__icontains=search)
-    ).distinct()
+def _listing_response(request, queryset, ordering):
+    """One keyset page of a listing tab; cursors travel in the Link header."""
+    paginator = KeysetPaginator(ordering=ordering, page_size=50, max_page_size=200)
+    page = paginator.paginate(queryset, request)
+
+    links = []
+    url = request.build_absolute_uri()
+    for rel, cursor in (("next", page.next_cursor), ("prev", page.previous_cursor)):
+        if cursor:
+            links.append(
+                f'<{replace_query_param(url, paginator.cursor_param, cursor)}>; rel="{rel}"'
+            )
+
+    headers = {"Link": ", ".join(links)} if links else None
+    return Response(SessionListSerializer(page.items, many=True).data, headers=headers)
 
 
 @api_view(["GET"])
@@ -233,11 +244,11 @@ def _apply_search(qs, search):
 def teacher_sessions(request):
     """Teacher's approved / ongoing sessions. Supports ?search= query param."""
     search = request.query_params.get("search", "").strip()
-    qs = PrivateSession.objects.filter(
-        teacher=request.user, status__in=["approved", "ongoing"]
+    return _listing_response(
+        request,
+        teacher_listing(request.user, ["approved", "ongoing"], search),
+        UPCOMING_ORDERING,
     )
-    qs = _apply_search(qs, search)
-    return Response(SessionListSerializer(qs, many=True).data)
 
 
 @api_view(["GET"])
@@ -245,9 +256,11 @@ def teacher_sessions(request):
 def teacher_requests(request):
     """Pending requests awaiting teacher action. Supports ?search= query param."""
     search = request.query_params.get("search", "").strip()
-    qs = PrivateSession.objects.filter(teacher=request.user, status="pending")
-    qs = _apply_search(qs, search)
-    return Response(SessionListSerializer(qs, many=True).data)
+    return _listing_response(
+        request,
+        teacher_listing(request.user, ["pending"], search),
+        UPCOMING_ORDERING,
+    )
 
 
 @api_view(["GET"])
@@ -255,15 +268,11 @@ def teacher_requests(request):
 def teacher_history(request):
     """Teacher's completed / cancelled / declined sessions. Supports ?search= query param."""
     search = request.query_params.get("search", "").strip()
-    qs = PrivateSession.objects.filter(
-        teacher=request.user,
-        status__in=[
-            "completed", "cancelled", "declined", "expired",
-            "withdrawn", "teacher_no_show", "student_no_show",
-        ],
+    return _listing_response(
+        request,
+        teacher_listing(request.user, HISTORY_STATUSES, search),
+        HISTORY_ORDERING,
     )
-    qs = _apply_search(qs, search)
-    return Response(SessionListSerializer(qs, many=True).data)
 
 
 @api_view(["POST"])
@@ -285,12 +294,26 @@ def accept_request(request, session_id):
     new_date = request.data.get("scheduled_date")
     new_time = request.data.get("scheduled_time")
     if new_date:
-        session.scheduled_date = new_date
+        session.scheduled_date = parse_date(new_date)
     if new_time:
-        session.scheduled_time = new_time
+        session.scheduled_time = parse_time(new_time)
+    if session.scheduled_date is None or session.scheduled_time is None:
+        return Response(
+            {"error": "Invalid scheduled_date or scheduled_time."},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
 
-    session.status = "approved"
-    session.save()
+    with transaction.atomic():
+        try:
+            availability.check_slot(
+                session.teacher_id, session.scheduled_date, session.scheduled_time,
+                session.duration_minutes, session=session,
+            )
+        except availability.SlotConflict as exc:
+            return Response({"error": str(exc)}, status=status.HTTP_409_CONFLICT)
+
+        session.status = "approved"
+        session.save()
     return Response(PrivateSessionSerializer(session).data)
 
 
@@ -342,21 +365,38 @@ def reschedule_request(request, session_id):
             status=status.HTTP_400_BAD_REQUEST,
         )
 
-    SessionRescheduleHistory.objects.create(
-        session=session,
-        proposed_by=request.user,
-        original_date=session.scheduled_date,
-        original_time=session.scheduled_time,
-        proposed_date=new_date,
-        proposed_time=new_time,
-        reason=reason,
-    )
+    new_date, new_time = parse_date(new_date), parse_time(new_time)
+    if new_date is None or new_time is None:
+        return Response(
+            {"error": "Invalid scheduled_date or scheduled_time."},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
 
-    session.rescheduled_date = new_date
-    session.rescheduled_time = new_time
-    session.reschedule_reason = reason
-    session.status = "needs_reconfirmation"
-    session.save()
+    with transaction.atomic():
+        # The session's own current slot doesn't block its move
+        try:
+            availability.check_slot(
+                session.teacher_id, new_date, new_time, session.duration_minutes,
+                session=session,
+            )
+        except availability.SlotConflict as exc:
+            return Response({"error": str(exc)}, status=status.HTTP_409_CONFLICT)
+
+        SessionRescheduleHistory.objects.create(
+            session=session,
+            proposed_by=request.user,
+            original_date=session.scheduled_date,
+            original_time=session.scheduled_time,
+            proposed_date=new_date,
+            proposed_time=new_time,
+            reason=reason,
+        )
+
+        session.rescheduled_date = new_date
+        session.rescheduled_time = new_time
+        session.reschedule_reason = reason
+        session.status = "needs_reconfirmation"
+        session.save()
     return Response(PrivateSessionSerializer(session).data)
 
 
@@ -404,9 +444,12 @@ def start_session(request, session_id):
     session.status = "ongoing"
     session.room_name = f"private_{session.id}"
     session.started_at = timezone.now()
-    session.active_connections = 0
-    session.all_left_at = None
     session.save()
+
+    # Chat sockets opened before the start can send from now on
+    async_to_sync(get_channel_layer().group_send)(
+        chat_group_name(session.id), {"type": "session_started"}
+    )
     return Response(PrivateSessionSerializer(session).data)
 
 
@@ -423,8 +466,12 @@ def _end_session_internal(session, reason="ended"):
     session.ended_at = timezone.now()
     session.save()
 
-    # Clean up chat messages — no longer needed after session ends
-    ChatMessage.objects.filter(session=session).delete()
+    # Chat is compacted into a ChatArchive by `manage.py archive_chat_history`
+
+    # Connected chat sockets stop accepting messages
+    async_to_sync(get_channel_layer().group_send)(
+        chat_group_name(session.id), {"type": "session_ended"}
+    )
 
     logger.info(
         "Session %s %s (reason: %s)",
@@ -561,7 +608,11 @@ def join_private_session(request, session_id):
 @api_view(["GET"])
 @permission_classes([IsAuthenticated])
 def session_chat_messages(request, session_id):
-    """Retrieve all chat messages for a private session."""
+    """
+    Chat history for a private session, newest first, 50 per page
+    (``?page_size=`` up to 200). Older pages via ``?before=<cursor>``; the
+    cursor for the next page is in the Link header (rel="next").
+    """
     try:
         session = PrivateSession.objects.get(pk=session_id)
     except PrivateSession.DoesNotExist:
@@ -576,16 +627,25 @@ def session_chat_messages(request, session_id):
     if not is_involved:
         return Response({"error": "Not a participant."}, status=status.HTTP_403_FORBIDDEN)
 
-    messages = ChatMessage.objects.filter(
-        session=session
-    ).order_by("created_at")[:200]
-    return Response(ChatMessageSerializer(messages, many=True).data)
+    rows, paginator, page = history_page(session, request)
+
+    headers = None
+    if page.next_cursor:
+        url = replace_query_param(
+            request.build_absolute_uri(), paginator.cursor_param, page.next_cursor
+        )
+        headers = {"Link": f'<{url}>; rel="next"'}
+    return Response(rows, headers=headers)
 
 
 @api_view(["POST"])
 @permission_classes([IsAuthenticated])
 def send_chat_message(request, session_id):
-    """Send a chat message in a private session. Persists to DB and broadcasts via channels."""
+    """
+    Send a chat message in a private session. Persists to DB and broadcasts
+    via channels. Connected clients should send over the chat WebSocket
+    instead (see PrivateSessionChatConsumer); this stays as a fallback.
+    """
     try:
         session = PrivateSession.objects.get(pk=session_id)
     except PrivateSession.DoesNotExist:
@@ -608,6 +668,15 @@ def send_chat_message(request, session_id):
     if not message_text:
         return Response({"error": "Message cannot be empty."}, status=status.HTTP_400_BAD_REQUEST)
 
+    client_id = str(request.data.get("client_id") or "")[:64] or None
+    if client_id:
+        # A resend of a message that was already stored
+        existing = ChatMessage.objects.filter(
+            session=session, sender=user, client_id=client_id
+        ).first()
+        if existing:
+            return Response(ChatMessageSerializer(existing).data)
+
     display_name = get_user_name(user)
     role = "teacher" if is_teacher else "student"
 
@@ -617,13 +686,14 @@ def send_chat_message(request, session_id):
         sender_name=display_name,
         sender_role=role,
         message=message_text,
+        client_id=client_id,
     )
 
     # Broadcast to all WebSocket clients in this session's chat group
     serialized = ChatMessageSerializer(chat_msg).data
     channel_layer = get_channel_layer()
     async_to_sync(channel_layer.group_send)(
-        f"private_session_chat_{session_id}",
+        chat_group_name(session_id),
         {
             "type": "chat_message",
             "data": serialized,
@@ -643,17 +713,14 @@ def send_chat_message(request, session_id):
 def subject_teachers(request, subject_id):
     """
     Get teachers for a subject.
-    Optional: filters out busy teachers.
+    Optional: ?date=YYYY-MM-DD&time=HH:MM&duration= filters out teachers
+    who have a session or live class overlapping that slot.
     """
-    from courses.models import SubjectTeacher
-
     date = request.query_params.get("date")
     time = request.query_params.get("time")
     duration = int(request.query_params.get("duration", 60))
 
-    qs = SubjectTeacher.objects.filter(
-        subject_id=subject_id
-    ).select_related("teacher", "teacher__profile")
+    teachers = _subject_teachers(subject_id)
 
     # 🔥 Availability filtering (optional but included)
     if date and time:
@@ -662,22 +729,77 @@ def subject_teachers(request, subject_id):
                 f"{date} {time}", "%Y-%m-%d %H:%M"))
             end = start + timedelta(minutes=duration)
 
-            busy_teachers = PrivateSession.objects.filter(
-                status__in=["approved", "ongoing"],
-                scheduled_date=date
-            ).values_list("teacher_id", flat=True)
-
-            qs = qs.exclude(teacher_id__in=busy_teachers)
+            free = set(availability.free_teachers(
+                [teacher.pk for teacher in teachers], start, end
+            ))
+            teachers = [teacher for teacher in teachers if teacher.pk in free]
 
         except Exception:
             pass
 
     data = [
         {
-            "id": str(st.teacher.id),
-            "name": getattr(st.teacher.profile, "full_name", st.teacher.username),
+            "id": str(teacher.id),
+            "name": getattr(teacher.profile, "full_name", teacher.username),
+        }
+        for teacher in teachers
+    ]
+
+    return Response(data)
+
+
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+def subject_free_slots(request, subject_id):
+    """
+    Bookable start times for every teacher of a subject.
+
+    ?from=YYYY-MM-DD  first day (default today)
+    ?days=            how many days (default 7, max 14)
+    ?duration=        session length in minutes (default 60)
+    ?step=            minutes between candidate start times (default 30)
+
+    → [{"id", "name", "slots": {"YYYY-MM-DD": ["HH:MM", ...]}}]
+    """
+    try:
+        first_day = parse_date(request.query_params.get("from", "")) or timezone.localdate()
+        days = min(int(request.query_params.get("days", 7)), 14)
+        duration = int(request.query_params.get("duration", 60))
+        step = int(request.query_params.get("step", 30))
+    except ValueError:
+        return Response({"error": "Invalid query parameters."}, status=status.HTTP_400_BAD_REQUEST)
+
+    if days < 1 or duration < 1 or step < 1:
+        return Response({"error": "Invalid query parameters."}, status=status.HTTP_400_BAD_REQUEST)
+
+    teachers = _subject_teachers(subject_id)
+    ids = [teacher.pk for teacher in teachers]
+
+    slots = {str(pk): {} for pk in ids}
+    for offset in range(days):
+        day = first_day + timedelta(days=offset)
+        for teacher_id, times in availability.free_slots(ids, day, duration, step).items():
+            if times:
+                slots[teacher_id][day.isoformat()] = times
+
+    data = [
+        {
+            "id": str(teacher.id),
+            "name": getattr(teacher.profile, "full_name", teacher.username),
+            "slots": slots[str(teacher.pk)],
         }
-        for st in qs
+        for teacher in teachers
     ]
 
     return Response(data)
+
+
+def _subject_teachers(subject_id):
+    from courses.models import SubjectTeacher
+
+    return [
+        st.teacher
+        for st in SubjectTeacher.objects.filter(
+            subject_id=subject_id
+        ).select_related("teacher", "teacher__profile")
+    ]